@@ -1,11 +1,38 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import yfinance as yf
-import requests
 import numpy as np
-from datetime import datetime, timedelta
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+import perf
+import providers
+from schema import compact_frame, compact_prices, naive_dates
+from panel_store import PricePanelStore
+from price_pieces import price_panel
+from shared_cache import SharedCache
+from loader_cache import LoaderCache
+from metric_graph import MetricGraph
+from rules import RuleBook
+from signal_stats import SignalStatsCache
+from fingerprint import code_fingerprint, data_fingerprint
+from charts import (
+    FigureCache, divergence_bar_figure, line_figure, monthly_bar_figure,
+    sofr_iorb_figure, sparkline_figure, status_timeline_figure, survivor_scatter_figure,
+    with_row_aliases, xcorr_figure, SURVIVOR_CLASS_COLORS,
+)
+from cards import aplc_card, card_grid, count_card, legend_item, status_card, survivor_card
+from engines import (
+    C2EHistoryCache, align_c2e_inputs, c2e_change_signals, estimate_lead_lag,
+    compute_sensitivity_velocity, multi_horizon_returns,
+    compute_psr, overlay_psr, survivor_relative_returns, semi_class_table,
+    capex_audit_ratios, classify_capex_health_arrays, classify_c2e_arrays, evaluate_l2_status,
+    relative_perf, dc_credit_divergence,
+)
 
 # --- API Keys ---
 # Try to get from Streamlit Secrets, otherwise use hardcoded fallback (for local dev without secrets.toml)
@@ -103,6 +130,10 @@ These metrics are four independent variables that directly measure "reserve supp
         "English": "Reserv. Fee ($/MW-day)",
         "日本語": "電力利用担保金 ($/MW-日)"
     },
+    "sidebar_full_res": {
+        "English": "Full-resolution charts",
+        "日本語": "チャートを全点表示"
+    },
     "defense": { "English": "Defense: ", "日本語": "防衛線: " },
     "flip": { "English": "Flip: ", "日本語": "フリップ: " },
     "target": { "English": "Target: ", "日本語": "目標: " },
@@ -417,6 +448,56 @@ st.markdown("""
             border-left: 5px solid #FF4B4B !important;
         }
 
+        /* Card Grid: a whole row of cards in one element (cards.py) */
+        .card-grid {
+            display: grid;
+            grid-template-columns: repeat(var(--cols, 5), minmax(0, 1fr));
+            gap: 1rem;
+            margin-bottom: 10px;
+        }
+        .card-grid .metric-card { margin-bottom: 0 !important; padding: 15px; }
+        .accent-top { border-top: 4px solid var(--accent) !important; }
+        .accent-left { border-left: 4px solid var(--accent) !important; }
+        .accent-text { color: var(--accent); }
+        .card-center { text-align: center; }
+        .card-head { display: flex; justify-content: space-between; align-items: center; margin-bottom: 5px; }
+        .card-head h3 { margin: 0; padding: 0; font-size: 1.1rem; }
+        .card-muted { font-weight: bold; color: #888; font-size: 0.9rem; }
+        .card-label { font-size: 0.7rem; color: #888; }
+        .card-value { font-size: 1.8rem; font-weight: 800; margin-bottom: 5px; }
+        .card-level { font-size: 0.7rem; font-weight: bold; margin-bottom: 8px; }
+        .card-breakdown { font-size: 0.65rem; color: #666; background: #f8f9fa; padding: 6px; border-radius: 4px; }
+        .card-kv { display: flex; justify-content: space-between; }
+        .card-kv-sep { border-top: 1px solid #ddd; margin-top: 2px; padding-top: 2px; }
+        .card-parts {
+            margin-top: 4px; padding-top: 4px; border-top: 1px dashed #eee; color: #888; font-size: 0.6rem;
+            display: flex; flex-wrap: wrap; gap: 8px; justify-content: flex-end;
+        }
+        .card-title { font-weight: 600; margin-bottom: 4px; }
+        .card-value-sm { font-size: 0.85rem; margin-bottom: 6px; font-weight: bold; }
+        .card-desc { font-size: 0.75rem; color: #555; line-height: 1.4; }
+        .card-count { font-weight: bold; font-size: 1rem; }
+        .card-ticker { font-weight: 700; margin-bottom: 5px; font-size: 1.1rem; }
+        .card-class { font-size: 0.8rem; color: #444; margin-bottom: 2px; }
+        .card-stats { font-size: 0.75rem; color: #666; }
+        .legend-item { background-color: #f8f9fa; padding: 10px; border-radius: 5px; height: 100%; }
+        .legend-label { font-weight: bold; margin-bottom: 5px; }
+        .legend-desc { font-size: 0.8rem; line-height: 1.4; color: #555; }
+
+        /* Loading Skeletons (replaced as each panel's data arrives) */
+        .skeleton-row { display: flex; gap: 16px; margin-bottom: 16px; }
+        .skeleton-block {
+            flex: 1;
+            border-radius: 10px;
+            background: linear-gradient(90deg, #F0F0F0 25%, #E4E4E4 37%, #F0F0F0 63%);
+            background-size: 400% 100%;
+            animation: skeleton-shimmer 1.4s ease infinite;
+        }
+        @keyframes skeleton-shimmer {
+            0% { background-position: 100% 50%; }
+            100% { background-position: 0 50%; }
+        }
+
         /* Hide Streamlit Header/Footer */
         #MainMenu { visibility: hidden; }
         footer { visibility: hidden; }
@@ -432,14 +513,205 @@ if 'language' not in st.session_state:
 def set_lang(lang):
     st.session_state.language = lang
 
+LANG_CODES = {"JP": "日本語", "EN": "English"}
+
+def on_lang_change():
+    # on_change はスクリプト再実行の前に走るので、切替は 1 回の再描画で済む（st.rerun 不要）
+    set_lang(LANG_CODES[st.session_state.lang_main])
+
 lang = st.session_state.language
 
+_run_started = time.perf_counter()
+
 # --- Data Loading ---
+
+# --- Host-Wide Cache ---
+# SHARED_CACHE_PATH を設定すると、同じホストの全レプリカが cached_stage の結果を SQLite で共有する
+# (shared_cache.py)。プロセス内キャッシュのミス時だけ参照し、ホスト内で最初の 1 プロセスだけが取得する。
+
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH")
+
+@st.cache_resource
+def get_shared_cache():
+    if not SHARED_CACHE_PATH:
+        return None
+    cache = SharedCache(SHARED_CACHE_PATH)
+    cache.purge_expired()
+    return cache
+
+# --- Loader Cache ---
+# cached_stage の結果はプロセス内の LoaderCache (loader_cache.py) に pickle で持つ。
+# 全ローダー合計で LOADER_CACHE_MB まで、ローダーごとに max_entries 個まで、古く使われていないものから捨てる
+# （引数で増える get_semi_relative_returns(universe, days) なども上限内に収まり、RSS が頭打ちになる）。
+
+LOADER_CACHE_MB = float(os.environ.get("LOADER_CACHE_MB", "512"))
+LOADER_CACHE_MAX_ENTRIES = int(os.environ.get("LOADER_CACHE_MAX_ENTRIES", "32"))
+
+@st.cache_resource
+def get_loader_cache():
+    cache = LoaderCache(int(LOADER_CACHE_MB * 1e6), default_max_entries=LOADER_CACHE_MAX_ENTRIES,
+                        on_evict=perf.count_eviction)
+    perf.watch_loader_cache(cache)
+    return cache
+
+# --- Loader Notices ---
+# ローダー内の警告は st.warning / st.error を直接呼ばず loader_notice で出す。prefetch のスレッドには
+# ScriptRunContext が無く、そこで描いた要素は捨てられるため。警告を出した（または skip_cache した）呼び出しの
+# 結果はどのキャッシュにも載せない。呼び出し元がローダーならそちらも同じ扱いにし、メッセージも引き継ぐ。
+# 最上位ではメインスレッドならその場で描き、prefetch スレッドなら捨てる（失敗はキャッシュされないので、
+# パネル側の呼び出しが取得し直して同じ警告をメインスレッドで描く）。
+
+_loader_call = ContextVar("loader_call", default=None)
+
+class _Uncached(Exception):
+    """Carries a failed call's fallback value and notices past the caches, which store nothing on raise."""
+    def __init__(self, value, notices):
+        super().__init__()
+        self.value = value
+        self.notices = notices
+
+def loader_notice(level, message):
+    """level: "warning" / "error"。ローダー呼び出しの中なら結果をキャッシュせず、メッセージを呼び出し元へ渡す。"""
+    call = _loader_call.get()
+    if call is not None:
+        call["failed"] = True
+        call["notices"].append((level, message))
+    elif get_script_run_ctx(suppress_warning=True) is not None:
+        getattr(st, level)(message)
+
+def skip_cache():
+    """今回の結果（空・代替値）をキャッシュしない。メッセージは出さない。"""
+    call = _loader_call.get()
+    if call is not None:
+        call["failed"] = True
+
+def _run_loader(func, args, kwargs):
+    call = {"failed": False, "notices": []}
+    token = _loader_call.set(call)
+    try:
+        value = func(*args, **kwargs)
+    finally:
+        _loader_call.reset(token)
+    if call["failed"]:
+        raise _Uncached(value, call["notices"])
+    return value
+
+def cached_stage(stage, ttl=None, max_entries=None, version=None):
+    """
+    Process-wide loader cache + perf tracing. The inner body only runs on a
+    cache miss, so it flags the enclosing span as a miss and stamps the
+    snapshot time (exported as the loader's snapshot age). With
+    SHARED_CACHE_PATH set the miss goes to the host-wide cache first, and the
+    snapshot time is the one recorded by whichever process fetched it.
+    max_entries caps this loader's entries (default LOADER_CACHE_MAX_ENTRIES).
+    A call that used loader_notice / skip_cache returns its value uncached.
+    The key covers the loader's own code and the module constants it reads
+    (fingerprint.code_fingerprint), not the helpers it calls: bump version when a
+    change there alters the cached shape, so the shared cache is not reused.
+    """
+    def deco(func):
+        def body(key, args, kwargs):
+            perf.mark_miss()
+            shared = get_shared_cache()
+            if shared is None:
+                return time.time(), _run_loader(func, args, kwargs)
+            created_at, value, source = shared.get_or_compute(key, stage, ttl, lambda: _run_loader(func, args, kwargs))
+            perf.count_shared(stage, source)
+            return created_at, value
+
+        @perf.traced(stage, cached=True)
+        @functools.wraps(func)
+        def loader(*args, **kwargs):
+            # The function's code and constants are part of the key so a deploy never reads the old shape
+            key = data_fingerprint(stage, version, code_fingerprint(func), args, kwargs)
+            cache = get_loader_cache()
+            if stage not in cache:
+                cache.register(stage, ttl=ttl, max_entries=max_entries)
+            try:
+                created_at, value = cache.get_or_compute(stage, key, lambda: body(key, args, kwargs))
+            except _Uncached as failed:
+                skip_cache()
+                for level, message in failed.notices:
+                    loader_notice(level, message)
+                return failed.value
+            perf.observe_snapshot(stage, created_at)
+            return value
+        loader.clear = lambda: get_loader_cache().clear(stage)
+        return loader
+    return deco
+
+FRED_MAX_RETRIES = 2
+FRED_TIMEOUT = 30
+
+def fred_get(url):
+    """
+    GET a FRED endpoint. Every non-2xx response counts as an error (a bad API key
+    or series_id shows up there); only 429 / 5xx are retried with a short backoff.
+    Latency, errors, retries and backoff waits are exported via perf.
+    """
+    for attempt in range(FRED_MAX_RETRIES + 1):
+        r = providers.http_get(url, "fred", timeout=FRED_TIMEOUT)
+        perf.add_bytes(len(r.content))
+        if not 200 <= r.status_code < 300:
+            perf.count_error("fred")
+            if (r.status_code == 429 or r.status_code >= 500) and attempt < FRED_MAX_RETRIES:
+                perf.count_retry("fred")
+                perf.rate_limit_wait("fred", 0.5 * 2 ** attempt)
+                continue
+        return r
+
+# --- Metrics Endpoint (Prometheus text format) ---
+# Opt-in per process: METRICS_PORT=9464 streamlit run app.py  ->  curl localhost:9464/metrics
+
+@st.cache_resource
+def start_metrics_endpoint():
+    port = os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return perf.start_metrics_server(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
+    except OSError as e:
+        # Port taken (e.g. another replica on this host); keep serving the app
+        logging.getLogger(__name__).warning("metrics endpoint not started on port %s: %s", port, e)
+        return None
+
+start_metrics_endpoint()
+
+# --- Figure Cache ---
+# 図はデータ（系列）・レイアウト・色の指紋をキーにプロセス内で共有し、データが変わるまで再構築しない。
+# JSON ではなく Figure のまま持つ: st.plotly_chart は dict を渡すと Figure(**dict) で検証し直すが、
+# Figure なら to_dict + to_json だけで済む。
+
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", "128"))
+# 時系列は 1 トレースあたりこの点数まで LTTB で間引いて送る（サイドバーの全点表示で解除）
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "500"))
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(maxsize=FIGURE_CACHE_SIZE)
+
+def cached_figure(name, build, *args, **kwargs):
+    """
+    build(*args, **kwargs) を図キャッシュ経由で呼ぶ。キーは name と引数の指紋。
+    返る図はセッション間で共有されるので変更しないこと（表示用の差分は引数で渡す）。
+    """
+    key = (name, data_fingerprint(args, kwargs))
+
+    def miss():
+        perf.mark_miss()
+        return build(*args, **kwargs)
+
+    with perf.trace(f"chart:{name}", cached=True):
+        return get_figure_cache().get_or_build(key, miss)
+
+def chart_max_points():
+    return None if st.session_state.get("chart_full_res") else CHART_MAX_POINTS
+
 # --- Google Sheet URLs ---
 CONFIG_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTPFDp3yDMtcAChS7vdE2yUlv-tvCw5cPDlI5-k8dm-ZUYCMiQ6_ydWHZui7G92WxEbkaUFvap2lFa6/pub?output=csv"
 LIQUIDITY_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRp0T72A5SmCOEuxj-guQ5ErHi7PWWtS05dAJdQnwx2ccEjdBRLHXIrcwfDYnnF9iguA7oMZLyGNpAr/pub?output=csv"
 
-@st.cache_data(ttl=3600)
+@cached_stage("build_capex_audit_from_yf", ttl=3600)
 def build_capex_audit_from_yf(tickers):
     """
     yfinance の quarterly_income_stmt / quarterly_cashflow から
@@ -449,9 +721,8 @@ def build_capex_audit_from_yf(tickers):
     rows = []
     for t in tickers:
         try:
-            tk = yf.Ticker(t)
-            inc_q = tk.quarterly_income_stmt
-            cf_q  = tk.quarterly_cashflow
+            inc_q = providers.yf_statement(t, "quarterly_income_stmt")
+            cf_q  = providers.yf_statement(t, "quarterly_cashflow")
 
             if inc_q is None or cf_q is None or inc_q.empty or cf_q.empty:
                 continue
@@ -508,92 +779,137 @@ def build_capex_audit_from_yf(tickers):
 
         except Exception as e:
             # st.warning(f"[CapEx audit] Error fetching {t}: {e}")
+            skip_cache()  # 取得エラーの銘柄が欠けた表は次回取り直す
             continue
 
     if not rows:
         return pd.DataFrame(columns=["Ticker", "Period", "NI_Q", "OCF_Q", "CapEx_Q"])
 
-    return pd.DataFrame(rows)
-
-
-def classify_capex_health(row):
-    psr = row.get("PSR", np.nan)
-    c_ni = row.get("CapEx_to_NI", np.nan)
-    c_ocf = row.get("CapEx_to_OCF", np.nan)
-
-    # 物理的なブラックホール：
-    # PSR < 1.0 かつ CapEx が利益 or OCF を食い潰している
-    if (not np.isnan(psr) and psr < 1.0) and (
-        (not np.isnan(c_ni) and c_ni > 1.0) or
-        (not np.isnan(c_ocf) and c_ocf > 1.0)
-    ):
-        return "BLACK_HOLE"
-
-    # Dead Cross が出ているが PSR > 1.0 → 境界域
-    if ((not np.isnan(c_ni) and c_ni > 1.0) or
-        (not np.isnan(c_ocf) and c_ocf > 1.0)):
-        return "BOUNDARY"
+    return compact_frame(pd.DataFrame(rows), labels=["Ticker", "Period"])
 
-    # それ以外はとりあえず健全
-    return "HEALTHY"
 
-
-@st.cache_data(ttl=600)
+@cached_stage("load_config", ttl=600)
 def load_config():
     try:
         # Fetch from Google Sheet
-        config = pd.read_csv(CONFIG_SHEET_URL)
+        config = providers.read_csv(CONFIG_SHEET_URL)
         return config
     except Exception:
-        # Fallback to local
+        # Fallback to local (not cached, so the sheet is retried next run)
+        skip_cache()
         try:
             return pd.read_csv("data/Config.csv")
         except:
             return pd.DataFrame()
 
+@st.cache_resource(max_entries=4)
+def load_rulebook(config):
+    """
+    Config シートの閾値で上書きした判定ルール（rules.py）。シートが同じ間は全セッションで
+    同じ RuleBook を共有し、評価関数のコンパイルも 1 回だけ。閾値は rulebook.get(key) で引く。
+    """
+    return RuleBook.from_config(config)
+
 # Session removed - relying on standard yfinance with delay
-import time
 
-@st.cache_data(ttl=3600)
-def get_live_metrics_v2():
-    # FANG Metrics
-    tickers = ["META", "AMZN", "NFLX", "GOOGL", "MSFT", "AAPL", "NVDA", "TSLA", "SNOW", "AVGO", "AMAT", "LRCX", "KLAC", "ASML", "TER"]
-    rows = []
-    for t in tickers:
-        try:
-            time.sleep(0.2) # Avoid Rate Limit
-            tick = yf.Ticker(t)
-            hist = tick.history(period="1d")
-            price = float(hist['Close'].iloc[-1]) if not hist.empty else 0
-            
-            # Simple caching attempt for financials
+LIVE_METRIC_TICKERS = ["META", "AMZN", "NFLX", "GOOGL", "MSFT", "AAPL", "NVDA", "TSLA", "SNOW", "AVGO", "AMAT", "LRCX", "KLAC", "ASML", "TER"]
+
+# 財務は銘柄ごとに 1 エントリでローダーキャッシュに持つ（終値の fetch_price_series と同じ）。要求は銘柄の並び・
+# 組み合わせに関係なく銘柄単位で組み立て、足りない銘柄だけを LIVE_METRIC_WORKERS 本のスレッドで並列に取りに行く
+# （Survivor ユニバースの追加銘柄も、既定リストと重なる銘柄は取得済みのものを使う）。取得に失敗した銘柄は載せない。
+LIVE_METRIC_TTL = 3600
+LIVE_METRIC_MAX_TICKERS = int(os.environ.get("LIVE_METRIC_MAX_TICKERS", "512"))
+LIVE_METRIC_WORKERS = int(os.environ.get("LIVE_METRIC_WORKERS", "4"))
+
+class MetricFetchError(Exception):
+    """1 銘柄の取得失敗。row は代わりに表へ入れる行、message は出す警告（None なら出さない）。"""
+    def __init__(self, row, message=None):
+        super().__init__(message)
+        self.row = row
+        self.message = message
+
+def fetch_metric_row(t):
+    """1 銘柄の Price / FCF / CapEx。失敗したら 0 埋めの行を持った MetricFetchError（キャッシュされない）。"""
+    try:
+        providers.throttle("yfinance", 0.2) # Avoid Rate Limit
+        hist = providers.yf_history(t, period="1d")
+        price = float(hist['Close'].iloc[-1]) if not hist.empty else 0
+    except Exception as e:
+        raise MetricFetchError({"Ticker": t, "Price": 0, "FCF": 0, "CapEx": 0}, f"Error fetching {t}: {e}")
+
+    try:
+        cf = providers.yf_statement(t, "cashflow")
+        fcf = cf.loc["Free Cash Flow"].iloc[0] if "Free Cash Flow" in cf.index else 0
+        capex = cf.loc["Capital Expenditure"].iloc[0] if "Capital Expenditure" in cf.index else 0
+    except:
+        # 財務諸表だけ取れないときは黙って 0 で埋める（次回取り直す）
+        raise MetricFetchError({"Ticker": t, "Price": round(price, 2), "FCF": 0, "CapEx": 0})
+    return {"Ticker": t, "Price": round(price, 2), "FCF": fcf, "CapEx": capex}
+
+def _metric_rows(held, failed):
+    """held の銘柄を並列に取得 -> {ticker: (created_at, row)}。失敗した銘柄は failed へ入れ、戻り値には含めない。"""
+    perf.mark_miss()
+    shared = get_shared_cache()
+
+    def one(t):
+        if shared is None:
+            return time.time(), fetch_metric_row(t)
+        key = data_fingerprint("get_live_metrics_v2", code_fingerprint(fetch_metric_row), t)
+        created_at, row, source = shared.get_or_compute(
+            key, "get_live_metrics_v2", LIVE_METRIC_TTL, lambda: fetch_metric_row(t))
+        perf.count_shared("get_live_metrics_v2", source)
+        return created_at, row
+
+    rows = {}
+    with ThreadPoolExecutor(max_workers=LIVE_METRIC_WORKERS, thread_name_prefix="metrics") as pool:
+        futures = {t: pool.submit(one, t) for t in held}
+        for t, future in futures.items():
             try:
-                cf = tick.cashflow
-                fcf = cf.loc["Free Cash Flow"].iloc[0] if "Free Cash Flow" in cf.index else 0
-                capex = cf.loc["Capital Expenditure"].iloc[0] if "Capital Expenditure" in cf.index else 0
-            except:
-                fcf = 0
-                capex = 0
-                
-            rows.append({"Ticker": t, "Price": round(price, 2), "FCF": fcf, "CapEx": capex})
-        except Exception as e:
-            st.warning(f"Error fetching {t}: {e}")
-            rows.append({"Ticker": t, "Price": 0, "FCF": 0, "CapEx": 0})
-    return pd.DataFrame(rows)
+                rows[t] = future.result()
+            except MetricFetchError as e:
+                failed[t] = e
+            except Exception as e:
+                failed[t] = MetricFetchError({"Ticker": t, "Price": 0, "FCF": 0, "CapEx": 0}, f"Error fetching {t}: {e}")
+    return rows
 
-@st.cache_data(ttl=3600)
+@perf.traced("get_live_metrics_v2", cached=True)
+def get_live_metrics_v2(tickers=None):
+    """
+    FANG Metrics (or any explicit ticker list, e.g. the Survivor universe): Ticker, Price, FCF, CapEx
+    in request order. Assembled per ticker from the loader cache; only missing tickers are fetched,
+    in parallel. Failed tickers get a zero row and are fetched again on the next call.
+    """
+    if tickers is None:
+        tickers = LIVE_METRIC_TICKERS
+    cache = get_loader_cache()
+    if "get_live_metrics_v2" not in cache:
+        cache.register("get_live_metrics_v2", ttl=LIVE_METRIC_TTL, max_entries=LIVE_METRIC_MAX_TICKERS)
+    failed = {}
+    rows = cache.get_many("get_live_metrics_v2", tickers, lambda held: _metric_rows(held, failed))
+    for t, e in failed.items():
+        if e.message:
+            loader_notice("warning", e.message)
+        else:
+            skip_cache()
+    if rows:
+        perf.observe_snapshot("get_live_metrics_v2", min(created_at for created_at, _ in rows.values()))
+    out = [rows[t][1] if t in rows else failed[t].row for t in tickers]
+    return compact_frame(pd.DataFrame(out, columns=["Ticker", "Price", "FCF", "CapEx"]),
+                         labels=["Ticker"], floats32=["Price"])
+
+@cached_stage("get_market_data_fred_yfinance_v2", ttl=3600)
 def get_market_data_fred_yfinance_v2():
     data = {}
     try:
-        time.sleep(0.2)
-        spx = yf.Ticker("^GSPC").history(period="1d")
+        providers.throttle("yfinance", 0.2)
+        spx = providers.yf_history("^GSPC", period="1d")
         data['SPX'] = float(spx['Close'].iloc[-1]) if not spx.empty else 6900.0
         
-        time.sleep(0.2)
-        nyfang = yf.Ticker("^NYFANG").history(period="1d")
+        providers.throttle("yfinance", 0.2)
+        nyfang = providers.yf_history("^NYFANG", period="1d")
         data['NYFANG'] = float(nyfang['Close'].iloc[-1]) if not nyfang.empty else 12000.0
     except Exception as e:
-        st.warning(f"Error fetching SPX/FANG: {e}")
+        loader_notice("warning", f"Error fetching SPX/FANG: {e}")
         data['SPX'] = 6900.0
         data['NYFANG'] = 12000.0
 
@@ -602,7 +918,8 @@ def get_market_data_fred_yfinance_v2():
         # Helper to fetch series
         def fetch_fred_series(series_id, limit=300):
             url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json&sort_order=desc&limit={limit}"
-            r = requests.get(url)
+            with perf.trace(f"fred:{series_id}"):
+                r = fred_get(url)
             if r.ok and r.json().get('observations'):
                 return r.json()['observations']
             return []
@@ -651,11 +968,11 @@ def get_market_data_fred_yfinance_v2():
             data['Real_Yield'] = pd.DataFrame()
 
         # C. TNX Divergence (Yahoo)
-        time.sleep(0.2)
-        tnx = yf.Ticker("^TNX").history(period="6mo") # Get enough for MA
+        providers.throttle("yfinance", 0.2)
+        tnx = providers.yf_history("^TNX", period="6mo") # Get enough for MA
         if not tnx.empty:
             tnx = tnx[['Close']].reset_index()
-            tnx['Date'] = pd.to_datetime(tnx['Date']).dt.tz_localize(None) # Remove timezone
+            tnx['Date'] = naive_dates(tnx['Date']) # Remove timezone
             tnx['MA5'] = tnx['Close'].rolling(window=5).mean()
             tnx['Divergence'] = tnx['Close'] - tnx['MA5']
             data['TNX_Div'] = tnx.dropna()
@@ -663,6 +980,7 @@ def get_market_data_fred_yfinance_v2():
             data['TNX_Div'] = pd.DataFrame()
 
     except Exception as e:
+        skip_cache()
         data['SOFR'] = 5.30
         data['IORB'] = 5.40
         data['SOFR_Date'] = "-"
@@ -676,44 +994,88 @@ def get_market_data_fred_yfinance_v2():
 
 # --- Helper: Price Series Fetcher for Credit Panel ---
 
-@st.cache_data(ttl=3600)
+# 終値は銘柄ごとに 1 エントリ (取得済みの期間つき) でローダーキャッシュに持つ。要求は銘柄の並び・組み合わせ・
+# 日数に関係なく銘柄単位で組み立て、足りない銘柄・期間だけを 1 回の yf_download でまとめて取りに行く
+# （C2E が取った C2E_HISTORY_START 以降の履歴から 120 日の要求はそのまま切り出せる）。
+PRICE_TTL = 3600
+PRICE_CACHE_MAX_TICKERS = int(os.environ.get("PRICE_CACHE_MAX_TICKERS", "512"))
+
+def download_closes(tickers, start, end):
+    """
+    yfinance から tickers の終値を 1 回で取得（end は含まない）。
+    Returns: DatetimeIndex × Ticker の DataFrame（compact_prices 済み）
+    """
+    # Avoid Rate Limit
+    providers.throttle("yfinance", 0.3)
+    data = providers.yf_download(tickers, start=start, end=end, progress=False)
+
+    # Access 'Adj Close' or 'Close' (Handling updated yfinance structure)
+    if 'Adj Close' in data:
+        df_price = data['Adj Close']
+    elif 'Close' in data:
+        df_price = data['Close']
+    else:
+        return pd.DataFrame()
+
+    if isinstance(df_price, pd.Series):
+        df_price = df_price.to_frame(tickers[0])
+    return compact_prices(df_price.dropna(how="all"))
+
+def _fetch_closes(tickers, lo, end):
+    """
+    不足分の取得（lo から end まで）。SHARED_CACHE_PATH があれば他プロセスと共有する。
+    Returns: (created_at, DatetimeIndex × Ticker の DataFrame)
+    """
+    perf.mark_miss()
+
+    def fetch():
+        return download_closes(tickers, lo, end + timedelta(days=1))
+
+    shared = get_shared_cache()
+    if shared is None:
+        return time.time(), fetch()
+    key = data_fingerprint("fetch_price_series", code_fingerprint(download_closes), tickers, str(lo), str(end))
+    created_at, fresh, source = shared.get_or_compute(key, "fetch_price_series", PRICE_TTL, fetch)
+    perf.count_shared("fetch_price_series", source)
+    return created_at, fresh
+
+@perf.traced("fetch_price_series", cached=True)
 def fetch_price_series(tickers, days=120):
     """
-    Simple wrapper around yfinance for multiple tickers.
-    Returns Adjusted Close DataFrame for the past `days`.
+    Adjusted Close DataFrame for the past `days` (columns sorted by ticker).
+    Assembled per ticker from the loader cache; only missing (ticker, range)
+    pieces are downloaded, in one batched call (price_pieces.py).
     """
     if isinstance(tickers, str):
         tickers = [tickers]
-    end = datetime.today()
+    if not tickers:
+        return pd.DataFrame()
+    end = date.today()
     start = end - timedelta(days=days)
+    cache = get_loader_cache()
+    if "fetch_price_series" not in cache:
+        cache.register("fetch_price_series", ttl=PRICE_TTL, max_entries=PRICE_CACHE_MAX_TICKERS)
     try:
-        # Avoid Rate Limit
-        time.sleep(0.3)
-        data = yf.download(tickers, start=start, end=end, progress=False)
-        
-        # Access 'Adj Close' or 'Close' (Handling updated yfinance structure)
-        if 'Adj Close' in data:
-            df_price = data['Adj Close']
-        elif 'Close' in data:
-            df_price = data['Close']
-        else:
-             return pd.DataFrame()
-
-        if isinstance(df_price, pd.Series):
-            df_price = df_price.to_frame()
-            
-        return df_price.dropna(how="all")
+        df_price, pieces, complete = price_panel(
+            cache, "fetch_price_series", tickers, start, end, lambda missing, lo: _fetch_closes(missing, lo, end)
+        )
     except Exception as e:
-        st.warning(f"Price fetch error: {e}")
+        loader_notice("warning", f"Price fetch error: {e}")
         return pd.DataFrame()
+    if not complete:
+        skip_cache()  # 欠けた銘柄があるパネルを呼び出し元のローダーにキャッシュさせない
+    if pieces:
+        perf.observe_snapshot("fetch_price_series", min(p[0] for p in pieces.values()))
+    return df_price
 
 # --- Helper: HY OAS from FRED (ICE BofA US High Yield OAS) ---
 
-@st.cache_data(ttl=3600)
-def fetch_hy_oas_series(series_id="BAMLH0A0HYM2", limit=365):
+@cached_stage("fetch_hy_oas_series", ttl=3600)
+def fetch_hy_oas_series(series_id="BAMLH0A0HYM2", limit=365, observation_start=None):
     """
     Fetch HY OAS series from FRED.
     Returns DataFrame with columns: ['date', 'value'].
+    `observation_start` (YYYY-MM-DD) anchors the ascending window for history use.
     """
     url = (
         "https://api.stlouisfed.org/fred/series/observations"
@@ -722,12 +1084,15 @@ def fetch_hy_oas_series(series_id="BAMLH0A0HYM2", limit=365):
         "&file_type=json&sort_order=asc"
         f"&limit={limit}"
     )
+    if observation_start:
+        url += f"&observation_start={observation_start}"
     try:
-        r = requests.get(url)
+        r = fred_get(url)
         r.raise_for_status()
         js = r.json()
         obs = js.get("observations", [])
         if not obs:
+            skip_cache()
             return pd.DataFrame()
         df = pd.DataFrame(obs)
         df['date'] = pd.to_datetime(df['date'])
@@ -735,13 +1100,13 @@ def fetch_hy_oas_series(series_id="BAMLH0A0HYM2", limit=365):
         df = df.dropna(subset=['value'])
         return df[['date', 'value']]
     except Exception as e:
-        st.warning(f"HY OAS fetch error: {e}")
+        loader_notice("warning", f"HY OAS fetch error: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=600)
+@cached_stage("load_mock_liquidity", ttl=600)
 def load_mock_liquidity():
     try:
-        df = pd.read_csv(LIQUIDITY_SHEET_URL)
+        df = providers.read_csv(LIQUIDITY_SHEET_URL)
         
         # Rename columns (Handle potential JP headers)
         # Assuming col 0 is Date and col 1 is Tail based on sheet structure
@@ -751,9 +1116,10 @@ def load_mock_liquidity():
             
         # Ensure 'Date' is datetime. 
         df['Date'] = pd.to_datetime(df['Date'], format='mixed', errors='coerce') 
-        return df[['Date', 'Treasury_Tail']].dropna()
+        return compact_frame(df[['Date', 'Treasury_Tail']].dropna(), dates=["Date"])
     except Exception as e:
-        # Fallback to local
+        # Fallback to local (not cached, so the sheet is retried next run)
+        skip_cache()
         try:
              df = pd.read_csv("data/Market_Liquidity.csv")
              df['Date'] = pd.to_datetime(df['Date'], format='mixed', errors='coerce')
@@ -761,18 +1127,352 @@ def load_mock_liquidity():
         except:
              return pd.DataFrame()
 
-# Load
-config_df = load_config()
-metrics_df = get_live_metrics_v2()
-market_data = get_market_data_fred_yfinance_v2()
-liquidity_df_mock = load_mock_liquidity()
 
-def get_config_val(key, default=0):
+# --- Panel Loaders ---
+# タブ内で使うローダーもここで定義しておき、下の prefetch で先に並列取得する
+
+# --- New Data Source: Physical Metrics ---
+PHYSICAL_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRgul7PbiP2EYy8KiPmMglhd2R-oXTriikeZCZxQHKtrxLgbwJyEiGuprBsdAEDMR_F2te9E2GQRTYb/pub?output=csv"
+
+@cached_stage("load_physical_metrics", ttl=3600)
+def load_physical_metrics():
     try:
-        val = config_df.loc[config_df['Key'] == key, 'Value'].iloc[0]
-        return float(val)
+        df = providers.read_csv(PHYSICAL_SHEET_URL)
+        # Rename Japanese columns to internal English keys
+        # 銘柄 (Ticker), 電力総使用量 (Annual TWh), 電力上昇単価 (Δ$/MWh), 予約費用単価 (加重 $/MW-day), ...
+        col_map = {
+            "銘柄 (Ticker)": "Ticker_Raw",
+            "電力総使用量 (Annual TWh)": "TWh",
+            "電力上昇単価 (Δ$/MWh)": "Price_Delta",
+            "予約費用単価 (加重 $/MW-day)": "Res_Fee_Unit"
+        }
+        # Check if columns exist (sometimes names vary slightly)
+        df_cols = df.columns.tolist()
+        # Simple mapping by index if names are tricky, but let's try strict first or soft match
+        # Let's map by likely position if standard map fails? 
+        # Actually, let's just rename based on known Japanese headers provided in inspection.
+
+        # Clean specific chars like $, \n etc if needed, but CSV usually handles cleanly.
+        # But wait, Ticker_Raw is "Amazon (AMZN)". Need to extract AMZN.
+
+        df_clean = pd.DataFrame()
+        # Find column checking
+        for c in df.columns:
+            if "Ticker" in c: col_map[c] = "Ticker_Raw"
+            elif "TWh" in c: col_map[c] = "TWh"
+            elif "Δ$/MWh" in c: col_map[c] = "Price_Delta"
+            elif "MW-day" in c: col_map[c] = "Res_Fee_Unit"
+
+        df = df.rename(columns=col_map)
+
+        # Extract Ticker
+        df['Ticker'] = df['Ticker_Raw'].apply(lambda x: x.split('(')[-1].replace(')', '').strip() if '(' in str(x) else str(x))
+
+        # Clean numeric columns (remove $, +, etc)
+        def clean_num(x):
+            if isinstance(x, str):
+                return float(x.replace('$','').replace('+','').replace(',',''))
+            return float(x)
+
+        df['TWh'] = df['TWh'].apply(clean_num)
+        df['Price_Delta'] = df['Price_Delta'].apply(clean_num)
+        df['Res_Fee_Unit'] = df['Res_Fee_Unit'].apply(clean_num)
+
+        return compact_frame(df[['Ticker', 'TWh', 'Price_Delta', 'Res_Fee_Unit']], labels=["Ticker"])
+    except Exception as e:
+        loader_notice("error", f"Physical Data Load Error: {e}")
+        # Fallback empty or local
+        try:
+             df = pd.read_csv("data/Physical_Metrics.csv")
+             # Apply same logic... (omitted for brevity, assume similar structure or handle basic)
+             # Basic rename
+             df = df.rename(columns={df.columns[0]:"Ticker_Raw", df.columns[1]:"TWh", df.columns[2]:"Price_Delta", df.columns[3]:"Res_Fee_Unit"})
+             df['Ticker'] = df['Ticker_Raw'].apply(lambda x: x.split('(')[-1].replace(')', '').strip() if '(' in str(x) else str(x))
+             return df
+        except:
+             return pd.DataFrame()
+
+# 履歴上の位置 (signal_context) 用の L2 シグナルの長期履歴。チャート用の直近 300 件とは別に、開始日を固定して取る
+# （開始日が毎日ずれると全期間パーセンタイルが短い窓のものになり、系列の先頭も毎日変わる）。
+L2_SIGNAL_HISTORY_START = "2018-04-01"  # SOFR の公表開始（IORB は 2021-07 から）
+
+@cached_stage("load_l2_signal_history", ttl=3600)
+def load_l2_signal_history():
+    """{名前: 日付 index の系列}: SOFR - IORB (%)・TNX の 5 日移動平均乖離・実質金利 DFII10 (%)"""
+    def fred(series_id):
+        df = fetch_hy_oas_series(series_id, limit=100000, observation_start=L2_SIGNAL_HISTORY_START)
+        return df.set_index("date")["value"] if not df.empty else pd.Series(dtype=float)
+
+    signals = {
+        "l2_sofr_spread": (fred("SOFR") - fred("IORB")).dropna(),
+        "l2_real_yield": fred("DFII10"),
+    }
+    try:
+        providers.throttle("yfinance", 0.2)
+        tnx = providers.yf_history("^TNX", start=L2_SIGNAL_HISTORY_START)["Close"]
+        tnx.index = naive_dates(tnx.index)
+        signals["l2_tnx_dev"] = (tnx - tnx.rolling(window=5).mean()).dropna()
+    except Exception as e:
+        loader_notice("warning", f"TNX history fetch error: {e}")
+        signals["l2_tnx_dev"] = pd.Series(dtype=float)
+    return signals
+
+# C2E の入力も L2 と同じく開始日を固定する（全期間パーセンタイル・タイムラインの先頭が日々ずれず、
+# どのレプリカ・再起動後でも同じ期間になる）。先行・遅行の推定だけは直近 C2E_HISTORY_DAYS に絞る。
+C2E_HISTORY_START = "2018-06-01"  # SRVR の上場 (2018-05) 以降
+C2E_HISTORY_DAYS = 365 * 3
+
+@cached_stage("load_c2e_inputs", ttl=3600)
+def load_c2e_inputs():
+    """
+    SRVR/VNQ・SemiEq/SOXX・HY OAS (bps) を共通営業日に整列した C2E_HISTORY_START 以降の全履歴
+    """
+    tickers = ["SRVR", "VNQ", "AMAT", "LRCX", "KLAC", "ASML", "SOXX"]
+    days = (date.today() - date.fromisoformat(C2E_HISTORY_START)).days
+    px_all = fetch_price_series(tickers, days=days)
+    if px_all.empty or not all(t in px_all.columns for t in tickers):
+        return pd.DataFrame()
+
+    ratio_dc = px_all["SRVR"] / px_all["VNQ"]
+    semi_eq = px_all[["AMAT", "LRCX", "KLAC", "ASML"]].mean(axis=1)
+    ratio_semi = semi_eq / px_all["SOXX"]
+
+    hy_start = (date.fromisoformat(C2E_HISTORY_START) - timedelta(days=45)).strftime("%Y-%m-%d")
+    df_hy = fetch_hy_oas_series(limit=100000, observation_start=hy_start)
+
+    return align_c2e_inputs(ratio_dc, ratio_semi, df_hy)
+
+# --- New: Danger Source Data (Equity / Credit Proxies) ---
+# 危険源モニタ用の価格データ
+# - Semi 装置: AMAT, LRCX, KLAC, ASML（等ウェイト合成）
+# - セクター: SOXX
+# - Credit Proxy: DC/インフラ系 REIT vs HY ETF
+#   ※ETFは無料で取れる代替として扱う
+DANGER_GROUPS = {
+    "semi_equip": ["AMAT", "LRCX", "KLAC", "ASML"],
+    "sector": ["SOXX"],
+    "dc_credit_proxy": ["SRVR"],   # データセンター REIT ETF 例
+    "hy_proxy": ["HYG"],           # ハイイールドETF 例
+}
+DANGER_HISTORY_DAYS = 365  # 1年分
+DANGER_TTL = 3600
+DANGER_RETRY_S = int(os.environ.get("DANGER_RETRY_S", "600"))  # 取得に失敗した銘柄を取り直すまでの間隔
+
+def danger_window_start():
+    return pd.Timestamp(datetime.utcnow() - timedelta(days=DANGER_HISTORY_DAYS)).normalize()
+
+# PRICE_STORE_DIR を設定すると、この価格パネルをホスト共有の memmap ストア (panel_store.py) に置き、
+# 全プロセス・全セッションが同じページをコピーせずに読む（グループはストア上で隣り合う列なのでビューのまま）。
+# 未設定なら従来どおりプロセスごとのローダーキャッシュ。
+PRICE_STORE_DIR = os.environ.get("PRICE_STORE_DIR")
+
+@st.cache_resource
+def get_price_store():
+    return PricePanelStore(PRICE_STORE_DIR) if PRICE_STORE_DIR else None
+
+@perf.traced("download_danger_prices")
+def download_danger_prices(tickers=None):
+    """DANGER_GROUPS の全銘柄（または tickers だけ）の終値を 1 枚の date × ticker パネルに（グループ順の列）"""
+    end = datetime.utcnow()
+    start = end - timedelta(days=DANGER_HISTORY_DAYS)
+
+    closes = {}
+    for names in DANGER_GROUPS.values():
+        for t in names:
+            if tickers is not None and t not in tickers:
+                continue
+            try:
+                hist = providers.yf_history(t, start=start, end=end)
+                if hist.empty:
+                    continue
+                closes[t] = hist['Close']
+            except Exception as e:
+                loader_notice("warning", f"Error fetching {t} for danger source: {e}")
+    if not closes:
+        skip_cache()
+        return pd.DataFrame()
+    # 銘柄ごとに join を重ねず、1 回の concat で揃える
+    return compact_prices(pd.concat(closes, axis=1))
+
+def split_danger_groups(panel):
+    """パネル -> {グループ: そのグループの列}（取得できた銘柄が無いグループは含めない）"""
+    data = {}
+    for group, names in DANGER_GROUPS.items():
+        cols = [t for t in names if t in panel.columns]
+        if cols:
+            data[group] = panel[cols].dropna(how="all")
+    return data
+
+@cached_stage("get_danger_source_data", ttl=DANGER_TTL)
+def fetch_danger_source_data():
+    return split_danger_groups(download_danger_prices())
+
+@cached_stage("sync_danger_store", ttl=DANGER_TTL)
+def sync_danger_store():
+    """
+    ストアが古い・銘柄が足りないときだけ取得して書き足す。判定から書き込みまでホスト内の書き手ロックを持つので、
+    待っている間に別プロセスが更新していれば取得しない。古ければ全銘柄、そうでなければ足りない銘柄だけを取り、
+    保持期間より古い行は落とす。取得に失敗した銘柄は DANGER_RETRY_S 経つまで取り直さない。
+    Returns: 現行バージョン名（キャッシュに載るのはこの文字列だけ）
+    """
+    store = get_price_store()
+    tickers = [t for names in DANGER_GROUPS.values() for t in names]
+
+    def due(panel):
+        retry_later = store.failed(max_age=DANGER_RETRY_S)
+        stale = panel is None or panel.age() > DANGER_TTL
+        return [t for t in tickers if (stale or t not in panel) and t not in retry_later]
+
+    panel = store.current()
+    if due(panel):
+        with store.writer():
+            panel = store.current()
+            todo = due(panel)
+            if todo:
+                fresh = download_danger_prices(todo)
+                store.mark_failed([t for t in todo if t not in fresh.columns])
+                if not fresh.empty:
+                    panel = store.upsert(fresh, start=danger_window_start())
+    if panel is None or store.failed(max_age=DANGER_RETRY_S):
+        skip_cache()  # 取り直し待ちの銘柄がある間は、次の実行でもう一度判定する
+    return panel.version if panel is not None else None
+
+def get_danger_source_data():
+    store = get_price_store()
+    if store is None:
+        return fetch_danger_source_data()
+    if sync_danger_store() is None:
+        return {}
+    panel = store.current()
+    start = danger_window_start()
+    data = {}
+    for group, names in DANGER_GROUPS.items():
+        if any(t in panel for t in names):
+            data[group] = panel.frame(names, start=start)
+    return data
+
+@cached_stage("get_spx_return_1m", ttl=3600)
+def get_spx_return_1m():
+    try:
+        spx_hist = providers.yf_history("^GSPC", period="1mo")
+        if spx_hist.empty:
+            skip_cache()
+            return 0.0
+        return spx_hist['Close'].iloc[-1] / spx_hist['Close'].iloc[0] - 1.0
     except:
-        return default
+        skip_cache()
+        return 0.0
+
+# --- APLC-5 / Survivor Universe ---
+APLC5_TICKERS = ["AMZN", "MSFT", "GOOGL", "META", "NVDA"]
+SURVIVOR_UNIVERSE = ["AMAT", "LRCX", "KLAC", "ASML", "TER"]
+PHYSICAL_COLS = ['TWh', 'Price_Delta', 'Res_Fee_Unit']
+
+# --- Metric Graph ---
+# 物理シート + 財務 → ベース → APLC-5 / Survivor の切り出し → CapEx 監査 → PSR (料金) → カード・パネル、
+# の連鎖を metric_graph.py のノードとして宣言する。各ノードは入力のバージョン（値の指紋）で全セッション共有の
+# メモを持つので、料金スライダーを動かしても再計算されるのは料金より下流のノードだけ。
+# メモの値はセッション間で共有されるので変更しないこと（列は psr_overlay のように新しいフレームへ重ねる）。
+# pandas 3 は Copy-on-Write が常に有効なので既存列のデータは共有され、増えるのは重ねた列ぶんだけ。
+# それ以前の pandas ではグローバル設定を切り替えず、重ねる側で明示的にコピーする（engines.overlay_psr）。
+
+METRIC_MEMO_SIZE = int(os.environ.get("METRIC_MEMO_SIZE", "8"))
+
+@st.cache_resource
+def get_metric_graph():
+    return MetricGraph(memo_size=METRIC_MEMO_SIZE)
+
+metric_graph = get_metric_graph()
+
+def metric_run(fee, rules):
+    """このスクリプト実行の評価（ソースのローダーは必要になったときに 1 回だけ呼ぶ）。"""
+    return metric_graph.run(
+        live_metrics=get_live_metrics_v2,
+        physical=load_physical_metrics,
+        capex_audit=lambda: build_capex_audit_from_yf(APLC5_TICKERS),
+        spx_ret=get_spx_return_1m,
+        fee=fee,
+        rules=rules,
+    )
+
+@metric_graph.node("live_metrics", "physical")
+def base(live_metrics, physical):
+    """財務 + 物理（全銘柄、料金非依存）"""
+    df = pd.merge(live_metrics, physical, on='Ticker', how='left')
+    # Fill NaNs for physics with 0
+    df[PHYSICAL_COLS] = df[PHYSICAL_COLS].fillna(0)
+    return df
+
+@metric_graph.node("base", "capex_audit")
+def aplc_base(base, capex_audit):
+    """APLC-5 の行 + CapEx 監査比率"""
+    aplc = pd.merge(base[base['Ticker'].isin(APLC5_TICKERS)], capex_audit, on="Ticker", how="left")
+    return capex_audit_ratios(aplc)
+
+@metric_graph.node("base")
+def survivor_base(base):
+    """Survivor 既定ユニバースの行"""
+    return base[base['Ticker'].isin(SURVIVOR_UNIVERSE)]
+
+@metric_graph.node("aplc_base", "fee", "rules")
+def aplc_metrics(aplc_base, fee, rules):
+    """APLC-5 の PSR と CapEx 健全性"""
+    df = psr_overlay(aplc_base, fee)
+    return df.assign(CapExHealth=classify_capex_health_arrays(df["PSR"], df["CapEx_to_NI"], df["CapEx_to_OCF"], rules))
+
+@metric_graph.node("survivor_base", "fee")
+def survivor_metrics(survivor_base, fee):
+    return psr_overlay(survivor_base, fee)
+
+@metric_graph.node("aplc_metrics", "spx_ret")
+def physical_vs_market(aplc_metrics, spx_ret):
+    """
+    最弱PSRと指数リターンのミスマッチを判定する材料を出す
+    """
+    if aplc_metrics.empty or 'PSR' not in aplc_metrics.columns:
+        return None
+    # 既に作っている APLC-5 の最弱 PSR と、指数リターン（ここでは SPX を代表に）
+    return {
+        "min_psr": aplc_metrics['PSR'].min(),
+        "spx_ret": spx_ret
+    }
+
+def psr_overlay(df, fee):
+    """
+    料金依存の列を重ねた新しいフレーム（engines.overlay_psr、df は変更しない）。
+    """
+    with perf.trace("compute:psr"):
+        return overlay_psr(df, fee)
+
+# --- Prefetch ---
+# すべてのローダーを先にスレッドプールで並列に走らせ、見出し・説明・スケルトンはすぐ描く。
+# 各パネルは同じローダーを普通に呼ぶだけでよい: 取得済みならキャッシュヒット、
+# 取得中ならローダーキャッシュのキー単位の計算ロックで完了を待つ（二重取得はしない）。
+
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "8"))
+
+@st.cache_resource
+def get_prefetch_pool():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+def prefetch(*calls):
+    """呼び出し（引数なしの callable）をプールへ投げる。失敗は本体側の呼び出しで改めて扱われる。"""
+    pool = get_prefetch_pool()
+    return [pool.submit(call) for call in calls]
+
+prefetch(
+    get_live_metrics_v2,
+    get_market_data_fred_yfinance_v2,
+    load_config,
+    load_mock_liquidity,
+    load_physical_metrics,
+    lambda: build_capex_audit_from_yf(APLC5_TICKERS),
+    load_c2e_inputs,  # 伝播モニターの 120 日分 (SRVR/VNQ, 装置 4 社/SOXX) もここで取得した履歴から切り出す
+    fetch_hy_oas_series,
+    load_l2_signal_history,
+    get_danger_source_data,
+    get_spx_return_1m,
+)
 
 # --- Logic ---
 # Global Logic for Layout Control removed as requested.
@@ -796,14 +1496,7 @@ with c_head_L:
 with c_head_R:
     # Right align language
     st.markdown('<div style="text-align: right; margin-top: 10px;">', unsafe_allow_html=True)
-    selected_lang = st.radio("Lang", ["JP", "EN"], index=0 if lang=="日本語" else 1, horizontal=True, label_visibility="collapsed", key="lang_main")
-    
-    if selected_lang == "JP" and lang != "日本語":
-        set_lang("日本語")
-        st.rerun()
-    elif selected_lang == "EN" and lang != "English":
-        set_lang("English")
-        st.rerun()
+    st.radio("Lang", ["JP", "EN"], index=0 if lang=="日本語" else 1, horizontal=True, label_visibility="collapsed", key="lang_main", on_change=on_lang_change)
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Purpose Explanation (Moved here)
@@ -819,7 +1512,31 @@ tab_titles = {
 }
 tabs = st.tabs(tab_titles[lang])
 
+def skeleton_html(rows=((4, 140), (1, 200))):
+    """(列数, 高さ px) の行を並べたプレースホルダ。"""
+    return "".join(
+        '<div class="skeleton-row">'
+        + f'<div class="skeleton-block" style="height:{h}px;"></div>' * n
+        + "</div>"
+        for n, h in rows
+    )
+
+# Every tab shows its skeleton right away; each tab clears its own when it starts rendering
+tab_skeletons = []
+for tab in tabs:
+    with tab:
+        ph = st.empty()
+        ph.markdown(skeleton_html(), unsafe_allow_html=True)
+        tab_skeletons.append(ph)
+
+# Load (prefetched: cache hit, or wait for the in-flight fetch)
+config_df = load_config()
+rulebook = load_rulebook(config_df)
+market_data = get_market_data_fred_yfinance_v2()
+liquidity_df_mock = load_mock_liquidity()
+
 with tabs[0]:
+    tab_skeletons[0].empty()
     # Layer 1
     st.subheader(TRANSLATIONS['l1_title'][lang])
     st.markdown(TRANSLATIONS['l1_desc'][lang], unsafe_allow_html=True)
@@ -840,74 +1557,6 @@ with tabs[0]:
         }
     }
 
-    # --- New Data Source: Physical Metrics ---
-    PHYSICAL_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRgul7PbiP2EYy8KiPmMglhd2R-oXTriikeZCZxQHKtrxLgbwJyEiGuprBsdAEDMR_F2te9E2GQRTYb/pub?output=csv"
-
-    @st.cache_data(ttl=3600)
-    def load_physical_metrics():
-        try:
-            df = pd.read_csv(PHYSICAL_SHEET_URL)
-            # Rename Japanese columns to internal English keys
-            # 銘柄 (Ticker), 電力総使用量 (Annual TWh), 電力上昇単価 (Δ$/MWh), 予約費用単価 (加重 $/MW-day), ...
-            col_map = {
-                "銘柄 (Ticker)": "Ticker_Raw",
-                "電力総使用量 (Annual TWh)": "TWh",
-                "電力上昇単価 (Δ$/MWh)": "Price_Delta",
-                "予約費用単価 (加重 $/MW-day)": "Res_Fee_Unit"
-            }
-            # Check if columns exist (sometimes names vary slightly)
-            df_cols = df.columns.tolist()
-            # Simple mapping by index if names are tricky, but let's try strict first or soft match
-            # Let's map by likely position if standard map fails? 
-            # Actually, let's just rename based on known Japanese headers provided in inspection.
-            
-            # Clean specific chars like $, \n etc if needed, but CSV usually handles cleanly.
-            # But wait, Ticker_Raw is "Amazon (AMZN)". Need to extract AMZN.
-            
-            df_clean = pd.DataFrame()
-            # Find column checking
-            for c in df.columns:
-                if "Ticker" in c: col_map[c] = "Ticker_Raw"
-                elif "TWh" in c: col_map[c] = "TWh"
-                elif "Δ$/MWh" in c: col_map[c] = "Price_Delta"
-                elif "MW-day" in c: col_map[c] = "Res_Fee_Unit"
-                
-            df = df.rename(columns=col_map)
-            
-            # Extract Ticker
-            df['Ticker'] = df['Ticker_Raw'].apply(lambda x: x.split('(')[-1].replace(')', '').strip() if '(' in str(x) else str(x))
-            
-            # Clean numeric columns (remove $, +, etc)
-            def clean_num(x):
-                if isinstance(x, str):
-                    return float(x.replace('$','').replace('+','').replace(',',''))
-                return float(x)
-                
-            df['TWh'] = df['TWh'].apply(clean_num)
-            df['Price_Delta'] = df['Price_Delta'].apply(clean_num)
-            df['Res_Fee_Unit'] = df['Res_Fee_Unit'].apply(clean_num)
-            
-            return df[['Ticker', 'TWh', 'Price_Delta', 'Res_Fee_Unit']]
-        except Exception as e:
-            st.error(f"Physical Data Load Error: {e}")
-            # Fallback empty or local
-            try:
-                 df = pd.read_csv("data/Physical_Metrics.csv")
-                 # Apply same logic... (omitted for brevity, assume similar structure or handle basic)
-                 # Basic rename
-                 df = df.rename(columns={df.columns[0]:"Ticker_Raw", df.columns[1]:"TWh", df.columns[2]:"Price_Delta", df.columns[3]:"Res_Fee_Unit"})
-                 df['Ticker'] = df['Ticker_Raw'].apply(lambda x: x.split('(')[-1].replace(')', '').strip() if '(' in str(x) else str(x))
-                 return df
-            except:
-                 return pd.DataFrame()
-
-    physical_df = load_physical_metrics()
-
-    # Merge Physical with Financials
-    metrics_df = pd.merge(metrics_df, physical_df, on='Ticker', how='left')
-    # Fill NaNs for physics with 0
-    metrics_df[['TWh', 'Price_Delta', 'Res_Fee_Unit']] = metrics_df[['TWh', 'Price_Delta', 'Res_Fee_Unit']].fillna(0)
-
     # --- Logic: Calculate PSR ---
     # PSR = FCF / (CapEx + Delta_Elec + Res_Fee)
     # Delta_Elec = TWh * 1,000,000 * Price_Delta
@@ -926,108 +1575,28 @@ with tabs[0]:
     # Let's ESTIMATE MW from TWh assuming Data Center load factor (e.g. 90% or 100% flat?).
     # MW = (TWh * 1,000,000) / (24 * 365). 
     # Let's use that for now to complete the logic.
-
-    def calc_psr_row(row):
-        fcf = row['FCF']
-        capex = abs(row['CapEx']) # Ensure positive
-        
-        # Physics
-        twh = row['TWh']
-        p_delta = row['Price_Delta']
-        res_unit = row['Res_Fee_Unit']
-        
-        # 1. Delta Electricity Cost
-        # TWh * 1,000,000 (MWh) * Price Delta
-        delta_elec_cost = twh * 1_000_000 * p_delta
-        
-        # 2. Reservation Fee
-        # MW = (TWh * 1e6) / 8760 (Assuming 100% Load Factor)
-        est_mw = (twh * 1_000_000) / 8760
-        
-        # Fee = MW * UnitPrice * 365
-        res_fee_cost = est_mw * res_unit * 365
-        
-        # Total Physical Burden
-        burden = capex + delta_elec_cost + res_fee_cost
-        
-        psr = fcf / burden if burden > 0 else 0
-        return psr, delta_elec_cost, res_fee_cost, burden
-
-    # Apply
-    metrics_df[['PSR', 'Cost_Elec', 'Cost_Res', 'Total_Burden']] = metrics_df.apply(lambda r: pd.Series(calc_psr_row(r)), axis=1)
-
-
-    # --- APLC-5 Specific Logic ---
-    APLC5_TICKERS = ["AMZN", "MSFT", "GOOGL", "META", "NVDA"]
-    SURVIVOR_UNIVERSE = ["AMAT", "LRCX", "KLAC", "ASML", "TER"]
-
-    # Filter for APLC-5 (Delayed to after Calculation to capture Survivor Data)
-    # metrics_df = metrics_df[metrics_df['Ticker'].isin(APLC5_TICKERS)].copy()
+    # -> engines.compute_psr でベクトル化（予約費用単価はサイドバーのスライダー値）
 
     # Sensitivity Slider (Placed in Sidebar)
     with st.sidebar:
         st.divider()
         st.markdown(f"### {TRANSLATIONS['sidebar_stress'][lang]}")
         # Default to PJM approx ($315)
-        global_res_fee = st.slider(TRANSLATIONS['sidebar_fee'][lang], 0.0, 1000.0, 315.0, 5.0, help="Adjust PJM/Global capacity reservation costs")
+        global_res_fee = st.slider(TRANSLATIONS['sidebar_fee'][lang], 0.0, 1000.0, 315.0, 5.0, help="Adjust PJM/Global capacity reservation costs", key="res_fee")
 
         
         # Delta Price Slider (Optional, but good for sensitivity)
         # global_price_delta = st.slider("Elec. Price Delta ($/MWh)", 0.0, 100.0, 30.0) 
         # For now, just Fee as requested.
 
-    # --- PSR Calculation with Sensitivity ---
-    def calc_psr_row(row, override_fee):
-        fcf = row['FCF']
-        capex = abs(row['CapEx']) 
-        
-        # Physics
-        twh = row['TWh']
-        p_delta = row['Price_Delta']
-        
-        # Use Slider Value for Sensitivity (Global Stress)
-        # Or keep individual if slider is at "default"? 
-        # Prompt says: "When PJM price is manipulated... 5 companies fluctuate".
-        # This implies using the slider value as the active unit price.
-        res_unit = override_fee
-        
-        # 1. Delta Electricity Cost
-        delta_elec_cost = twh * 1_000_000 * p_delta
-        
-        # 2. Reservation Fee
-        # MW = (TWh * 1e6) / 8760
-        est_mw = (twh * 1_000_000) / 8760
-        
-        # Fee = MW * UnitPrice * 365
-        res_fee_cost = est_mw * res_unit * 365
-        
-        # Total Physical Burden
-        burden = capex + delta_elec_cost + res_fee_cost
-        
-        psr = fcf / burden if burden > 0 else 0
-        return psr, delta_elec_cost, res_fee_cost, burden
-
-    # Apply Calculation
-    metrics_df[['PSR', 'Cost_Elec', 'Cost_Res', 'Total_Burden']] = metrics_df.apply(
-        lambda r: pd.Series(calc_psr_row(r, global_res_fee)), axis=1
-    )
-
-    # --- Split Dataframes ---
-    # Save Full/Survivor data
-    survivor_df = metrics_df[metrics_df['Ticker'].isin(SURVIVOR_UNIVERSE)].copy()
-
-    # Filter for APLC-5 (Restoring original variable for downstream APLC cards)
-    metrics_df = metrics_df[metrics_df['Ticker'].isin(APLC5_TICKERS)].copy()
-
-    # --- CapEx Audit Integration ---
-    capex_audit_df = build_capex_audit_from_yf(APLC5_TICKERS)
-    metrics_df = pd.merge(metrics_df, capex_audit_df, on="Ticker", how="left")
-
-    # Metrics Calc (Defense against NaN)
-    metrics_df["CapEx_to_NI"] = np.where(metrics_df["NI_Q"].abs() > 0, metrics_df["CapEx_Q"].abs() / metrics_df["NI_Q"].abs(), np.nan)
-    metrics_df["CapEx_to_OCF"] = np.where(metrics_df["OCF_Q"].abs() > 0, metrics_df["CapEx_Q"].abs() / metrics_df["OCF_Q"].abs(), np.nan)
+        st.divider()
+        st.toggle(TRANSLATIONS['sidebar_full_res'][lang], value=False, key="chart_full_res",
+                  help=f"Off: long series are downsampled (LTTB) to {CHART_MAX_POINTS} points per line")
 
-    metrics_df["CapExHealth"] = metrics_df.apply(classify_capex_health, axis=1)
+    # Metric graph: only the nodes downstream of a changed input (e.g. the fee) are recomputed
+    metrics = metric_run(global_res_fee, rulebook)
+    metrics_df = metrics["aplc_metrics"]
+    survivor_df = metrics["survivor_metrics"]
 
 
     # --- APLC-5 Status Definitions ---
@@ -1066,17 +1635,13 @@ with tabs[0]:
         }
     }
 
-    def get_psr_level(psr):
-        if psr > 1.4: return "LEVEL_1"
-        elif psr >= 1.1: return "LEVEL_2"
-        elif psr >= 1.0: return "LEVEL_3"
-        else: return "LEVEL_4"
+    psr_levels = rulebook.evaluate("psr_level", metrics_df["PSR"])
 
     # --- Main Indicator: Minimum PSR ---
     min_psr_row = metrics_df.loc[metrics_df['PSR'].idxmin()]
     min_psr_val = min_psr_row['PSR']
     min_psr_ticker = min_psr_row['Ticker']
-    min_level_key = get_psr_level(min_psr_val)
+    min_level_key = rulebook.evaluate("psr_level", min_psr_val)
     min_level_data = APLC_MESSAGES[min_level_key]
 
     l1_msg_key = "JP" if lang == "日本語" else "EN"
@@ -1115,72 +1680,17 @@ with tabs[0]:
 
 
 
-    # Cards (Fixed Loop Bug: use reset_index to ensure 0-based idx for columns)
-    cols = st.columns(len(metrics_df)) 
-    for idx, row in metrics_df.reset_index(drop=True).iterrows():
-        ticker = row['Ticker']
-        price = row['Price']
-        psr = row['PSR']
-        fcf = row['FCF']
-        burden = row['Total_Burden']
-        
-        capex = abs(row['CapEx'])
-        c_elec = row['Cost_Elec']
-        c_res = row['Cost_Res']
-        
-
-        # --- CapEx Health Logic (UI) ---
-        health = row.get("CapExHealth", "HEALTHY")
-        health_color_map = {
-            "HEALTHY": "#28A745",
-            "BOUNDARY": "#FFC107",
-            "BLACK_HOLE": "#DC3545"
-        }
-        health_color = health_color_map.get(health, "#6c757d")
-        
-        # Translate status
-        health_label = t_capex_health(health, lang)
-        health_desc  = t_capex_desc(health, lang)
-        status_title = "CapEx Status:" if lang == "English" else "CapEx 状態:"
-
-        # Level Determine
-        lvl_key = get_psr_level(psr)
-        lvl_data = APLC_MESSAGES[lvl_key]
-        
-        # Card styling (Clean container)
-        # Use border-top instead of inner div to ensure visibility
-        
-        with cols[idx % 5]:
-            st.markdown(f"""
-            <div class="metric-card" style="border-top: 4px solid {lvl_data['Color']}; padding: 15px;">
-                <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom: 5px;">
-                    <h3 style="margin:0; font-size:1.1rem;">{ticker}</h3>
-                    <span style="font-weight:bold; color:#888; font-size: 0.9rem;">${price:,.0f}</span>
-                </div>
-                <div style="font-size:0.7rem; color:#888;">{label_psr}</div>
-                <div style="font-size:1.8rem; font-weight:800; color:{lvl_data['Color']}; margin-bottom: 5px;">
-                    {psr:.2f}
-                </div>
-                 <div style="font-size:0.7rem; color:{lvl_data['Color']}; font-weight:bold; margin-bottom: 8px;">
-                    {lvl_data[title_key]}
-                </div>
-                <div style="font-size:0.65rem; color:#666; background:#f8f9fa; padding:6px; border-radius:4px;">
-                    <div style="display:flex; justify-content:space-between;">
-                        <span>{TRANSLATIONS['fcf_label'][lang]}</span>
-                        <span>${fcf/1e9:,.2f}B</span>
-                    </div>
-                    <div style="border-top:1px solid #ddd; margin-top:2px; padding-top:2px; display:flex; justify-content:space-between;">
-                        <span>{TRANSLATIONS['burden_label'][lang]}</span>
-                        <span>${burden/1e9:,.2f}B</span>
-                    </div>
-                    <div style="margin-top:4px; padding-top:4px; border-top:1px dashed #eee; color:#888; font-size: 0.6rem; display: flex; flex-wrap: wrap; gap: 8px; justify-content: flex-end;">
-                       <span>{TRANSLATIONS['capex_label'][lang]}: ${capex/1e9:,.2f}B</span>
-                       <span>{TRANSLATIONS['elec_label'][lang]}: ${c_elec/1e9:,.2f}B</span>
-                       <span>{TRANSLATIONS['res_label'][lang]}: ${c_res/1e9:,.2f}B</span>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Cards: one grid element for the whole row (cards.py)
+    aplc_cards = []
+    breakdown_labels = [TRANSLATIONS['capex_label'][lang], TRANSLATIONS['elec_label'][lang], TRANSLATIONS['res_label'][lang]]
+    for row, level in zip(metrics_df.itertuples(index=False), psr_levels):
+        lvl_data = APLC_MESSAGES[level]
+        aplc_cards.append(aplc_card(
+            row.Ticker, row.Price, label_psr, row.PSR, lvl_data[title_key], lvl_data['Color'],
+            TRANSLATIONS['fcf_label'][lang], row.FCF, TRANSLATIONS['burden_label'][lang], row.Total_Burden,
+            zip(breakdown_labels, [abs(row.CapEx), row.Cost_Elec, row.Cost_Res]),
+        ))
+    st.markdown(card_grid(aplc_cards, columns=5), unsafe_allow_html=True)
 
     # --- CapEx Audit Table UI (Moved) ---
     st.markdown('<div style="margin-top: 30px;"></div>', unsafe_allow_html=True)
@@ -1242,27 +1752,13 @@ with tabs[0]:
     )
 
     # --- Legend Section (Moved) ---
-    legend_cols = st.columns(3)
     status_keys = ["HEALTHY", "BOUNDARY", "BLACK_HOLE"]
     status_colors = {"HEALTHY": "#28A745", "BOUNDARY": "#BD8804", "BLACK_HOLE": "#DC3545"}
     icons = {"HEALTHY": "🟢", "BOUNDARY": "🟡", "BLACK_HOLE": "🔴"}
-
-    for i, key in enumerate(status_keys):
-        c_label = CAPEX_STATUS_LABELS[key][lang]
-        c_desc = CAPEX_HEALTH_DESC[key][lang]
-        c_color = status_colors[key]
-        
-        with legend_cols[i]:
-            st.markdown(f"""
-            <div style="background-color: #f8f9fa; padding: 10px; border-radius: 5px; height: 100%;">
-                <div style="color: {c_color}; font-weight: bold; margin-bottom: 5px;">
-                    {icons[key]} {c_label}
-                </div>
-                <div style="font-size: 0.8rem; line-height: 1.4; color: #555;">
-                    {c_desc}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    st.markdown(card_grid([
+        legend_item(icons[key], CAPEX_STATUS_LABELS[key][lang], CAPEX_HEALTH_DESC[key][lang], status_colors[key])
+        for key in status_keys
+    ], columns=3), unsafe_allow_html=True)
 
     st.markdown('<div style="margin-bottom: 30px;"></div>', unsafe_allow_html=True)
 
@@ -1342,18 +1838,19 @@ L2_MESSAGES = {
 }
 
 # --- UI Helper Functions ---
-def render_metric_card(col, title, value_str, status, msg_dict, lang, chart_fig=None):
+def render_metric_cards(cards, lang):
     """
-    Renders a unified metric card with:
-    - Left-aligned text
+    Renders a row of unified metric cards in one element (cards.card_grid):
     - Top border color based on status
     - Embedded description
-    - Optional chart below the card
+    - Optional chart below each card: with any chart, each card and its chart share one
+      st.columns cell so the sparkline stays directly under its card
+    cards: list of dict(title, value_str, status, msg_dict, chart_fig=None)
     """
-    
+
     # Map status to color and icon (Unified Scheme based on Danger Source Monitor)
     # Status input can be: "HEALTHY"/"WARNING"/"CRITICAL" OR "NORMAL"/"WATCH"/"DANGER"
-    
+
     # Normalizing status to internal keys for color mapping
     status_map = {
         "HEALTHY": "NORMAL", "NORMAL": "NORMAL",
@@ -1361,16 +1858,14 @@ def render_metric_card(col, title, value_str, status, msg_dict, lang, chart_fig=
         "CRITICAL": "DANGER", "DANGER": "DANGER",
         "UNKNOWN": "UNKNOWN"
     }
-    
-    normalized_status = status_map.get(status, "UNKNOWN")
-    
+
     colors = {
         "DANGER": "#DC3545", # Red
         "WATCH": "#FFC107",  # Yellow
         "NORMAL": "#28A745", # Green
         "UNKNOWN": "#6c757d" # Gray
     }
-    
+
     icons = {
         "DANGER": "🔴",
         "WATCH": "🟡",
@@ -1378,74 +1873,66 @@ def render_metric_card(col, title, value_str, status, msg_dict, lang, chart_fig=
         "UNKNOWN": "⚪"
     }
 
-    c = colors.get(normalized_status, "#6c757d")
-    icon = icons.get(normalized_status, "⚪")
-    
-    # Get message
-    # msg_dict is expected to be { "STATUS": {"JP": "...", "EN": "..."} }
-    # Need to handle potential key mismatch if msg_dict uses different keys than status
-    # Assuming msg_dict keys match the input 'status' string exactly
-    
-    msg_obj = msg_dict.get(status, {})
-    msg = msg_obj.get("JP" if lang == "日本語" else "EN", "")
-    
-    with col:
-        st.markdown(f"""
-        <div class="metric-card" style="border-top:4px solid {c}; margin-bottom:10px;">
-          <div style="font-weight:600;margin-bottom:4px;">
-            {icon} {title}
-          </div>
-          <div style="font-size:0.85rem;margin-bottom:6px; font-weight:bold;">
-            {value_str}
-          </div>
-          <div style="font-size:0.75rem;color:#555;line-height:1.4;">
-            {msg}
-          </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if chart_fig:
-            st.plotly_chart(chart_fig, use_container_width=True, config={'displayModeBar': False})
-        elif chart_fig is not None: # explicitly passed as None implies "No Data" or intended empty
-             st.markdown(f"<div style='text-align:center; color:#999; font-size:0.8rem; margin-bottom:10px;'>*No Chart Data*</div>", unsafe_allow_html=True)
+    html_cards = []
+    for card in cards:
+        normalized_status = status_map.get(card["status"], "UNKNOWN")
+        # msg_dict is expected to be { "STATUS": {"JP": "...", "EN": "..."} }, keyed by the input status
+        msg = card["msg_dict"].get(card["status"], {}).get("JP" if lang == "日本語" else "EN", "")
+        html_cards.append(status_card(
+            card["title"], card["value_str"], msg,
+            colors.get(normalized_status, "#6c757d"), icons.get(normalized_status, "⚪"),
+        ))
+    if not any(card.get("chart_fig") for card in cards):
+        st.markdown(card_grid(html_cards, columns=len(cards)), unsafe_allow_html=True)
+        return
+    for col, card, html in zip(st.columns(len(cards)), cards, html_cards):
+        with col:
+            st.markdown(card_grid([html], columns=1), unsafe_allow_html=True)
+            if card.get("chart_fig"):
+                with perf.trace("plotly:metric_card"):
+                    st.plotly_chart(card["chart_fig"], use_container_width=True, config={'displayModeBar': False})
+
+# --- Signal Context (Historical Percentile / Z-Score) ---
+# 固定閾値のステータスに、各シグナル自身の履歴の中での位置（全期間 / 直近 1 年のパーセンタイルと Z スコア）を
+# 添える（signal_stats.py）。状態は全セッション共有で、再実行では新しい日の行だけを O(log n) で追加する。
+# 入力は開始日を固定した長期履歴（L2 は load_l2_signal_history、C2E は load_c2e_inputs）なので、
+# 全期間の窓は常に入力系列そのものになり、稼働時間やレプリカによって変わらない。
+SIGNAL_STATS_WINDOW = 252  # 直近 1 年（営業日）
+
+@st.cache_resource
+def get_signal_stats_cache():
+    return SignalStatsCache(window=SIGNAL_STATS_WINDOW)
+
+@perf.traced("compute:signal_stats")
+def signal_context(signals):
+    """{名前: 日付 index の系列} -> 各系列の最新日の Value / Pct / Z / Pct_Roll / Z_Roll"""
+    return get_signal_stats_cache().latest(signals)
+
+SIGNAL_CONTEXT_COLUMNS = {
+    "日本語": {"Value": "最新値", "Pct": "全期間パーセンタイル", "Z": "全期間 Z", "Pct_Roll": "1年パーセンタイル", "Z_Roll": "1年 Z"},
+    "English": {"Value": "Latest", "Pct": "Percentile (all)", "Z": "Z (all)", "Pct_Roll": "Percentile (1y)", "Z_Roll": "Z (1y)"},
+}
 
-# --- Logic Functions ---
-def evaluate_l2_status(sofr_spread, tnx_dev, real_yield, tail):
-    # 1. SOFR - IORB Logic
-    if sofr_spread > 0.05: s_sofr = "CRITICAL"
-    elif sofr_spread > 0.00: s_sofr = "WARNING"
-    else: s_sofr = "HEALTHY"
-    
-    # 2. TNX Deviation Logic
-    if tnx_dev > 0.15: s_tnx = "CRITICAL"
-    elif tnx_dev > 0.05: s_tnx = "WARNING"
-    else: s_tnx = "HEALTHY"
-    
-    # 3. Real Yield Logic
-    if real_yield > 2.50: s_real = "CRITICAL"
-    elif real_yield > 2.00: s_real = "WARNING"
-    else: s_real = "HEALTHY"
-    
-    # 4. Auction Tail Logic
-    if tail > 3.0: s_tail = "CRITICAL"
-    elif tail > 1.0: s_tail = "WARNING"
-    else: s_tail = "HEALTHY"
-    
-    # Composite Logic
-    results = [s_sofr, s_tnx, s_real, s_tail]
-    red_count = results.count("CRITICAL")
-    yellow_count = results.count("WARNING")
-    
-    if red_count >= 2:
-        comp_status = "CRITICAL"
-    elif (red_count + yellow_count) >= 2:
-        comp_status = "WARNING"
-    else:
-        comp_status = "HEALTHY"
-        
-    return comp_status, s_sofr, s_tnx, s_real, s_tail
+def render_signal_context(signals, labels, lang):
+    """
+    signals: {名前: 系列}, labels: {名前: 表示名}。履歴が空の系列は表に出さない。
+    """
+    table = signal_context(signals)
+    if table.empty:
+        return
+    cols = SIGNAL_CONTEXT_COLUMNS["日本語" if lang == "日本語" else "English"]
+    st.markdown("##### 履歴上の位置" if lang == "日本語" else "##### Historical Context")
+    st.dataframe(
+        table.rename(index=labels, columns=cols).style.format({
+            cols["Value"]: "{:.2f}", cols["Pct"]: "{:.0%}", cols["Z"]: "{:+.2f}",
+            cols["Pct_Roll"]: "{:.0%}", cols["Z_Roll"]: "{:+.2f}",
+        }, na_rep="-"),
+        use_container_width=True
+    )
 
+# --- Logic Functions ---
 with tabs[1]:
+    tab_skeletons[1].empty()
     # Liquidity Monitor (Title Updated: removed Layer 2 label)
     l2_title_clean = "Systemic Liquidity Friction Monitor" if lang == "English" else "システム流動性摩擦モニター"
     st.subheader(l2_title_clean)
@@ -1481,7 +1968,7 @@ with tabs[1]:
         cur_tail = val_tail_df['Treasury_Tail'].iloc[-1]
 
     # Evaluate
-    comp_stat, s_sofr, s_tnx, s_real, s_tail = evaluate_l2_status(cur_spread, cur_tnx_dev, cur_real_yield, cur_tail)
+    comp_stat, s_sofr, s_tnx, s_real, s_tail = evaluate_l2_status(cur_spread, cur_tnx_dev, cur_real_yield, cur_tail, rulebook)
 
     # Composite Panel
     l2_meta = STATUS_MAP[comp_stat]
@@ -1492,7 +1979,8 @@ with tabs[1]:
     </div>
     ''', unsafe_allow_html=True)
 
-    l2_c1, l2_c2, l2_c3, l2_c4 = st.columns(4)
+    # Card row is filled in below once the four charts are built
+    l2_cards_slot = st.container()
 
     chart_config = dict(
         paper_bgcolor='rgba(0,0,0,0)', 
@@ -1523,22 +2011,6 @@ C2E_MESSAGES = {
     }
 }
 
-def judge_credit_to_equity(credit_stress, equity_reaction):
-    """
-    credit_stress, equity_reaction ∈ {"LOW","MEDIUM","HIGH"}
-    """
-    # クレジット高ストレス & 株も崩れている → CRITICAL
-    if credit_stress == "HIGH" and equity_reaction == "HIGH":
-        return "CRITICAL"
-    # クレジット高ストレスだが株はまだ粘っている → WARNING
-    if credit_stress == "HIGH" and equity_reaction in ("LOW","MEDIUM"):
-        return "WARNING"
-    # クレジット中ストレス & 株中〜高反応 → WARNING
-    if credit_stress == "MEDIUM" and equity_reaction in ("MEDIUM","HIGH"):
-        return "WARNING"
-    # それ以外 → HEALTHY
-    return "HEALTHY"
-
 CREDIT_EQ_STATUS_TEXT = {
     "HEALTHY": {
         "JP": (
@@ -1593,27 +2065,6 @@ CREDIT_EQ_STATUS_TEXT = {
     }
 }
 
-def evaluate_credit_equity_status(dc_chg_30d: float, hy_oas_bps: float, semi_chg_30d: float) -> str:
-    """
-    三変数から Credit→Equity の構造ストレスレベルを判定
-    """
-    # 1. Determine Stress Levels
-    # Credit Stress (DC or HY)
-    c_stress = "LOW"
-    if hy_oas_bps > 450 or dc_chg_30d < -15.0:
-        c_stress = "HIGH"
-    elif hy_oas_bps > 350 or dc_chg_30d < -5.0:
-        c_stress = "MEDIUM"
-        
-    # Equity Reaction (Semi)
-    e_react = "LOW"
-    if semi_chg_30d < -15.0:
-        e_react = "HIGH"
-    elif semi_chg_30d < -5.0:
-        e_react = "MEDIUM"
-        
-    return judge_credit_to_equity(c_stress, e_react)
-
 # --- Individual Metric Status Logic ---
 
 DC_MONITOR_STATUS_TEXT = {
@@ -1661,35 +2112,83 @@ SEMI_MONITOR_STATUS_TEXT = {
     }
 }
 
-def classify_dc_status(dc_chg_30d: float) -> str:
-    if dc_chg_30d is None:
-        return "HEALTHY"
-    if dc_chg_30d > -5.0:
-        return "HEALTHY"
-    elif dc_chg_30d > -15.0:
-        return "WARNING"
-    else:
-        return "CRITICAL"
-
-def classify_hy_status(hy_oas_bps: float) -> str:
-    if hy_oas_bps is None:
-        return "HEALTHY"
-    if hy_oas_bps < 350:
-        return "HEALTHY"
-    elif hy_oas_bps < 450:
-        return "WARNING"
-    else:
-        return "CRITICAL"
-
-def classify_semi_status(semi_chg_30d: float) -> str:
-    if semi_chg_30d is None:
-        return "HEALTHY"
-    if semi_chg_30d > -5.0:
-        return "HEALTHY"
-    elif semi_chg_30d > -15.0:
-        return "WARNING"
-    else:
-        return "CRITICAL"
+# --- Credit → Equity Status History ---
+
+@st.cache_resource
+def get_c2e_history_cache():
+    # Shared across sessions; each update only computes the newly appended days
+    return C2EHistoryCache()
+
+@perf.traced("compute:c2e_history")
+def build_c2e_history(rules):
+    """
+    全履歴に Credit→Equity 判定を適用した日次系列
+    """
+    aligned = load_c2e_inputs()
+    if aligned.empty:
+        return pd.DataFrame()
+    return get_c2e_history_cache().update(aligned, rules)
+
+@cached_stage("get_lead_lag_estimates", ttl=3600)
+def get_lead_lag_estimates(aligned, max_lag=60):
+    """
+    DC → HY → Semi の先行・遅行日数（FFT 相互相関）
+    """
+    return estimate_lead_lag(c2e_change_signals(aligned), max_lag=max_lag)
+
+@cached_stage("c2e_snapshot", ttl=3600)
+def c2e_snapshot(rules):
+    """
+    伝播モニター 3 指標の計算スナップショット（比率系列・30日変化・各判定）。
+    言語に依存しないので、言語切替では再計算せず描画だけやり直す。
+    判定は rules（RuleBook）で行う。閾値が変わればキー（RuleBook の repr）も変わる。
+    """
+    snap = {"ratio_dc": None, "dc_chg_30d": None, "df_hy": None, "hy_oas_bps": None,
+            "ratio_semi": None, "semi_chg_30d": None}
+
+    # 1) DC Credit Calc (SRVR / VNQ)
+    px_dc = fetch_price_series(["SRVR", "VNQ"], days=120)
+    if not px_dc.empty and all(t in px_dc.columns for t in ["SRVR", "VNQ"]):
+        ratio_dc = px_dc["SRVR"] / px_dc["VNQ"]
+        snap["ratio_dc"] = ratio_dc
+        if len(ratio_dc) > 22:
+            snap["dc_chg_30d"] = multi_horizon_returns(ratio_dc.to_frame(), (22,)).iat[0, 0] * 100
+        else:
+            snap["dc_chg_30d"] = 0.0
+
+    # 2) HY OAS Calc
+    df_hy = fetch_hy_oas_series()
+    snap["df_hy"] = df_hy
+    if not df_hy.empty:
+        # FRED data is %, so 3.05 means 3.05%. bps = 305.
+        snap["hy_oas_bps"] = float(df_hy['value'].iloc[-1]) * 100
+
+    # 3) Semi Eq Calc
+    needed = ["AMAT", "LRCX", "KLAC", "ASML", "SOXX"]
+    px_semi = fetch_price_series(needed, days=120)
+    if not px_semi.empty and all(t in px_semi.columns for t in needed):
+        semi_eq = px_semi[["AMAT", "LRCX", "KLAC", "ASML"]].mean(axis=1)
+        ratio_semi = semi_eq / px_semi["SOXX"]
+        snap["ratio_semi"] = ratio_semi
+        if len(ratio_semi) > 22:
+            snap["semi_chg_30d"] = multi_horizon_returns(ratio_semi.to_frame(), (22,)).iat[0, 0] * 100
+        else:
+            snap["semi_chg_30d"] = 0.0
+
+    # --- Comprehensive Judgment ---
+    # 欠損（None）は NaN として判定 = 比較が成立しないので dc=0, hy=300, semi=0 と同じ
+    _, _, snap["status"] = classify_c2e_arrays(snap["dc_chg_30d"], snap["hy_oas_bps"], snap["semi_chg_30d"], rules)
+    snap["status_dc"] = rules.evaluate("dc_status", snap["dc_chg_30d"]) if snap["ratio_dc"] is not None else "UNKNOWN"
+    snap["status_hy"] = rules.evaluate("hy_status", snap["hy_oas_bps"]) if not df_hy.empty else "UNKNOWN"
+    snap["status_semi"] = rules.evaluate("semi_status", snap["semi_chg_30d"]) if snap["ratio_semi"] is not None else "UNKNOWN"
+    return snap
+
+# C2E タイムラインの行（図は常にこのキーで作り、表示名は描画時に labelalias で差し替える）
+C2E_TIMELINE_ROWS = ["Credit", "Equity", "C2E"]
+C2E_TIMELINE_LABELS = {
+    "日本語": {"Credit": "クレジット", "Equity": "株式反応", "C2E": "C2E 総合"},
+    "English": {"Credit": "Credit", "Equity": "Equity", "C2E": "C2E"},
+}
 
 # --- Credit → Equity Transmission Panel ---
 
@@ -1735,45 +2234,13 @@ def credit_to_equity_panel(lang: str):
     label_bps = "bps"
     label_no_data = "データなし" if lang == "日本語" else "No Data"
 
-    # --- Metrics Logic ---
-    dc_chg_30d = None
-    hy_oas_bps = None
-    semi_chg_30d = None
-
-    # 1) DC Credit Calc (SRVR / VNQ)
-    px_dc = fetch_price_series(["SRVR", "VNQ"], days=120)
-    ratio_dc = None
-    if not px_dc.empty and all(t in px_dc.columns for t in ["SRVR", "VNQ"]):
-        ratio_dc = px_dc["SRVR"] / px_dc["VNQ"]
-        if len(ratio_dc) > 22:
-            dc_chg_30d = (ratio_dc.iloc[-1] / ratio_dc.iloc[-22] - 1) * 100
-        else:
-            dc_chg_30d = 0.0
-    
-    # 2) HY OAS Calc
-    df_hy = fetch_hy_oas_series()
-    if not df_hy.empty:
-        # FRED data is %, so 3.05 means 3.05%. bps = 305.
-        hy_oas_bps = float(df_hy['value'].iloc[-1]) * 100
-    
-    # 3) Semi Eq Calc
-    tickers_semi = ["AMAT", "LRCX", "KLAC", "ASML", "SOXX"]
-    px_semi = fetch_price_series(tickers_semi, days=120)
-    ratio_semi = None
-    needed = ["AMAT", "LRCX", "KLAC", "ASML", "SOXX"]
-    if not px_semi.empty and all(t in px_semi.columns for t in needed):
-        semi_eq = px_semi[["AMAT", "LRCX", "KLAC", "ASML"]].mean(axis=1)
-        ratio_semi = semi_eq / px_semi["SOXX"]
-        if len(ratio_semi) > 22:
-            semi_chg_30d = (ratio_semi.iloc[-1] / ratio_semi.iloc[-22] - 1) * 100
-        else:
-            semi_chg_30d = 0.0
+    # --- Metrics (language-independent snapshot) ---
+    snap = c2e_snapshot(rulebook)
+    comm_status = snap["status"]
+    ratio_dc, dc_chg_30d = snap["ratio_dc"], snap["dc_chg_30d"]
+    df_hy, hy_oas_bps = snap["df_hy"], snap["hy_oas_bps"]
+    ratio_semi, semi_chg_30d = snap["ratio_semi"], snap["semi_chg_30d"]
 
-    # --- Comprehensive Judgment ---
-    comm_status = evaluate_credit_equity_status(dc_chg_30d if dc_chg_30d is not None else 0, 
-                                                hy_oas_bps if hy_oas_bps is not None else 300, 
-                                                semi_chg_30d if semi_chg_30d is not None else 0)
-    
     # Render Comprehensive Panel
     meta = STATUS_MAP[comm_status]
     msg = C2E_MESSAGES[comm_status]["日本語" if lang=="日本語" else "English"]
@@ -1790,15 +2257,13 @@ def credit_to_equity_panel(lang: str):
     """, unsafe_allow_html=True)
 
     # --- Render: 3 Column Charts ---
-    col_dc, col_hy, col_semi = st.columns(3)
 
     # Col 1: DC Credit
-    status_dc = "UNKNOWN"
+    status_dc = snap["status_dc"]
     val_str_dc = "N/A"
     fig_dc = None
     
     if ratio_dc is not None:
-        status_dc = classify_dc_status(dc_chg_30d)
         val_str_dc = f"{dc_chg_30d:.1f}%"
         
         # Convert to Plotly
@@ -1807,88 +2272,135 @@ def credit_to_equity_panel(lang: str):
         # Ensure x-axis column name is handled (usually "Date" or index name)
         x_col = df_p.columns[0]
         
-        fig_dc = px.line(df_p, x=x_col, y="SRVR/VNQ")
-        fig_dc.update_layout(**chart_config, showlegend=False)
-        
-        meta = STATUS_MAP[status_dc]
-        fig_dc.update_traces(line_color=meta['color'])
+        fig_dc = cached_figure("c2e_dc", sparkline_figure, df_p, x_col, "SRVR/VNQ", chart_config, STATUS_MAP[status_dc]['color'], max_points=chart_max_points())
 
-    render_metric_card(col_dc, label_dc, val_str_dc, status_dc, DC_MONITOR_STATUS_TEXT, lang, fig_dc)
 
     # Col 2: HY OAS
-    status_hy = "UNKNOWN"
+    status_hy = snap["status_hy"]
     val_str_hy = "N/A"
     fig_hy = None
 
     if df_hy is not None and not df_hy.empty:
-        status_hy = classify_hy_status(hy_oas_bps)
         val_str_hy = f"{hy_oas_bps:.0f} {label_bps}"
         
         # df_hy usually has 'date' and 'value'
-        fig_hy = px.line(df_hy, x='date', y='value')
-        fig_hy.update_layout(**chart_config, showlegend=False)
-        
-        meta = STATUS_MAP[status_hy]
-        fig_hy.update_traces(line_color=meta['color'])
+        fig_hy = cached_figure("c2e_hy", sparkline_figure, df_hy, 'date', 'value', chart_config, STATUS_MAP[status_hy]['color'], max_points=chart_max_points())
     
-    render_metric_card(col_hy, label_hy, val_str_hy, status_hy, HY_MONITOR_STATUS_TEXT, lang, fig_hy)
 
     # Col 3: Semi Eq
-    status_semi = "UNKNOWN"
+    status_semi = snap["status_semi"]
     val_str_semi = "N/A"
     fig_semi = None
 
     if ratio_semi is not None:
-        status_semi = classify_semi_status(semi_chg_30d)
         val_str_semi = f"{semi_chg_30d:.1f}%"
         
         # ratio_semi is Series
         df_p = ratio_semi.to_frame(name="SemiEq/SOXX").reset_index()
         x_col = df_p.columns[0]
         
-        fig_semi = px.line(df_p, x=x_col, y="SemiEq/SOXX")
-        fig_semi.update_layout(**chart_config, showlegend=False)
-        
-        meta = STATUS_MAP[status_semi]
-        fig_semi.update_traces(line_color=meta['color'])
+        fig_semi = cached_figure("c2e_semi", sparkline_figure, df_p, x_col, "SemiEq/SOXX", chart_config, STATUS_MAP[status_semi]['color'], max_points=chart_max_points())
+
+    render_metric_cards([
+        dict(title=label_dc, value_str=val_str_dc, status=status_dc, msg_dict=DC_MONITOR_STATUS_TEXT, chart_fig=fig_dc),
+        dict(title=label_hy, value_str=val_str_hy, status=status_hy, msg_dict=HY_MONITOR_STATUS_TEXT, chart_fig=fig_hy),
+        dict(title=label_semi, value_str=val_str_semi, status=status_semi, msg_dict=SEMI_MONITOR_STATUS_TEXT, chart_fig=fig_semi),
+    ], lang)
+
+    # --- C2E Status Timeline ---
+    st.markdown("#### C2E ステータス推移" if lang == "日本語" else "#### C2E Status Timeline")
+    c2e_hist = build_c2e_history(rulebook)
+    if c2e_hist.empty:
+        st.markdown(f"<div style='text-align:center; color:#999; font-size:0.8rem;'>*{label_no_data}*</div>", unsafe_allow_html=True)
+        return
+
+    # Rows: Credit / Equity components (LOW/MEDIUM/HIGH) and composite status on one 0-2 scale
+    status_colors = {k: v["color"] for k, v in STATUS_MAP.items()}
+    fig_timeline = cached_figure(
+        "c2e_timeline", status_timeline_figure, c2e_hist, C2E_TIMELINE_ROWS, status_colors,
+        dict(chart_config, height=160),
+    )
+    fig_timeline = with_row_aliases(fig_timeline, C2E_TIMELINE_LABELS["日本語" if lang == "日本語" else "English"])
+    with perf.trace("plotly:c2e_timeline"):
+        st.plotly_chart(fig_timeline, use_container_width=True, config={'displayModeBar': False})
 
-    render_metric_card(col_semi, label_semi, val_str_semi, status_semi, SEMI_MONITOR_STATUS_TEXT, lang, fig_semi)
+    render_signal_context({
+        "c2e_dc_chg30": c2e_hist["DC_Chg30"],
+        "c2e_hy_oas_bps": c2e_hist["HY_OAS_bps"],
+        "c2e_semi_chg30": c2e_hist["Semi_Chg30"],
+    }, {"c2e_dc_chg30": label_dc, "c2e_hy_oas_bps": label_hy, "c2e_semi_chg30": label_semi}, lang)
 
-def render_l2_card(col, title, status, msg_dict, fig, val_str=""):
-    render_metric_card(col, title, val_str, status, msg_dict, lang, fig)
+# --- Lead–Lag Panel ---
+
+def lead_lag_panel(lang: str):
+    """
+    伝播チェーンの先行日数と、その推定のローリング安定性
+    """
+    if lang == "日本語":
+        st.markdown("#### 伝播リードタイム (相互相関 ±60日)")
+        st.markdown(
+            "日次変化（SRVR/VNQ・SemiEq/SOXX は対数変化、HY OAS は bps 変化）の相互相関から、"
+            "各段階が次の段階に何営業日先行しているかを推定します。"
+            "安定性は1年窓を1か月ずつずらした推定が全期間推定と同じ向きを示した割合です。"
+        )
+        lbl_lead, lbl_corr, lbl_stab = "先行日数", "ピーク相関", "安定性"
+    else:
+        st.markdown("#### Transmission Lead Time (Cross-Correlation ±60d)")
+        st.markdown(
+            "Cross-correlations of daily changes (log changes for SRVR/VNQ and SemiEq/SOXX, bps changes "
+            "for HY OAS) estimate how many trading days each stage leads the next. "
+            "Stability is the share of 1-year windows, stepped monthly, whose estimate points in the "
+            "same direction as the full-sample lead."
+        )
+        lbl_lead, lbl_corr, lbl_stab = "Lead", "Peak Corr", "Stability"
+
+    aligned = load_c2e_inputs()
+    aligned = aligned.loc[pd.Timestamp(date.today() - timedelta(days=C2E_HISTORY_DAYS)):]
+    summary, xcorr, rolling = get_lead_lag_estimates(aligned) if not aligned.empty else (pd.DataFrame(),) * 3
+    if summary.empty:
+        st.markdown(f"<div style='text-align:center; color:#999; font-size:0.8rem;'>*{TRANSLATIONS['no_data'][lang]}*</div>", unsafe_allow_html=True)
+        return
+
+    ll_cards = []
+    for pair, row in summary.iterrows():
+        # Positive lead = first leg moves first; unstable estimates are flagged gray
+        stable = row['Sign_Agreement'] >= 0.6 and row['Lead_Days'] != 0
+        ll_cards.append(status_card(
+            pair, f"{lbl_lead}: {int(row['Lead_Days']):+d}d",
+            f"{lbl_corr}: {row['Peak_Corr']:+.2f}<br>"
+            f"{lbl_lead} (rolling): {row['Rolling_Mean']:+.1f} ± {row['Rolling_Std']:.1f}d<br>"
+            f"{lbl_stab}: {row['Sign_Agreement']*100:.0f}%",
+            "#007BFF" if stable else "#6c757d", "🔵" if stable else "⚪",
+        ))
+    st.markdown(card_grid(ll_cards, columns=len(ll_cards)), unsafe_allow_html=True)
+
+    fig_xc = cached_figure("lead_lag_xcorr", xcorr_figure, xcorr, dict(chart_config, height=260))
+    with perf.trace("plotly:lead_lag"):
+        st.plotly_chart(fig_xc, use_container_width=True, config={'displayModeBar': False})
+
+def l2_card(title, status, msg_dict, fig, val_str=""):
+    return dict(title=title, value_str=val_str, status=status, msg_dict=msg_dict, chart_fig=fig)
 
 # 1. SOFR vs IORB Trend
 fig_1 = None
 if val_rates_hist is not None and not val_rates_hist.empty:
     df = val_rates_hist[val_rates_hist['date'] >= date_cutoff]
     if not df.empty:
-        fig_1 = px.line(df, x='date', y='SOFR')
-        fig_1.add_trace(go.Scatter(x=df['date'], y=df['IORB'], name='IORB', line=dict(dash='dash', color='orange')))
-        fig_1.update_layout(**chart_config, showlegend=False)
-
-render_l2_card(l2_c1, TRANSLATIONS['l2_sofr'][lang], s_sofr, L2_MESSAGES['SOFR_IORB'], fig_1, f"{cur_spread*100:.2f} bps")
+        fig_1 = cached_figure("l2_sofr_iorb", sofr_iorb_figure, df, chart_config, max_points=chart_max_points())
 
 # 2. TNX Divergence
 fig_2 = None
 if val_tnx_div is not None and not val_tnx_div.empty:
     df = val_tnx_div[val_tnx_div['Date'] >= date_cutoff]
     if not df.empty:
-        fig_2 = px.bar(df, x='Date', y='Divergence', color='Divergence', color_continuous_scale='RdYlGn_r')
-        fig_2.update_layout(**chart_config)
-        fig_2.update_coloraxes(showscale=False)
-
-render_l2_card(l2_c2, TRANSLATIONS['l2_tnx'][lang], s_tnx, L2_MESSAGES['TNX_DEV'], fig_2, f"{cur_tnx_dev:.2f}")
+        fig_2 = cached_figure("l2_tnx_divergence", divergence_bar_figure, df, chart_config, max_points=chart_max_points())
 
 # 3. Real Yield
 fig_3 = None
 if val_real_yield is not None and not val_real_yield.empty:
     df = val_real_yield[val_real_yield['date'] >= date_cutoff]
     if not df.empty:
-        fig_3 = px.line(df, x='date', y='value')
-        fig_3.update_traces(line_color='#9C27B0')
-        fig_3.update_layout(**chart_config)
-
-render_l2_card(l2_c3, TRANSLATIONS['l2_real'][lang], s_real, L2_MESSAGES['REAL_YIELD'], fig_3, f"{cur_real_yield:.2f}%")
+        fig_3 = cached_figure("l2_real_yield", line_figure, df, 'date', 'value', chart_config, '#9C27B0', max_points=chart_max_points())
 
 # 4. Tail
 fig_4 = None
@@ -1908,178 +2420,67 @@ if not val_tail_df.empty:
         # Format Date to YYYY-MM string for categorical axis (removes Days visual)
         df['Month'] = df['Date'].dt.strftime('%Y-%m')
         
-        fig_4 = px.bar(df, x='Month', y='Treasury_Tail')
-        fig_4.update_traces(marker_color='#007BFF')
-        fig_4.update_layout(
-            **chart_config,
-            xaxis=dict(type='category') # Ensure it treats YYYY-MM as categories
-        )
-
-render_l2_card(l2_c4, f"{TRANSLATIONS['tail_title'][lang]}", s_tail, L2_MESSAGES['TAIL'], fig_4, f"{cur_tail:.2f}")
+        fig_4 = cached_figure("l2_tail", monthly_bar_figure, df, 'Month', 'Treasury_Tail', chart_config, '#007BFF')
+
+with l2_cards_slot:
+    render_metric_cards([
+        l2_card(TRANSLATIONS['l2_sofr'][lang], s_sofr, L2_MESSAGES['SOFR_IORB'], fig_1, f"{cur_spread*100:.2f} bps"),
+        l2_card(TRANSLATIONS['l2_tnx'][lang], s_tnx, L2_MESSAGES['TNX_DEV'], fig_2, f"{cur_tnx_dev:.2f}"),
+        l2_card(TRANSLATIONS['l2_real'][lang], s_real, L2_MESSAGES['REAL_YIELD'], fig_3, f"{cur_real_yield:.2f}%"),
+        l2_card(f"{TRANSLATIONS['tail_title'][lang]}", s_tail, L2_MESSAGES['TAIL'], fig_4, f"{cur_tail:.2f}"),
+    ], lang)
+    # 入札テールはモック（シート）のデータなので履歴上の位置は出さない
+    l2_signals = load_l2_signal_history()
+    render_signal_context({k: l2_signals[k] for k in ("l2_sofr_spread", "l2_tnx_dev", "l2_real_yield")}, {
+        "l2_sofr_spread": TRANSLATIONS['l2_sofr'][lang],
+        "l2_tnx_dev": TRANSLATIONS['l2_tnx'][lang],
+        "l2_real_yield": TRANSLATIONS['l2_real'][lang],
+    }, lang)
 
 with tabs[2]:
+    tab_skeletons[2].empty()
     # --- Credit → Equity Transmission Monitor ---
     credit_to_equity_panel(lang)
+    lead_lag_panel(lang)
 
-# --- New: Danger Source Data (Equity / Credit Proxies) ---
+@perf.traced("compute:relative_perf")
+def compute_relative_perf(data):
+    return relative_perf(data)
 
-@st.cache_data(ttl=3600)
-def get_danger_source_data():
-    """
-    危険源モニタ用の価格データを取得
-    - Semi 装置: AMAT, LRCX, KLAC, ASML（等ウェイト合成）
-    - セクター: SOXX
-    - Credit Proxy: DC/インフラ系 REIT vs HY ETF
-      ※ETFは無料で取れる代替として扱う
-    """
-    tickers = {
-        "semi_equip": ["AMAT", "LRCX", "KLAC", "ASML"],
-        "sector": ["SOXX"],
-        "dc_credit_proxy": ["SRVR"],   # データセンター REIT ETF 例
-        "hy_proxy": ["HYG"],           # ハイイールドETF 例
-    }
-    
-    end = datetime.utcnow()
-    start = end - timedelta(days=365)  # 1年分
-    
-    data = {}
-    for group, names in tickers.items():
-        for t in names:
-            try:
-                hist = yf.Ticker(t).history(start=start, end=end)
-                if hist.empty:
-                    continue
-                hist = hist[['Close']].rename(columns={'Close': t})
-                if group not in data:
-                    data[group] = hist
-                else:
-                    data[group] = data[group].join(hist, how='outer')
-            except Exception as e:
-                st.warning(f"Error fetching {t} for danger source: {e}")
-    
-    return data
+@perf.traced("compute:dc_credit_divergence")
+def compute_dc_credit_divergence(data):
+    return dc_credit_divergence(data)
 
-def compute_relative_perf(data):
+@perf.traced("compute:sensitivity_velocity")
+def compute_sensitivity_velocity_inputs(data):
     """
-    Semi 装置（AMAT/LRCX/KLAC/ASML 等ウェイト）と SOXX の
-    直近 N 日リターンを比較し、Relative Performance を返す
+    危険源マトリクス用に、装置株各銘柄と等ウェイト合成 (SemiEq) の
+    クレジット proxy (SRVR/HYG) へのローリング β と、SOXX 比ドローダウンの加速度を出す
     """
     semi_df = data.get("semi_equip")
     sector_df = data.get("sector")
-    if semi_df is None or sector_df is None:
-        return None
-    
-    # 等ウェイト合成
-    semi_prices = semi_df.dropna()
-    if semi_prices.empty:
-        return None
-    semi_prices['EQ'] = semi_prices.mean(axis=1)
-    
-    # セクター
-    soxx = sector_df[['SOXX']].dropna()
-    
-    # 共通日付
-    df = semi_prices[['EQ']].join(soxx, how='inner')
-    if df.empty:
-        return None
-    
-    # 直近 20 営業日リターン
-    window = 20
-    if len(df) < window:
-        window = len(df)
-        
-    recent = df.iloc[-window:]
-    if recent.empty:
-        return None
-
-    semi_ret = recent['EQ'].iloc[-1] / recent['EQ'].iloc[0] - 1.0
-    soxx_ret = recent['SOXX'].iloc[-1] / recent['SOXX'].iloc[0] - 1.0
-    
-    rel = semi_ret - soxx_ret  # 「装置だけ売られているか？」
-    return {
-        "semi_ret": semi_ret,
-        "soxx_ret": soxx_ret,
-        "relative": rel
-    }
-
-def compute_dc_credit_divergence(data):
-    """
-    データセンター/インフラ REIT ETF (SRVR) と HY ETF (HYG)
-    のスプレッドを簡易的に測る。
-    実際の OAS ではなく「価格リターン差」をクレジット感応 proxy とする。
-    """
     dc_df = data.get("dc_credit_proxy")
     hy_df = data.get("hy_proxy")
-    if dc_df is None or hy_df is None:
+    if semi_df is None or sector_df is None or dc_df is None or hy_df is None:
         return None
-    
-    dc = dc_df[['SRVR']].dropna()
-    hy = hy_df[['HYG']].dropna()
-    df = dc.join(hy, how='inner')
-    if df.empty:
+
+    prices = semi_df.dropna()
+    if prices.empty:
         return None
-    
-    window = 60  # クレジットとしては少し長め
-    if len(df) < window:
-        window = len(df)
-        
-    recent = df.iloc[-window:]
-    if recent.empty:
-         return None
+    prices = prices.assign(SemiEq=prices.mean(axis=1))
+    credit = dc_df[['SRVR']].join(hy_df[['HYG']], how='inner')
 
-    dc_ret = recent['SRVR'].iloc[-1] / recent['SRVR'].iloc[0] - 1.0
-    hy_ret = recent['HYG'].iloc[-1] / recent['HYG'].iloc[0] - 1.0
-    
-    # HY は「リスク資産全体」、SRVR がそれより悪化していれば
-    # 「DC クレジットだけ先に裂けている」サイン
-    spread = dc_ret - hy_ret   # マイナス大きいほど危険
-    return {
-        "dc_ret": dc_ret,
-        "hy_ret": hy_ret,
-        "spread": spread
-    }
+    return compute_sensitivity_velocity(prices, sector_df['SOXX'], credit)
 
-def compute_physical_vs_market(metrics_df, market_data):
+@cached_stage("danger_snapshot", ttl=3600)
+def danger_snapshot(data):
     """
-    最弱PSRと指数リターンのミスマッチを判定する材料を出す
+    危険源モニターの計算スナップショット（言語非依存、価格データをキーにキャッシュ）。
+    Returns: (相対パフォーマンス, DC クレジット乖離, 感度×速度テーブル)
     """
-    if metrics_df.empty:
-        return None
-    
-    # 既に作っている APLC-5 の最弱 PSR
-    if 'PSR' in metrics_df.columns:
-        min_psr_val = metrics_df['PSR'].min()
-    else:
-        return None
-    
-    # 指数リターン（ここでは SPX を代表に）
-    # market_data['SPX'] is just latest price. Need history or fetch new.
-    # The Prompt code fetches fresh history.
-    try:
-        spx_hist = yf.Ticker("^GSPC").history(period="1mo")
-        if spx_hist.empty:
-            spx_ret = 0.0
-        else:
-            spx_ret = spx_hist['Close'].iloc[-1] / spx_hist['Close'].iloc[0] - 1.0
-    except:
-        spx_ret = 0.0
-    
-    return {
-        "min_psr": min_psr_val,
-        "spx_ret": spx_ret
-    }
+    return compute_relative_perf(data), compute_dc_credit_divergence(data), compute_sensitivity_velocity_inputs(data)
 
-# --- Judgment Logic ---
-
-def judge_relative_perf(rel):
-    if rel is None:
-        return "UNKNOWN"
-    if rel < -0.10:
-        return "DANGER"
-    elif rel < -0.05:
-        return "WATCH"
-    else:
-        return "NORMAL"
+# --- Judgment Messages ---
 
 RELATIVE_MSG = {
     "NORMAL": {
@@ -2100,16 +2501,6 @@ RELATIVE_MSG = {
     }
 }
 
-def judge_dc_credit(spread):
-    if spread is None:
-        return "UNKNOWN"
-    if spread < -0.10:
-        return "DANGER"
-    elif spread < -0.05:
-        return "WATCH"
-    else:
-        return "NORMAL"
-
 DC_CREDIT_MSG = {
     "NORMAL": {
         "JP": "データセンター/インフラREITとハイイールド全体の動きは概ね揃っており、DCクレジットだけが先行して悪化している兆しはありません。",
@@ -2129,23 +2520,6 @@ DC_CREDIT_MSG = {
     }
 }
 
-def judge_physical_vs_market(min_psr, spx_ret):
-    if min_psr is None:
-        return "UNKNOWN"
-    
-    # 物理はまだ耐えている or 1.0に近い
-    if min_psr >= 1.1:
-        return "NORMAL"
-    
-    # PSR<1.0 なのに、SPX が上昇 or 横ばい → ナラティブ優勢
-    if min_psr < 1.0 and spx_ret > 0.05:
-        return "DANGER"
-    elif min_psr < 1.0:
-        return "WATCH"
-    
-    # 1.0〜1.1 くらいで SPX も重くなっている → 物理と市場が同期し始めている
-    return "WATCH"
-
 PHYSICAL_MARKET_MSG = {
     "NORMAL": {
         "JP": "最弱PSRもまだ1.1以上を維持しており、物理コストと株価の動きは大きく矛盾していません。現時点ではナラティブと物理の乖離は限定的です。",
@@ -2218,10 +2592,19 @@ QUADRANT_MESSAGES = {
         "EnglishLabel": "Quiet Unaware Zone",
         "日本語": "市場はこのリスクをほとんど意識していません。今は問題になっていないように見えますが、将来的な「一気の織り込み」の温床にもなり得ます。",
         "English": "The market is largely unaware of this risk. It appears irrelevant for now, but this calm can become the seedbed of sudden future repricing."
+    },
+    "UNKNOWN": {
+        "日本語ラベル": "判定不能",
+        "EnglishLabel": "Unknown",
+        "日本語": "装置株の価格データ（またはクレジット proxy）が不足しており、感度・速度を算出できません。マトリクス上の位置は表示していません。",
+        "English": "Price data for semi equipment (or the credit proxies) is insufficient, so sensitivity and velocity cannot be computed. No position is plotted on the matrix."
     }
 }
 
 def to_axis_values(sens_level, vel_level):
+    """マトリクス上の座標。感度・速度が算出できない (None) ときは (None, None)。"""
+    if sens_level is None or vel_level is None:
+        return None, None
     sens_high = sens_level in ("HIGH","MEDIUM")
     x = 1 if sens_high else -1
 
@@ -2234,6 +2617,8 @@ def to_axis_values(sens_level, vel_level):
     return x, y
 
 def quadrant_label(sens_level, vel_level):
+    if sens_level is None or vel_level is None:
+        return "UNKNOWN"
     sens_high = sens_level in ("HIGH","MEDIUM")
 
     if vel_level == "ACCEL":
@@ -2246,9 +2631,78 @@ def quadrant_label(sens_level, vel_level):
         if sens_high: return "CENTER_HIGH_HOLD"
         else:         return "CENTER_LOW_QUIET"
 
+def quadrant_matrix_figure(sv_table, mx, my, quad, marker_color):
+    """
+    感度 × 速度 マトリクス: SemiEq の位置（大マーカー）と個別銘柄（同じセル内で横に並べる）。
+    ゾーン名は QUADRANT_MESSAGES のキー（quad）のまま置く。表示名は localize_quadrant_matrix で付ける。
+    """
+    import plotly.graph_objects as go  # 最初に図を組み立てるときまで遅らせる (charts._go と同じ)
+
+    fig_matrix = go.Figure()
+
+    # Individual names: same quadrant cell, spread horizontally so labels don't overlap
+    if sv_table is not None:
+        names = sv_table.drop(index="SemiEq", errors="ignore").dropna(subset=["Sens_Pct"])
+        cell_members = {}
+        for tk, r in names.iterrows():
+            cell_members.setdefault(to_axis_values(r["Sens_Level"], r["Vel_Level"]), []).append(tk)
+        for (cx, cy), members in cell_members.items():
+            offsets = [(i - (len(members) - 1) / 2) * 0.18 for i in range(len(members))]
+            fig_matrix.add_trace(go.Scatter(
+                x=[cx + o for o in offsets], y=[cy - 0.25] * len(members),
+                mode="markers+text",
+                text=members,
+                textposition="bottom center",
+                marker=dict(size=9, color="#6c757d", opacity=0.8),
+                hovertext=[quadrant_label(names.loc[m, "Sens_Level"], names.loc[m, "Vel_Level"]) for m in members],
+                showlegend=False
+            ))
+
+    if mx is None:
+        # SemiEq の感度・速度が無い: 位置を描かず、判定不能であることだけを示す
+        fig_matrix.add_annotation(x=0, y=0, text=quad, showarrow=False,
+                                  font=dict(size=16, color="#6c757d"))
+    else:
+        fig_matrix.add_trace(go.Scatter(
+            x=[mx], y=[my],
+            mode="markers+text",
+            text=[quad],
+            textposition="top center",
+            marker=dict(size=20, color=marker_color, line=dict(width=2, color='DarkSlateGrey')),
+            showlegend=False
+        ))
+
+    # Quadrant Lines/Layout
+    fig_matrix.update_layout(
+        xaxis=dict(range=[-1.5,1.5], zeroline=True, tickvals=[-1,1], ticktext=["Low Sens","High Sens"]),
+        yaxis=dict(range=[-1.5,1.5], zeroline=True, tickvals=[-1,0,1], ticktext=["Disconnect","Stable","Accel"]),
+        height=300,
+        margin=dict(l=40,r=40,t=20,b=20),
+        plot_bgcolor='rgba(240,240,240,0.5)'
+    )
+    return fig_matrix
+
+def localize_quadrant_matrix(fig, label_key):
+    """
+    キャッシュ済みのマトリクス図のコピーで、ゾーンのキーを表示名に置き換える。
+    label_key: QUADRANT_MESSAGES の表示名キー（"日本語ラベル" / "EnglishLabel"）
+    """
+    import plotly.graph_objects as go
+
+    labels = {q: m[label_key] for q, m in QUADRANT_MESSAGES.items()}
+    fig = go.Figure(fig)
+    for trace in fig.data:
+        if trace.hovertext is not None:  # 個別銘柄: text は銘柄名、hovertext がゾーン
+            trace.hovertext = [labels[q] for q in trace.hovertext]
+        else:  # SemiEq
+            trace.text = [labels[q] for q in trace.text]
+    fig.for_each_annotation(lambda a: a.update(text=labels[a.text]))
+    return fig
+
 # --- Danger Source Monitor Section ---
 
 with tabs[3]:
+    tab_skeletons[3].empty()
     section_title = "Danger Source Monitor" if lang == "English" else "危険源モニター"
     st.subheader(section_title)
 
@@ -2267,13 +2721,13 @@ with tabs[3]:
     try:
         danger_data = get_danger_source_data()
         
-        rel_info   = compute_relative_perf(danger_data)
-        cred_info  = compute_dc_credit_divergence(danger_data)
-        phys_info  = compute_physical_vs_market(metrics_df, market_data)
+        rel_info, cred_info, sv_table = danger_snapshot(danger_data)
+        phys_info  = metrics["physical_vs_market"]
         
-        rel_status = judge_relative_perf(rel_info['relative'] if rel_info else None)
-        cred_status = judge_dc_credit(cred_info['spread'] if cred_info else None)
-        phys_status = judge_physical_vs_market(
+        rel_status = rulebook.evaluate("relative_perf", rel_info['relative'] if rel_info else None)
+        cred_status = rulebook.evaluate("dc_credit", cred_info['spread'] if cred_info else None)
+        phys_status = rulebook.evaluate(
+            "physical_vs_market",
             phys_info['min_psr'] if phys_info else None,
             phys_info['spx_ret'] if phys_info else 0.0
         )
@@ -2288,9 +2742,11 @@ with tabs[3]:
         elif cred_status == "WATCH" or rel_status == "WATCH":
              hazard_status = "WARNING"
              
-        # Dummy Matrix Inputs
-        sens_level = "HIGH" 
-        vel_level = "STABLE"
+        # Matrix Inputs: rolling credit beta (sensitivity) x relative drawdown acceleration (velocity)
+        sens_level = vel_level = None  # SemiEq が算出できなければ判定不能（仮の象限には置かない）
+        if sv_table is not None and "SemiEq" in sv_table.index and not pd.isna(sv_table.loc["SemiEq", "Sens_Pct"]):
+            sens_level = sv_table.loc["SemiEq", "Sens_Level"]
+            vel_level = sv_table.loc["SemiEq", "Vel_Level"]
         
         # 1. Hazard Status Panel
         h_meta = STATUS_MAP[hazard_status]
@@ -2316,26 +2772,12 @@ with tabs[3]:
         q_label = qmeta["日本語ラベル" if lang=="日本語" else "EnglishLabel"]
         q_text = qmeta["日本語" if lang=="日本語" else "English"]
 
-        fig_matrix = go.Figure()
-        fig_matrix.add_trace(go.Scatter(
-            x=[mx], y=[my],
-            mode="markers+text",
-            text=[q_label],
-            textposition="top center",
-            marker=dict(size=20, color=h_meta['color'], line=dict(width=2, color='DarkSlateGrey'))
-        ))
-        
-        # Quadrant Lines/Layout
-        fig_matrix.update_layout(
-            xaxis=dict(range=[-1.5,1.5], zeroline=True, tickvals=[-1,1], ticktext=["Low Sens","High Sens"]),
-            yaxis=dict(range=[-1.5,1.5], zeroline=True, tickvals=[-1,0,1], ticktext=["Disconnect","Stable","Accel"]),
-            height=300,
-            margin=dict(l=40,r=40,t=20,b=20),
-            plot_bgcolor='rgba(240,240,240,0.5)'
-        )
+        fig_matrix = cached_figure("danger_matrix", quadrant_matrix_figure, sv_table, mx, my, quad, h_meta['color'])
+        fig_matrix = localize_quadrant_matrix(fig_matrix, "日本語ラベル" if lang=="日本語" else "EnglishLabel")
         # Add annotation for axes? Maybe simple is better as per instructions
         
-        st.plotly_chart(fig_matrix, use_container_width=True)
+        with perf.trace("plotly:danger_matrix"):
+            st.plotly_chart(fig_matrix, use_container_width=True)
         
         st.markdown(f"""
         <div style="font-size:0.9rem; background:#f9f9f9; padding:10px; border-radius:5px; margin-bottom:30px; border-left:4px solid #666;">
@@ -2343,14 +2785,12 @@ with tabs[3]:
         </div>
         """, unsafe_allow_html=True)
         
-        col_rel, col_cred, col_phys = st.columns(3)
         
         # 1) Relative Performance Card
         val_str_rel = "N/A"
         if rel_info:
             val_str_rel = f"Relative 20d: {rel_info['relative']*100:.1f}%"
         
-        render_metric_card(col_rel, "Semi vs SOXX", val_str_rel, rel_status, RELATIVE_MSG, lang)
         
         
         # 2) DC Credit Card
@@ -2358,7 +2798,6 @@ with tabs[3]:
         if cred_info:
             val_str_cred = f"Price Spread 60d: {cred_info['spread']*100:.1f}%"
         
-        render_metric_card(col_cred, "DC Credit vs HY", val_str_cred, cred_status, DC_CREDIT_MSG, lang)
 
         
         # 3) Physical vs Market Card
@@ -2366,7 +2805,11 @@ with tabs[3]:
         if phys_info:
             val_str_phys = f"Min PSR: {phys_info['min_psr']:.2f} / SPX 1m: {phys_info['spx_ret']*100:.1f}%"
             
-        render_metric_card(col_phys, "Physical vs Market", val_str_phys, phys_status, PHYSICAL_MARKET_MSG, lang)
+        render_metric_cards([
+            dict(title="Semi vs SOXX", value_str=val_str_rel, status=rel_status, msg_dict=RELATIVE_MSG),
+            dict(title="DC Credit vs HY", value_str=val_str_cred, status=cred_status, msg_dict=DC_CREDIT_MSG),
+            dict(title="Physical vs Market", value_str=val_str_phys, status=phys_status, msg_dict=PHYSICAL_MARKET_MSG),
+        ], lang)
 
     except Exception as e:
         st.error(f"Error in Danger Source Monitor: {e}")
@@ -2375,124 +2818,81 @@ with tabs[3]:
 
 # --- Semiconductor Survivor Map (Live Status) ---
 
+# Selectable Survivor universes (Core 5 = the original SURVIVOR_UNIVERSE)
+SURVIVOR_UNIVERSES = {
+    "Core 5": ["AMAT", "LRCX", "KLAC", "ASML", "TER"],
+    "Semi Equipment & Materials": [
+        "AMAT", "LRCX", "KLAC", "ASML", "TER", "ONTO", "NVMI", "CAMT", "ACLS", "FORM",
+        "KLIC", "COHU", "UCTT", "ICHR", "AEIS", "MKSI", "ENTG", "AZTA", "PLAB", "VECO",
+        "ACMR", "AMKR", "AEHR", "ATOM", "AXTI", "IPGP", "TOELY", "ATEYY", "LSRCY", "DSCSY",
+        "ASMIY", "MTRN", "NOVT", "KEYS", "AMBQ", "BESIY", "ASYS", "INTT", "TRT", "PDFS",
+    ],
+    "Semiconductors": [
+        "NVDA", "AMD", "INTC", "AVGO", "QCOM", "TXN", "MU", "ADI", "MRVL", "NXPI",
+        "MCHP", "ON", "TSM", "ARM", "MPWR", "SWKS", "QRVO", "LSCC", "SLAB", "SYNA",
+        "RMBS", "POWI", "DIOD", "SMTC", "CRUS", "MTSI", "ALGM", "WOLF", "AMBA", "SITM",
+        "VSH", "AOSL", "MXL", "INDI", "NVTS", "CEVA", "IMOS", "HIMX", "UMC", "GFS",
+        "STM", "ASX", "SIMO", "ALAB", "CRDO", "PENG", "NVEC", "QUIK", "PI", "SKYT",
+        "GSIT", "MRAM", "POET", "SNPS", "CDNS", "IFNNY", "RNECY", "MBLY", "LASR", "VICR",
+    ],
+    "Hardware & DC Infrastructure": [
+        "AAPL", "DELL", "HPQ", "HPE", "SMCI", "ANET", "CSCO", "NTAP", "PSTG", "WDC",
+        "STX", "LOGI", "IBM", "CIEN", "LITE", "COHR", "FN", "JBL", "FLEX", "CLS",
+        "SANM", "PLXS", "BHE", "TTMI", "APH", "GLW", "TEL", "ZBRA", "CDW", "NOK",
+        "ERIC", "UI", "EXTR", "VIAV", "CALX", "ADTN", "NTGR", "VRT", "NVT", "MOD",
+        "AAOI", "OLED", "KOPN", "MRCY", "ETN", "HUBB", "POWL", "CRSR", "SNX", "ARW",
+        "AVT", "NSIT", "DGII", "ITRI", "BDC", "FFIV", "LFUS", "ROG", "KN", "OSIS",
+    ],
+}
+SURVIVOR_PAGE_SIZE = 20
+
 with tabs[4]:
+    tab_skeletons[4].empty()
     survivor_title = "Semiconductor Survivor Map" if lang == "English" else "半導体 Survivor マップ"
     st.subheader(survivor_title)
 
     # --- Survivor Logic ---
+    # StructRank / MarketRank / Anti-Reverse Final Class: engines.classify_survivor_arrays
 
-    def classify_struct_rank(psr: float) -> str:
-        if pd.isna(psr): return "BROKEN"
-        if psr >= 1.3: return "STRONG"
-        elif psr >= 1.1: return "MID"
-        elif psr >= 1.0: return "WEAK"
-        else: return "BROKEN"
-
-    def classify_market_rank(rel20: float, rel60: float) -> str:
-        if pd.isna(rel20) or pd.isna(rel60): return "DUMPED"
-        if rel20 >= -0.02 and rel60 >= -0.05: return "FAVORED"
-        elif rel20 >= -0.08 and rel60 >= -0.15: return "NEUTRAL"
-        else: return "DUMPED"
-
-    def classify_final_class(struct_rank: str, market_rank: str,
-                             psr: float, rel20: float, rel60: float) -> str:
-        """
-        Anti-Reverse Logic for Final Class
-        """
-        # Base
-        base_survivor = (struct_rank in ["STRONG", "MID"] and market_rank in ["FAVORED", "NEUTRAL"])
-        base_hazard   = (struct_rank in ["WEAK", "BROKEN"] and market_rank == "DUMPED")
-
-        # Anti-Reverse: Require Margin for Promotion
-        if base_survivor:
-            # Strict condition for promotion
-            if (psr >= 1.35) and (rel60 >= -0.02) and (rel20 >= -0.01):
-                return "Survivor"
-            else:
-                return "Watch"
-
-        if base_hazard:
-            return "Hazard"
-
-        # Default Middle
-        return "Watch"
-
-    @st.cache_data(ttl=3600)
+    @cached_stage("get_semi_relative_returns", ttl=3600, max_entries=8)
     def get_semi_relative_returns(universe, days=180):
         # Fetch Universe + Benchmark
         px = fetch_price_series(universe + ["SOXX"], days=days)
-        if px.empty:
-            return {}
-        
-        # Common Dates
-        px = px.dropna(how="any")
+        return survivor_relative_returns(px, universe, "SOXX").to_dict("index")
 
-        results = {}
-        
-        def period_ret(series, window):
-            if len(series) < window: return 0.0
-            return float(series.iloc[-1] / series.iloc[-window] - 1.0)
-        
-        if "SOXX" not in px.columns:
-            return {}
-
-        soxx = px["SOXX"]
-        r20x = period_ret(soxx, 20)
-        r60x = period_ret(soxx, 60)
-
-        for ticker in universe:
-            if ticker not in px.columns:
-                continue
-            s = px[ticker]
-            r20 = period_ret(s, 20)
-            r60 = period_ret(s, 60)
-            
-            results[ticker] = {
-                "R20": r20,
-                "R60": r60,
-                "R20_SOXX": r20x,
-                "R60_SOXX": r60x,
-                "rel20": r20 - r20x,
-                "rel60": r60 - r60x
-            }
-        return results
-
-    def build_semi_class_table(df_input, lang: str):
+    @perf.traced("compute:survivor_metrics")
+    def build_survivor_metrics(universe, base_df, fee):
+        """
+        Survivor ユニバースの PSR テーブル。
+        共有ベース (metric_graph の base) に既にある銘柄はそのまま使い、不足分だけ財務を取得して同じ式で PSR を計算する。
+        """
+        known = psr_overlay(base_df[base_df['Ticker'].isin(universe)], fee)
+        missing = [t for t in universe if t not in set(known['Ticker'])]
+        if not missing:
+            return known.reset_index(drop=True)
+
+        extra = get_live_metrics_v2(missing)
+        physical_df = load_physical_metrics()
+        if not physical_df.empty:
+            extra = pd.merge(extra, physical_df, on='Ticker', how='left')
+        for c in PHYSICAL_COLS:
+            extra[c] = extra[c].fillna(0) if c in extra.columns else 0.0
+        extra = psr_overlay(extra, fee)
+        # Missing financials (FCF = CapEx = 0) -> PSR undefined, shown as Unknown
+        extra.loc[(extra['FCF'] == 0) & (extra['CapEx'] == 0), 'PSR'] = np.nan
+        return pd.concat([known, extra], ignore_index=True)
+
+    @cached_stage("build_semi_class_table", ttl=3600, max_entries=8)
+    def build_semi_class_table(df_input, rules):
         # df_input should be survivor_df
         if df_input.empty:
             return pd.DataFrame()
         
         univ = df_input["Ticker"].tolist()
         rel_map = get_semi_relative_returns(univ, days=180)
-
-        records = []
-        for _, row in df_input.iterrows():
-            ticker = row["Ticker"]
-            psr = row.get("PSR", np.nan)
-            
-            rel = rel_map.get(ticker, {})
-            rel20 = rel.get("rel20", np.nan)
-            rel60 = rel.get("rel60", np.nan)
-
-            if np.isnan(psr) or np.isnan(rel20) or np.isnan(rel60):
-                final_class = "Unknown"
-                struct_rank = None
-                market_rank = None
-            else:
-                struct_rank = classify_struct_rank(psr)
-                market_rank = classify_market_rank(rel20, rel60)
-                final_class = classify_final_class(struct_rank, market_rank, psr, rel20, rel60)
-            
-            records.append({
-                "Ticker": ticker,
-                "PSR": psr,
-                "rel20": rel20,
-                "rel60": rel60,
-                "StructRank": struct_rank,
-                "MarketRank": market_rank,
-                "Class": final_class
-            })
-        return pd.DataFrame(records)
+        rel_df = pd.DataFrame.from_dict(rel_map, orient="index")
+        psr = df_input["PSR"] if "PSR" in df_input.columns else None
+        return semi_class_table(univ, psr, rel_df, rules)
 
     # --- UI Visualization ---
 
@@ -2507,8 +2907,34 @@ with tabs[4]:
         The X-axis represents <b>Physical Durability (PSR)</b>, and the Y-axis shows <b>Relative Performance vs SOXX</b>.
         """, unsafe_allow_html=True)
 
+    # Universe Selection
+    u_col1, u_col2 = st.columns([2, 3])
+    with u_col1:
+        universe_groups = st.multiselect(
+            "ユニバース" if lang == "日本語" else "Universe",
+            list(SURVIVOR_UNIVERSES.keys()),
+            default=["Core 5"],
+            key="survivor_universe"
+        )
+    with u_col2:
+        extra_raw = st.text_input(
+            "追加ティッカー (カンマ区切り)" if lang == "日本語" else "Additional tickers (comma separated)",
+            "",
+            key="survivor_extra"
+        )
+    universe = []
+    for g in universe_groups:
+        universe += SURVIVOR_UNIVERSES[g]
+    universe += [t.strip().upper() for t in extra_raw.split(",") if t.strip()]
+    universe = [t for t in dict.fromkeys(universe) if t != "SOXX"]  # de-dup, keep order
+
     # Compute Data
-    semi_table = build_semi_class_table(survivor_df, lang)
+    if universe == SURVIVOR_UNIVERSE:
+        survivor_universe_df = survivor_df
+    else:
+        with st.spinner("Loading universe..." if lang == "English" else "ユニバース読み込み中..."):
+            survivor_universe_df = build_survivor_metrics(universe, metrics["base"], global_res_fee)
+    semi_table = build_semi_class_table(survivor_universe_df, rulebook)
 
     if semi_table.empty:
         st.warning("No data available for Survivor Universe.")
@@ -2526,89 +2952,87 @@ with tabs[4]:
             unit = "Stocks"
             lbl_s, lbl_h, lbl_w, lbl_u = "Survivor", "Hazard", "Watch", "Unknown"
 
-        c1, c2, c3, c4 = st.columns(4)
-        # Cards
-        for c, label, count, color in [
-            (c1, f"{lbl_s}: {cnt_surv}", cnt_surv, "#007bff"),
-            (c2, f"{lbl_h}: {cnt_haz}", cnt_haz, "#dc3545"),
-            (c3, f"{lbl_w}: {cnt_watch}", cnt_watch, "#ffc107"),
-            (c4, f"{lbl_u}: {cnt_unknown}", cnt_unknown, "#6c757d"),
-        ]:
-            with c:
-                st.markdown(f"""
-                <div class="metric-card" style="border-top:4px solid {color}; text-align:center; padding:15px;">
-                  <div style="font-weight:bold; font-size:1rem; color:{color};">{label}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        st.markdown(card_grid([
+            count_card(f"{lbl_s}: {cnt_surv}", "#007bff"),
+            count_card(f"{lbl_h}: {cnt_haz}", "#dc3545"),
+            count_card(f"{lbl_w}: {cnt_watch}", "#ffc107"),
+            count_card(f"{lbl_u}: {cnt_unknown}", "#6c757d"),
+        ], columns=4), unsafe_allow_html=True)
+
+        color_map = SURVIVOR_CLASS_COLORS
 
         # 2. Scatter Plot
-        df_plot = semi_table.copy()
-        # Clamp PSR for plotting
-        if "PSR" in df_plot.columns:
-            df_plot["PSR_clamped"] = df_plot["PSR"].clip(0, 2.5) # View range
-            
-            fig = go.Figure()
-            
-            color_map = {
-                "Survivor": "#007bff", # Blue
-                "Hazard": "#dc3545",   # Red
-                "Watch": "#ffc107",    # Yellow
-                "Unknown": "#6c757d"   # Gray
-            }
-            
-            for cls in ["Survivor", "Hazard", "Watch", "Unknown"]:
-                sub = df_plot[df_plot["Class"] == cls]
-                if sub.empty: continue
-                
-                fig.add_trace(go.Scatter(
-                    x=sub["PSR_clamped"],
-                    y=sub["rel20"] * 100,
-                    mode="markers+text",
-                    text=sub["Ticker"],
-                    textposition="top center",
-                    marker=dict(size=14, color=color_map[cls], line=dict(width=1, color="#333"), opacity=0.9),
-                    name=cls
-                ))
-                
-            fig.add_vline(x=1.0, line_dash="dash", line_color="red", opacity=0.5, annotation_text="PSR=1.0")
-            fig.add_vline(x=1.3, line_dash="dash", line_color="green", opacity=0.5, annotation_text="PSR=1.3")
-            fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
-
-            fig.update_layout(
-                height=400,
-                margin=dict(l=40, r=40, t=30, b=40),
-                xaxis_title="Physical Durability (PSR)",
-                yaxis_title="20d Relative vs SOXX (%)",
-                plot_bgcolor="rgba(248,248,248,0.8)",
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if "PSR" in semi_table.columns:
+            fig = cached_figure("survivor_scatter", survivor_scatter_figure, semi_table)
+            with perf.trace("plotly:survivor_scatter"):
+                st.plotly_chart(fig, use_container_width=True)
 
-        # 3. Detail Cards
+        # 3. Detail Cards (paginated, 5 per row)
         st.markdown("##### Detailed Status")
-        d_cols = st.columns(len(semi_table))
-        for i, row in semi_table.iterrows():
-            # Iterate safely
-            col = d_cols[i % 5] # wrap if many
-            
-            cls = row["Class"]
-            color = color_map.get(cls, "#6c757d")
-            ticker = row["Ticker"]
-            psr = row.get("PSR", 0)
-            r20 = row.get("rel20", 0) * 100
-            r60 = row.get("rel60", 0) * 100
-            
-            with col:
-                st.markdown(f"""
-                <div class="metric-card" style="border-left:4px solid {color}; padding:15px;">
-                  <div style="font-weight:700; margin-bottom:5px; font-size:1.1rem;">{ticker}</div>
-                  <div style="font-size:0.8rem; color:#444; margin-bottom:2px;"><b>{cls}</b></div>
-                  <div style="font-size:0.75rem; color:#666;">
-                    PSR: {psr:.2f}<br>
-                    20d Rel: {r20:+.1f}%<br>
-                    60d Rel: {r60:+.1f}%
-                  </div>
-                </div>
-                """, unsafe_allow_html=True)
+        f_col, p_col = st.columns([3, 1])
+        with f_col:
+            class_filter = st.multiselect(
+                "クラス" if lang == "日本語" else "Class",
+                ["Survivor", "Hazard", "Watch", "Unknown"],
+                default=["Survivor", "Hazard", "Watch", "Unknown"],
+                key="survivor_class_filter"
+            )
+        detail_df = semi_table[semi_table["Class"].isin(class_filter)].reset_index(drop=True)
+        n_pages = max(1, -(-len(detail_df) // SURVIVOR_PAGE_SIZE))
+        # フィルタやユニバースが変わってページ数が減ったら、ウィジェットを作る前に保存値を範囲内に戻す
+        # （ラベルは固定にして、ページ数や言語の変化でウィジェットが作り直されないようにする）
+        if st.session_state.get("survivor_page", 1) > n_pages:
+            st.session_state["survivor_page"] = n_pages
+        with p_col:
+            page = st.number_input(
+                "Page", min_value=1, max_value=n_pages, step=1, key="survivor_page"
+            )
+            st.caption(f"/ {n_pages}")
+        page_df = detail_df.iloc[(page - 1) * SURVIVOR_PAGE_SIZE: page * SURVIVOR_PAGE_SIZE]
+
+        st.markdown(card_grid([
+            survivor_card(
+                row["Ticker"], row["Class"], row.get("PSR", 0), row.get("rel20", 0) * 100, row.get("rel60", 0) * 100,
+                color_map.get(row["Class"], "#6c757d"),
+            )
+            for _, row in page_df.iterrows()
+        ], columns=5), unsafe_allow_html=True)
+
 
+# --- Performance Diagnostics (hidden: open with ?diag=1) ---
+
+perf.trace_duration("script_run", time.perf_counter() - _run_started)
+
+if st.query_params.get("diag") == "1":
+    with st.sidebar:
+        st.divider()
+        st.markdown("### ⏱ Diagnostics")
+        diag_summary = perf.summary()
+        st.dataframe(
+            diag_summary.style.format({
+                "Hit_Rate": "{:.0%}", "p50_ms": "{:.1f}", "p95_ms": "{:.1f}", "Max_ms": "{:.1f}",
+                "Total_ms": "{:.0f}", "Last_Bytes": "{:,.0f}", "Last_Rows": "{:,.0f}",
+            }, na_rep="-"),
+            use_container_width=True
+        )
+        loader_cache = get_loader_cache()
+        st.caption(f"Loader cache: {loader_cache.total_bytes / 1e6:,.1f} / {loader_cache.max_bytes / 1e6:,.0f} MB")
+        st.dataframe(
+            pd.DataFrame.from_dict(loader_cache.stats(), orient="index")[
+                ["entries", "max_entries", "bytes", "hits", "misses", "expired", "evicted_cap", "evicted_budget"]
+            ].sort_values("bytes", ascending=False),
+            use_container_width=True
+        )
+        diag_records = perf.records()
+        if not diag_records.empty:
+            diag_stage = st.selectbox("Stage", diag_summary.index.tolist(), key="diag_stage")
+            diag_sel = diag_records[diag_records["Stage"] == diag_stage].assign(
+                Cache=lambda d: d["Cache_Hit"].map({True: "hit", False: "miss"}).fillna("-")
+            )
+            import plotly.express as px  # 診断パネルを開いたときだけ
 
+            fig_diag = px.histogram(diag_sel, x="Latency_ms", color="Cache", nbins=30)
+            fig_diag.update_layout(height=220, margin=dict(l=0, r=0, t=10, b=0), font=dict(size=10), bargap=0.05)
+            st.plotly_chart(fig_diag, use_container_width=True, config={'displayModeBar': False})
+        if st.button("Reset", key="diag_reset"):
+            perf.reset()
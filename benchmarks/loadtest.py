@@ -0,0 +1,236 @@
+"""
+Rerun-latency load test: N concurrent headless sessions of app.py against replayed data.
+
+    python benchmarks/loadtest.py --sessions 8 --interactions 20
+    python benchmarks/loadtest.py --sessions 16 --latency-ms 80 --jitter-ms 40 --failure-rate 0.02
+    python benchmarks/loadtest.py --cold            # clear the loader caches first (cold-start fan-in)
+
+Each session is a streamlit.testing AppTest in its own thread, sharing the process-wide
+loader cache / st.cache_resource the way sessions share one server. After the initial
+run every session performs seeded random interactions:
+
+    language         toggle the JP / EN radio (the app reruns itself once more)
+    fee_slider       move the reservation-fee slider
+    survivor_filter  change the Survivor Map class filter
+
+Streamlit tabs switch client-side without a rerun, so "switching tabs" shows up as the
+in-tab widget interactions above rather than as its own action.
+
+Providers run in PROVIDER_MODE=replay from --fixtures; if the directory doesn't exist it
+is recorded from synthetic providers first (benchmarks/synthetic_fixtures.py). Reports
+p50 / p99 rerun latency overall and per action, throughput and peak RSS, and writes the
+same as JSON (--out).
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import providers
+import synthetic_fixtures
+
+APP_PATH = os.path.join(ROOT, "app.py")
+CLASSES = ["Survivor", "Hazard", "Watch", "Unknown"]
+
+
+def _peak_rss_mb():
+    # Linux reports KiB, macOS bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return None
+
+
+def share_script_cache():
+    """
+    AppTest compiles app.py into a fresh ScriptCache on every run; a real server shares one
+    per process. Share it here so reruns aren't dominated by recompiling a ~3k-line script,
+    and so concurrent sessions don't hit CPython 3.11's non-thread-safe ast.parse.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = ScriptCache()
+    app_test.ScriptCache = lambda: shared
+    local_script_runner.ScriptCache = lambda: shared
+
+
+# --- Session Actions ---
+
+def _language(at, rng):
+    radio = at.radio(key="lang_main")
+    return radio.set_value("EN" if radio.value == "JP" else "JP")
+
+
+def _fee_slider(at, rng):
+    return at.slider(key="res_fee").set_value(float(rng.randrange(0, 1001, 5)))
+
+
+def _survivor_filter(at, rng):
+    return at.multiselect(key="survivor_class_filter").set_value(rng.sample(CLASSES, rng.randint(1, len(CLASSES))))
+
+
+ACTIONS = {
+    "language": _language,
+    "fee_slider": _fee_slider,
+    "survivor_filter": _survivor_filter,
+}
+
+
+def run_session(sid, interactions, seed, timeout, start_barrier, samples, failures, lock):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed * 1000 + sid)
+    start_barrier.wait()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+    def timed(action, run):
+        t0 = time.perf_counter()
+        try:
+            run()
+        except Exception as e:  # AppTest timeout / widget lookup failure
+            with lock:
+                failures.append({"session": sid, "action": action, "error": repr(e)})
+            return False
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            samples.append({"session": sid, "action": action, "ms": elapsed, "t": time.time()})
+            for e in at.exception:
+                failures.append({"session": sid, "action": action, "error": e.value})
+        return True
+
+    if not timed("initial", at.run):
+        return
+    for _ in range(interactions):
+        name = rng.choice(list(ACTIONS))
+        if not timed(name, lambda: ACTIONS[name](at, rng).run()):
+            return
+
+
+def _stats(ms):
+    ms = np.asarray(ms, dtype=float)
+    return {
+        "n": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def run_load(sessions, interactions, seed=0, timeout=300, cold=False):
+    import streamlit as st
+
+    if cold:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    samples, failures = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=run_session, name=f"session-{i}",
+                         args=(i, interactions, seed, timeout, barrier, samples, failures, lock))
+        for i in range(sessions)
+    ]
+    rss_before = _current_rss_mb()
+    for th in threads:
+        th.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - t0
+
+    by_action = {}
+    for s in samples:
+        by_action.setdefault(s["action"], []).append(s["ms"])
+    reruns = [s["ms"] for s in samples if s["action"] != "initial"]
+    return {
+        "sessions": sessions,
+        "interactions_per_session": interactions,
+        "wall_s": wall,
+        "reruns_per_s": len(samples) / wall if wall else None,
+        "overall": _stats([s["ms"] for s in samples]) if samples else None,
+        "interactions": _stats(reruns) if reruns else None,
+        "by_action": {k: _stats(v) for k, v in sorted(by_action.items())},
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+        "failures": failures,
+    }
+
+
+def _print_report(rep):
+    print(f"\n{rep['sessions']} sessions × {rep['interactions_per_session']} interactions "
+          f"in {rep['wall_s']:.1f}s  ({rep['reruns_per_s']:.1f} reruns/s)")
+    print(f"{'action':<18}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = [("ALL", rep["overall"]), ("interactions", rep["interactions"])] + list(rep["by_action"].items())
+    for name, s in rows:
+        if s:
+            print(f"{name:<18}{s['n']:>6}{s['p50_ms']:>10.0f}{s['p90_ms']:>10.0f}{s['p99_ms']:>10.0f}{s['max_ms']:>10.0f}")
+    before = f"{rep['rss_before_mb']:.0f} MB before sessions, " if rep["rss_before_mb"] else ""
+    print(f"RSS: {before}peak {rep['peak_rss_mb']:.0f} MB")
+    if rep["failures"]:
+        print(f"{len(rep['failures'])} failure(s), first: {rep['failures'][0]}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--interactions", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=300, help="per-rerun AppTest timeout (s)")
+    ap.add_argument("--fixtures", default=synthetic_fixtures.DEFAULT_OUT)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--failure-rate", type=float, default=0.0)
+    ap.add_argument("--cold", action="store_true", help="clear Streamlit caches before the run")
+    ap.add_argument("--warmup", action="store_true", help="one untimed session first (warm caches)")
+    ap.add_argument("--out", help="write the report as JSON")
+    args = ap.parse_args(argv)
+
+    if not os.path.isdir(args.fixtures):
+        print(f"no fixtures at {args.fixtures}; recording synthetic ones")
+        synthetic_fixtures.record(args.fixtures)
+
+    share_script_cache()
+    providers.configure(mode="replay", fixtures=args.fixtures, latency_ms=args.latency_ms,
+                        jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed)
+    if args.warmup:
+        run_load(1, 0, args.seed, args.timeout)
+
+    rep = run_load(args.sessions, args.interactions, args.seed, args.timeout, args.cold)
+    rep.update({
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "providers": {k: v for k, v in providers.settings().items() if k != "stub_url"},
+        "cold": args.cold,
+        "warmup": args.warmup,
+    })
+    _print_report(rep)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2)
+        print(f"saved {args.out}")
+    return 1 if rep["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Memory of the cached datasets, as the loaders used to return them vs. after schema.py.
+
+    python benchmarks/memory_footprint.py                     # 1,000 tickers × 5 years
+    python benchmarks/memory_footprint.py --tickers 5000 --years 20 --out benchmarks/results/memory.json
+
+Datasets are synthetic (benchmarks/synthetic.py) in the shape each loader caches:
+
+    price_panel     fetch_price_series       date × ticker closes (yfinance: tz-aware index)
+    danger_source   get_danger_source_data   the same panel split into the four groups
+    metrics         get_live_metrics_v2      Ticker, Price, FCF, CapEx
+    capex_audit     build_capex_audit_from_yf latest quarter per ticker (Period as YYYY-MM-DD)
+    c2e_history     compute_c2e_history      daily Credit / Equity / Status labels
+
+"before" is float64 / object strings / tz-aware timestamps; "after" is what the loaders
+now put in the cache. Sizes are pandas deep memory usage (what perf records as Bytes).
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import perf
+import synthetic
+from engines import compute_c2e_history
+from schema import compact_frame, compact_prices, compact_statuses
+
+YF_TZ = "America/New_York"
+
+
+def _tz_panel(n, years, seed=0, names=None):
+    df = synthetic.price_panel(n, years, seed, names=names)
+    df.index = df.index.tz_localize(YF_TZ)
+    return df
+
+
+def datasets(n, years):
+    """{name: (before, after)}"""
+    panel = _tz_panel(n, years)
+    danger = {
+        "semi_equip": panel,
+        "sector": _tz_panel(1, years, 1, ["SOXX"]),
+        "dc_credit_proxy": _tz_panel(1, years, 2, ["SRVR"]),
+        "hy_proxy": _tz_panel(1, years, 3, ["HYG"]),
+    }
+    metrics = synthetic.metrics_frame(n)[["Ticker", "FCF", "CapEx"]].assign(
+        Price=np.round(np.random.default_rng(0).uniform(20, 400, n), 2))
+    audit = synthetic.latest_statements(synthetic.statement_frames(n, 1)).assign(
+        Period=lambda d: d["Period"].dt.strftime("%Y-%m-%d"))
+    history = compute_c2e_history(synthetic.c2e_aligned(years))
+    history_before = history.astype({c: object for c in ("Credit", "Equity", "Status")})
+    return {
+        "price_panel": (panel, compact_prices(panel)),
+        "danger_source": (danger, {k: compact_prices(v) for k, v in danger.items()}),
+        "metrics": (metrics, compact_frame(metrics, labels=["Ticker"], floats32=["Price"])),
+        "capex_audit": (audit, compact_frame(audit, labels=["Ticker", "Period"])),
+        "c2e_history": (history_before, compact_statuses(history)),
+    }
+
+
+def measure(n, years):
+    rows = []
+    for name, (before, after) in datasets(n, years).items():
+        b, a = perf._nbytes_of(before), perf._nbytes_of(after)
+        rows.append({"dataset": name, "before_bytes": b, "after_bytes": a, "ratio": a / b if b else None})
+    total_b = sum(r["before_bytes"] for r in rows)
+    total_a = sum(r["after_bytes"] for r in rows)
+    rows.append({"dataset": "TOTAL", "before_bytes": total_b, "after_bytes": total_a, "ratio": total_a / total_b})
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tickers", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--out", help="write the report as JSON")
+    args = ap.parse_args(argv)
+
+    rows = measure(args.tickers, args.years)
+    print(f"{args.tickers} tickers × {args.years} years")
+    print(f"{'dataset':<16}{'before MB':>12}{'after MB':>12}{'ratio':>8}")
+    for r in rows:
+        print(f"{r['dataset']:<16}{r['before_bytes'] / 1e6:>12.2f}{r['after_bytes'] / 1e6:>12.2f}{r['ratio']:>8.2f}")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "pandas": pd.__version__,
+                "tickers": args.tickers,
+                "years": args.years,
+                "results": rows,
+            }, f, indent=2)
+        print(f"saved {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
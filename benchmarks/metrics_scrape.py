@@ -0,0 +1,133 @@
+"""
+Local scrape check for the /metrics endpoint (perf.start_metrics_server).
+
+    python benchmarks/metrics_scrape.py
+
+Starts the exporter on a free port (port 0), drives one successful and one failed provider
+call, a cached loader miss then hit (LoaderCache + perf.traced, the way app.cached_stage
+wires them) and a snapshot stamp, then GETs /metrics over HTTP and parses the text format.
+Checks the counter, histogram and gauge samples those calls must produce and exits 1 on
+the first mismatch. Needs no network access and no Streamlit.
+"""
+import os
+import re
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import perf
+from loader_cache import LoaderCache
+
+PROVIDER = "scrape_check"
+STAGE = "scrape_check_loader"
+SNAPSHOT_AGE_S = 30.0
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$")
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_samples(text):
+    """Prometheus text format -> {(name, frozenset(labels)): value}; comments are skipped."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = _SAMPLE.match(line)
+        if m is None:
+            raise ValueError(f"unparseable sample line: {line!r}")
+        name, labels, value = m.groups()
+        samples[(name, frozenset(_LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def drive():
+    """The calls a rerun makes: provider requests, a cached loader miss + hit, a snapshot."""
+    with perf.provider_call(PROVIDER):
+        time.sleep(0.01)
+    try:
+        with perf.provider_call(PROVIDER):
+            raise ConnectionError("simulated upstream failure")
+    except ConnectionError:
+        pass
+
+    cache = LoaderCache(1_000_000, on_evict=perf.count_eviction)
+    cache.register(STAGE)
+    perf.watch_loader_cache(cache)
+
+    def body():
+        perf.mark_miss()
+        return time.time() - SNAPSHOT_AGE_S, list(range(100))
+
+    @perf.traced(STAGE, cached=True)
+    def loader():
+        created_at, value = cache.get_or_compute(STAGE, "key", body)
+        perf.observe_snapshot(STAGE, created_at)
+        return value
+
+    loader()  # miss
+    loader()  # hit
+
+
+def check(samples):
+    def get(name, **labels):
+        key = (name, frozenset((k, str(v)) for k, v in labels.items()))
+        if key not in samples:
+            raise AssertionError(f"missing sample {name}{labels}")
+        return samples[key]
+
+    def expect(cond, message):
+        if not cond:
+            raise AssertionError(message)
+
+    # Counters
+    expect(get("audit_provider_requests_total", provider=PROVIDER, outcome="ok") == 1, "ok request count")
+    expect(get("audit_provider_requests_total", provider=PROVIDER, outcome="error") == 1, "error request count")
+    expect(get("audit_provider_errors_total", provider=PROVIDER) == 1, "provider error count")
+    expect(get("audit_cache_requests_total", loader=STAGE, result="miss") == 1, "cache miss count")
+    expect(get("audit_cache_requests_total", loader=STAGE, result="hit") == 1, "cache hit count")
+
+    # Histogram: cumulative buckets ending in +Inf == _count, and a plausible _sum
+    buckets = sorted(
+        (float(dict(labels)["le"]), v) for (name, labels), v in samples.items()
+        if name == "audit_provider_request_seconds_bucket" and dict(labels).get("provider") == PROVIDER
+    )
+    expect(len(buckets) == len(perf.DEFAULT_BUCKETS) + 1 and buckets[-1][0] == float("inf"), "bucket set")
+    counts = [v for _, v in buckets]
+    expect(counts == sorted(counts), "buckets are cumulative")
+    expect(get("audit_provider_request_seconds_count", provider=PROVIDER) == counts[-1] == 2, "histogram count")
+    expect(get("audit_provider_request_seconds_sum", provider=PROVIDER) >= 0.01, "histogram sum")
+    expect(get("audit_stage_duration_seconds_count", stage=STAGE) == 2, "stage duration count")
+
+    # Gauges
+    age = get("audit_snapshot_age_seconds", loader=STAGE)
+    expect(SNAPSHOT_AGE_S <= age < SNAPSHOT_AGE_S + 60, f"snapshot age {age}")
+    expect(get("audit_loader_cache_entries", loader=STAGE) == 1, "loader cache entries")
+    expect(get("audit_loader_cache_bytes", loader=STAGE) > 0, "loader cache bytes")
+
+
+def main():
+    server = perf.start_metrics_server(0)
+    try:
+        host, port = server.server_address[:2]
+        drive()
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=10) as r:
+            content_type = r.headers.get("Content-Type", "")
+            text = r.read().decode("utf-8")
+        if not content_type.startswith("text/plain; version=0.0.4"):
+            raise AssertionError(f"content type {content_type!r}")
+        check(parse_samples(text))
+    except AssertionError as e:
+        print(f"FAIL: {e}")
+        return 1
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"OK: scraped {len(text.splitlines())} lines from :{port}/metrics")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Compute / chart benchmarks on synthetic data.
+
+    python benchmarks/run_benchmarks.py                      # full grid -> benchmarks/results/<git rev>.json
+    python benchmarks/run_benchmarks.py --quick              # 15 / 500 tickers, 1 / 5 years
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<base>.json
+
+Grid: 15 / 500 / 5,000 tickers × 1 / 5 / 20 years. Cases that don't scale with one of
+the axes (e.g. PSR has no time axis, the DC credit proxy is two series) run once per
+size of the other axis. --compare prints the median ratio per case and exits 1 when any
+case is slower than --threshold (default 1.25×) by more than --min-delta-ms (default 1 ms).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from charts import FigureCache, sparkline_figure, status_timeline_figure, survivor_scatter_figure
+from fingerprint import data_fingerprint
+from engines import (
+    capex_audit_ratios, classify_capex_health, compute_c2e_history, compute_psr,
+    dc_credit_divergence, estimate_lead_lag, c2e_change_signals, evaluate_l2_status,
+    relative_perf, semi_class_table, survivor_relative_returns,
+)
+from signal_stats import signal_stats
+
+TICKER_SIZES = (15, 500, 5000)
+YEAR_SIZES = (1, 5, 20)
+QUICK_TICKER_SIZES = (15, 500)
+QUICK_YEAR_SIZES = (1, 5)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# app.py の chart_config と同じ
+CHART_LAYOUT = dict(
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    height=200,
+    margin=dict(l=0, r=0, t=10, b=0),
+    font=dict(size=10)
+)
+STATUS_COLORS = {"HEALTHY": "#28A745", "WARNING": "#FFC107", "CRITICAL": "#DC3545"}
+
+
+# --- Cases ---
+# Each case: setup(tickers, years) -> args (untimed), run(*args) (timed).
+# axes: which of ("tickers", "years") the case scales with.
+
+def _setup_psr(n, years):
+    m = synthetic.metrics_frame(n)
+    return m["FCF"], m["CapEx"], m["TWh"], m["Price_Delta"], 315.0
+
+def _run_psr(fcf, capex, twh, delta, fee):
+    return compute_psr(fcf, capex, twh, delta, fee)
+
+
+def _setup_capex_health(n, years):
+    m = synthetic.metrics_frame(n)
+    m["PSR"] = compute_psr(m["FCF"], m["CapEx"], m["TWh"], m["Price_Delta"], 315.0)[0]
+    latest = synthetic.latest_statements(synthetic.statement_frames(n, years))
+    return (m.merge(latest, on="Ticker", how="left"),)
+
+def _run_capex_health(df):
+    df = capex_audit_ratios(df)
+    return df.apply(classify_capex_health, axis=1)
+
+
+def _setup_relative_perf(n, years):
+    return (synthetic.danger_source_data(n, years),)
+
+def _run_relative_perf(data):
+    return relative_perf(data)
+
+
+def _setup_dc_credit(n, years):
+    return (synthetic.danger_source_data(1, years),)
+
+def _run_dc_credit(data):
+    return dc_credit_divergence(data)
+
+
+def _setup_semi_class(n, years):
+    names = synthetic.tickers(n)
+    px = synthetic.price_panel(n, years).assign(SOXX=synthetic.price_panel(1, years, 1)["T0000"])
+    psr = compute_psr(*_setup_psr(n, years))[0]
+    return names, px, psr
+
+def _run_semi_class(names, px, psr):
+    rel = survivor_relative_returns(px, names, "SOXX")
+    return semi_class_table(names, psr, rel)
+
+
+def _setup_l2(n, years):
+    return (synthetic.l2_inputs(years),)
+
+def _run_l2(df):
+    # 日次の全履歴を判定（タイムライン化した場合のコスト）。ルールは配列のまま 1 回で評価する
+    return evaluate_l2_status(df["sofr_spread"], df["tnx_dev"], df["real_yield"], df["tail"])
+
+
+def _run_signal_stats(df):
+    # 4 シグナルの全履歴の全期間 / 1 年ローリングのパーセンタイルと Z スコア
+    return [signal_stats(df[c]) for c in df.columns]
+
+
+def _setup_c2e_history(n, years):
+    return (synthetic.c2e_aligned(years),)
+
+def _run_c2e_history(aligned):
+    return compute_c2e_history(aligned)
+
+
+def _setup_lead_lag(n, years):
+    return (c2e_change_signals(synthetic.c2e_aligned(years)),)
+
+def _run_lead_lag(signals):
+    return estimate_lead_lag(signals)
+
+
+def _setup_sparkline(n, years):
+    df = synthetic.fred_series(years, 3.5, 0.03)
+    return df, "date", "value", CHART_LAYOUT, STATUS_COLORS["WARNING"]
+
+def _run_sparkline(*args):
+    return sparkline_figure(*args).to_plotly_json()
+
+
+def _run_sparkline_lttb(*args):
+    return sparkline_figure(*args, max_points=500).to_plotly_json()
+
+
+def _setup_cached_sparkline(n, years):
+    # 2 回目以降はヒット: 指紋計算 + LRU 参照 + シリアライズのコスト
+    return (FigureCache(),) + _setup_sparkline(n, years)
+
+def _run_cached_sparkline(cache, *args):
+    key = ("sparkline", data_fingerprint(args))
+    return cache.get_or_build(key, lambda: sparkline_figure(*args)).to_plotly_json()
+
+
+def _setup_timeline(n, years):
+    return compute_c2e_history(synthetic.c2e_aligned(years)), ["Credit", "Equity", "C2E"], STATUS_COLORS, dict(CHART_LAYOUT, height=160)
+
+def _run_timeline(*args):
+    return status_timeline_figure(*args).to_plotly_json()
+
+
+def _setup_scatter(n, years):
+    return (_run_semi_class(*_setup_semi_class(n, 1)),)
+
+def _run_scatter(table):
+    return survivor_scatter_figure(table).to_plotly_json()
+
+
+CASES = [
+    # name,                      axes,                   setup,                 run
+    ("compute_psr",               ("tickers",),           _setup_psr,            _run_psr),
+    ("classify_capex_health",     ("tickers", "years"),   _setup_capex_health,   _run_capex_health),
+    ("compute_relative_perf",     ("tickers", "years"),   _setup_relative_perf,  _run_relative_perf),
+    ("compute_dc_credit_divergence", ("years",),          _setup_dc_credit,      _run_dc_credit),
+    ("build_semi_class_table",    ("tickers", "years"),   _setup_semi_class,     _run_semi_class),
+    ("evaluate_l2_status",        ("years",),             _setup_l2,             _run_l2),
+    ("signal_stats",              ("years",),             _setup_l2,             _run_signal_stats),
+    ("compute_c2e_history",       ("years",),             _setup_c2e_history,    _run_c2e_history),
+    ("estimate_lead_lag",         ("years",),             _setup_lead_lag,       _run_lead_lag),
+    ("chart:sparkline",           ("years",),             _setup_sparkline,      _run_sparkline),
+    ("chart:sparkline_lttb",      ("years",),             _setup_sparkline,      _run_sparkline_lttb),
+    ("chart:sparkline_cached",    ("years",),             _setup_cached_sparkline, _run_cached_sparkline),
+    ("chart:c2e_timeline",        ("years",),             _setup_timeline,       _run_timeline),
+    ("chart:survivor_scatter",    ("tickers",),           _setup_scatter,        _run_scatter),
+]
+
+
+def _grid(axes, ticker_sizes, year_sizes):
+    ts = ticker_sizes if "tickers" in axes else (None,)
+    ys = year_sizes if "years" in axes else (None,)
+    return [(t, y) for t in ts for y in ys]
+
+
+def time_case(run, args, repeat):
+    run(*args)  # warm-up (imports, first-call allocations)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+        # 1 回 2 秒を超えるケースは 3 回で打ち切る
+        if len(samples) >= 3 and samples[0] > 2000:
+            break
+    return samples
+
+
+def run_suite(ticker_sizes, year_sizes, repeat, only=None):
+    results = []
+    for name, axes, setup, run in CASES:
+        if only and not any(o in name for o in only):
+            continue
+        for n, years in _grid(axes, ticker_sizes, year_sizes):
+            args = setup(n or 15, years or 1)
+            samples = time_case(run, args, repeat)
+            res = {
+                "case": name,
+                "tickers": n,
+                "years": years,
+                "runs": len(samples),
+                "median_ms": float(np.median(samples)),
+                "min_ms": float(np.min(samples)),
+                "mean_ms": float(np.mean(samples)),
+            }
+            results.append(res)
+            print(f"{name:<30} tickers={str(n):>5} years={str(years):>3}  "
+                  f"median {res['median_ms']:10.2f} ms  min {res['min_ms']:10.2f} ms")
+    return results
+
+
+def case_key(res):
+    return f"{res['case']}|{res['tickers']}|{res['years']}"
+
+
+def compare(results, baseline_path, threshold, min_delta_ms):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {case_key(r): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\n--- vs {baseline_path} (median ratio, >{threshold:.2f}x and >{min_delta_ms:g} ms flagged) ---")
+    for r in results:
+        b = base.get(case_key(r))
+        if b is None or b["median_ms"] <= 0:
+            continue
+        ratio = r["median_ms"] / b["median_ms"]
+        # sub-millisecond cases are timer noise; require an absolute slowdown too
+        slower = ratio > threshold and r["median_ms"] - b["median_ms"] > min_delta_ms
+        flag = "  REGRESSION" if slower else ""
+        print(f"{r['case']:<30} tickers={str(r['tickers']):>5} years={str(r['years']):>3}  {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append(case_key(r))
+    return regressions
+
+
+def git_rev():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--quick", action="store_true", help="skip the 5,000-ticker / 20-year sizes")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="*", help="substring filter on case names")
+    ap.add_argument("--out", help="JSON output path (default: benchmarks/results/<git rev>.json)")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25)
+    ap.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = ap.parse_args(argv)
+
+    ticker_sizes = QUICK_TICKER_SIZES if args.quick else TICKER_SIZES
+    year_sizes = QUICK_YEAR_SIZES if args.quick else YEAR_SIZES
+    rev = git_rev()
+
+    results = run_suite(ticker_sizes, year_sizes, args.repeat, args.only)
+    payload = {
+        "git_rev": rev,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{rev}{'-quick' if args.quick else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nsaved {out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
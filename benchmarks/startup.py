@@ -0,0 +1,222 @@
+"""
+Cold-start benchmark: import time and time-to-first-render of a fresh server process.
+
+    python benchmarks/startup.py                       # 3 fresh servers, replayed data
+    python benchmarks/startup.py --runs 5 --latency-ms 150 --out benchmarks/results/startup.json
+    python benchmarks/startup.py --imports-only
+
+Imports: `python -X importtime` in a fresh interpreter, for the modules app.py imports at
+the top and, separately, for the ones it defers until a loader or chart needs them
+(plotly.graph_objects, plotly.express, requests, yfinance). Reports the wall time of the app import set and the
+heaviest top-level modules.
+
+First render: starts `streamlit run app.py` in a new process (PROVIDER_MODE=replay against
+--fixtures), waits for /_stcore/health, then connects over the browser websocket and asks
+for a run the way the frontend does. Timed from process spawn:
+
+    server_ready    health endpoint answers
+    first_delta     first element reaches the browser (header / skeleton)
+    first_chart     first Plotly chart element
+    script_done     script_finished (whole page rendered)
+
+Streamlit's file watcher and usage stats are turned off so they don't add noise.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_fixtures
+
+APP_PATH = os.path.join(ROOT, "app.py")
+# app.py の先頭で import しているもの / 使う時まで遅らせているもの
+APP_IMPORTS = ("streamlit", "pandas", "numpy", "perf", "providers", "charts", "cards", "engines")
+DEFERRED_IMPORTS = ("plotly.graph_objects", "plotly.express", "requests", "yfinance")
+_MARK = "--startup-bench-mark--"
+
+
+# --- Import Time ---
+
+def import_profile(modules, preload=()):
+    """
+    Fresh interpreter: import preload (untimed), then modules under -X importtime.
+    Returns wall ms and [(module, cumulative ms)] for the top-level imports.
+    """
+    code = "\n".join(
+        [f"import {m}" for m in preload]
+        + ["import sys, time", f"sys.stderr.write({_MARK!r} + '\\n')", "t0 = time.perf_counter()"]
+        + [f"import {m}" for m in modules]
+        + ["print((time.perf_counter() - t0) * 1000)"]
+    )
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                         text=True, cwd=ROOT, timeout=300)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed")
+    lines = out.stderr.split(_MARK, 1)[-1].splitlines()
+    top = []
+    for line in lines:
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            top.append((name.strip(), int(cumulative) / 1000))
+    return float(out.stdout.strip().splitlines()[-1]), top
+
+
+def measure_imports():
+    wall, top = import_profile(APP_IMPORTS)
+    deferred = {}
+    for m in DEFERRED_IMPORTS:
+        try:
+            deferred[m] = import_profile((m,), preload=APP_IMPORTS)[0]
+        except RuntimeError as e:  # optional dependency not installed
+            deferred[m] = None
+            print(f"  {m}: {e}")
+    return {
+        "app_imports_ms": wall,
+        "top_modules": [{"module": m, "cumulative_ms": ms} for m, ms in sorted(top, key=lambda t: -t[1])[:10]],
+        "deferred_ms": deferred,
+    }
+
+
+# --- Time To First Render ---
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_healthy(port, proc, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f"server not healthy after {timeout}s")
+
+
+async def _browser_run(port, t0, timeout):
+    import websockets
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    marks = {}
+    n = 0
+    async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                  max_size=None, open_timeout=timeout) as ws:
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        await ws.send(msg.SerializeToString())
+        while "script_done" not in marks:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(ws.recv(), timeout))
+            n += 1
+            now = (time.perf_counter() - t0) * 1000
+            kind = fwd.WhichOneof("type")
+            if kind == "delta":
+                marks.setdefault("first_delta", now)
+                if fwd.delta.new_element.WhichOneof("type") == "plotly_chart":
+                    marks.setdefault("first_chart", now)
+            elif kind == "script_finished":
+                marks["script_done"] = now
+    marks["messages"] = n
+    return marks
+
+
+def first_render(fixtures, latency_ms=0.0, timeout=120):
+    port = _free_port()
+    env = dict(os.environ, PROVIDER_MODE="replay", PROVIDER_FIXTURES=fixtures, REPLAY_LATENCY_MS=str(latency_ms))
+    cmd = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+        "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_healthy(port, proc, timeout)
+        res = {"server_ready": (time.perf_counter() - t0) * 1000}
+        res.update(asyncio.run(_browser_run(port, t0, timeout)))
+        return res
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _summary(runs):
+    keys = ("server_ready", "first_delta", "first_chart", "script_done")
+    return {k: {"median_ms": float(np.median([r[k] for r in runs if k in r])),
+                "min_ms": float(np.min([r[k] for r in runs if k in r]))}
+            for k in keys if any(k in r for r in runs)}
+
+
+def _print_report(rep):
+    imp = rep.get("imports")
+    if imp:
+        print(f"\napp imports: {imp['app_imports_ms']:.0f} ms")
+        for row in imp["top_modules"]:
+            print(f"  {row['module']:<28}{row['cumulative_ms']:>8.0f} ms")
+        print("deferred (on first use):")
+        for m, ms in imp["deferred_ms"].items():
+            print(f"  {m:<28}{'n/a' if ms is None else f'{ms:.0f}':>8} ms")
+    ttfr = rep.get("first_render")
+    if ttfr:
+        print(f"\nfresh server × {len(rep['runs'])} (from spawn, median / min)")
+        for k, s in ttfr.items():
+            print(f"  {k:<16}{s['median_ms']:>8.0f} ms {s['min_ms']:>8.0f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="fresh server processes to start")
+    ap.add_argument("--fixtures", default=synthetic_fixtures.DEFAULT_OUT)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--imports-only", action="store_true", help="skip the server runs")
+    ap.add_argument("--out", help="write the report as JSON")
+    args = ap.parse_args(argv)
+
+    rep = {"created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+           "python": sys.version.split()[0], "imports": measure_imports()}
+    if not args.imports_only:
+        if not os.path.isdir(args.fixtures):
+            print(f"no fixtures at {args.fixtures}; recording synthetic ones")
+            synthetic_fixtures.record(args.fixtures)
+        rep["latency_ms"] = args.latency_ms
+        rep["runs"] = [first_render(os.path.abspath(args.fixtures), args.latency_ms, args.timeout)
+                       for _ in range(args.runs)]
+        rep["first_render"] = _summary(rep["runs"])
+    _print_report(rep)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2)
+        print(f"saved {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
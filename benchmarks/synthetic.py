@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# --- Synthetic Inputs ---
+# 再現可能な（seed 固定・終了日固定）合成データ。形は各ローダーの出力に合わせる:
+#   価格パネル   fetch_price_series / get_danger_source_data (DatetimeIndex × Ticker の終値)
+#   FRED 系列    fetch_hy_oas_series / fetch_fred_series (date, value)
+#   財務諸表     build_capex_audit_from_yf (Ticker, Period, NI_Q, OCF_Q, CapEx_Q)
+#   メトリクス   get_live_metrics_v2 + physical_df (Ticker, FCF, CapEx, TWh, Price_Delta)
+
+END_DATE = "2025-12-31"
+TRADING_DAYS = 252
+
+
+def bdays(years: int) -> pd.DatetimeIndex:
+    return pd.bdate_range(end=END_DATE, periods=years * TRADING_DAYS)
+
+
+def tickers(n: int) -> list:
+    return [f"T{i:04d}" for i in range(n)]
+
+
+def price_panel(n_tickers: int, years: int, seed: int = 0, names=None) -> pd.DataFrame:
+    """幾何ランダムウォーク（年率 vol 30% 前後）。先頭 1% の銘柄は上場が遅く先頭が NaN。"""
+    rng = np.random.default_rng(seed)
+    idx = bdays(years)
+    names = list(names) if names is not None else tickers(n_tickers)
+    vol = rng.uniform(0.01, 0.03, size=len(names))
+    rets = rng.standard_normal((len(idx), len(names))) * vol + 0.0003
+    prices = 100.0 * np.exp(np.cumsum(rets, axis=0))
+    late = max(1, len(names) // 100)
+    prices[: len(idx) // 3, :late] = np.nan
+    return pd.DataFrame(prices, index=idx, columns=names)
+
+
+def fred_series(years: int, level: float, vol: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = bdays(years)
+    value = level + np.cumsum(rng.standard_normal(len(idx)) * vol)
+    return pd.DataFrame({"date": idx, "value": value})
+
+
+def statement_frames(n_tickers: int, years: int, seed: int = 0) -> pd.DataFrame:
+    """四半期 NI / OCF / CapEx（ロング形式）。CapEx は一部銘柄で利益を上回る。"""
+    rng = np.random.default_rng(seed)
+    periods = pd.period_range(end=END_DATE, periods=years * 4, freq="Q").to_timestamp()
+    names = tickers(n_tickers)
+    n = len(names) * len(periods)
+    ni = rng.normal(2e9, 1.5e9, n)
+    ocf = ni * rng.uniform(1.0, 1.8, n)
+    capex = -np.abs(ocf * rng.uniform(0.3, 1.4, n))
+    return pd.DataFrame({
+        "Ticker": np.repeat(names, len(periods)),
+        "Period": np.tile(periods, len(names)),
+        "NI_Q": ni,
+        "OCF_Q": ocf,
+        "CapEx_Q": capex,
+    })
+
+
+def latest_statements(statements: pd.DataFrame) -> pd.DataFrame:
+    """build_capex_audit_from_yf と同じく銘柄ごとに直近四半期だけ残す。"""
+    return statements.sort_values("Period").groupby("Ticker", as_index=False).last()
+
+
+def metrics_frame(n_tickers: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    names = tickers(n_tickers)
+    return pd.DataFrame({
+        "Ticker": names,
+        "FCF": rng.normal(2e10, 1.5e10, n_tickers),
+        "CapEx": -rng.uniform(5e9, 6e10, n_tickers),
+        "TWh": rng.uniform(0.0, 30.0, n_tickers),
+        "Price_Delta": rng.uniform(0.0, 60.0, n_tickers),
+    })
+
+
+def danger_source_data(n_tickers: int, years: int, seed: int = 0) -> dict:
+    """get_danger_source_data と同じキー構成。semi_equip が銘柄数に比例する。"""
+    return {
+        "semi_equip": price_panel(n_tickers, years, seed),
+        "sector": price_panel(1, years, seed + 1, names=["SOXX"]),
+        "dc_credit_proxy": price_panel(1, years, seed + 2, names=["SRVR"]),
+        "hy_proxy": price_panel(1, years, seed + 3, names=["HYG"]),
+    }
+
+
+def l2_inputs(years: int, seed: int = 0) -> pd.DataFrame:
+    """evaluate_l2_status の日次入力 (SOFR-IORB, TNX 乖離, 実質金利, 入札テール)。"""
+    rng = np.random.default_rng(seed)
+    idx = bdays(years)
+    return pd.DataFrame({
+        "sofr_spread": rng.normal(-0.05, 0.05, len(idx)),
+        "tnx_dev": rng.normal(0.05, 0.08, len(idx)),
+        "real_yield": fred_series(years, 1.9, 0.03, seed)["value"].to_numpy(),
+        "tail": rng.gamma(1.5, 1.0, len(idx)),
+    }, index=idx)
+
+
+def c2e_aligned(years: int, seed: int = 0) -> pd.DataFrame:
+    """align_c2e_inputs の出力形 (DC, Semi 比率 + HY OAS bps)。"""
+    ratios = price_panel(2, years, seed, names=["DC", "Semi"]) / 100.0
+    hy = fred_series(years, 3.5, 0.03, seed + 4)["value"].to_numpy() * 100
+    return ratios.assign(HY=hy).ffill().dropna()
@@ -0,0 +1,204 @@
+"""
+Record a full set of replay fixtures for app.py from synthetic providers (no network).
+
+    python benchmarks/synthetic_fixtures.py                    # -> benchmarks/fixtures/
+    python benchmarks/synthetic_fixtures.py --out /tmp/fx --all-universes
+
+Runs app.py once through AppTest with PROVIDER_MODE=record while providers.py talks to
+seeded synthetic stand-ins for yfinance, FRED and the published Google Sheets. The result
+is a fixture directory that PROVIDER_MODE=replay (and benchmarks/loadtest.py) can serve.
+Real recordings (PROVIDER_MODE=record streamlit run app.py) drop into the same layout.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import providers
+
+APP_PATH = os.path.join(ROOT, "app.py")
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "fixtures")
+HISTORY_START = "2015-01-01"
+
+# 指数・金利の水準（それ以外の銘柄は 20-400 のランダム水準）
+PRICE_LEVELS = {"^GSPC": 6900.0, "^NYFANG": 12000.0, "^TNX": 4.2, "SOXX": 240.0}
+FRED_LEVELS = {"SOFR": 4.30, "IORB": 4.40, "DFII10": 1.90, "BAMLH0A0HYM2": 3.20}
+PERIOD_ROWS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504}
+
+
+def _seed(name):
+    return zlib.crc32(name.encode("utf-8"))
+
+
+# --- yfinance stand-in ---
+
+@lru_cache(maxsize=None)
+def _close_path(symbol):
+    idx = pd.bdate_range(HISTORY_START, date.today(), tz="America/New_York", name="Date")
+    rng = np.random.default_rng(_seed(symbol))
+    level = PRICE_LEVELS.get(symbol, float(rng.uniform(20, 400)))
+    vol = 0.004 if symbol.startswith("^") else float(rng.uniform(0.012, 0.03))
+    rets = rng.standard_normal(len(idx)) * vol + 0.0002
+    path = np.exp(np.cumsum(rets))
+    return pd.Series(level * path / path[-1], index=idx)
+
+
+def _ohlcv(symbol, start=None, end=None, period=None):
+    close = _close_path(symbol)
+    if start is not None or end is not None:
+        lo = pd.Timestamp(start or HISTORY_START).tz_localize(None)
+        hi = pd.Timestamp(end or date.today()).tz_localize(None)
+        naive = close.index.tz_localize(None)
+        close = close[(naive >= lo) & (naive < hi)]
+    else:
+        close = close.iloc[-PERIOD_ROWS.get(period or "1mo", 21):]
+    return pd.DataFrame({
+        "Open": close * 0.998, "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": 1_000_000,
+    })
+
+
+class SyntheticTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        rng = np.random.default_rng(_seed(symbol) + 1)
+        self._quarters = pd.DatetimeIndex(pd.date_range(end=date.today(), periods=4, freq="QE")[::-1])
+        self._ni = rng.normal(4e9, 3e9, 4)
+        self._ocf = self._ni * rng.uniform(1.1, 1.8, 4)
+        self._capex = -np.abs(self._ocf * rng.uniform(0.3, 1.3, 4))
+
+    def history(self, period=None, start=None, end=None, **kwargs):
+        return _ohlcv(self.symbol, start, end, period)
+
+    @property
+    def quarterly_income_stmt(self):
+        return pd.DataFrame([self._ni], index=["Net Income"], columns=self._quarters)
+
+    @property
+    def quarterly_cashflow(self):
+        return pd.DataFrame([self._ocf, self._capex], index=["Operating Cash Flow", "Capital Expenditure"],
+                            columns=self._quarters)
+
+    @property
+    def cashflow(self):
+        years = pd.DatetimeIndex([pd.Timestamp(date.today().year - i - 1, 12, 31) for i in range(4)])
+        ocf, capex = self._ocf.sum() * 1.0, self._capex.sum() * 1.0
+        return pd.DataFrame(
+            [[ocf + capex] * 4, [capex] * 4, [ocf] * 4],
+            index=["Free Cash Flow", "Capital Expenditure", "Operating Cash Flow"], columns=years,
+        )
+
+
+class SyntheticYFinance:
+    Ticker = SyntheticTicker
+
+    @staticmethod
+    def download(tickers, start=None, end=None, progress=False, **kwargs):
+        frames = {t: _ohlcv(t, start, end) for t in tickers}
+        # yfinance >= 0.2.51: (Price, Ticker) column MultiIndex, auto-adjusted Close
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+
+# --- FRED / Google Sheets stand-in ---
+
+def _fred_observations(query):
+    series_id = query.get("series_id", "")
+    rng = np.random.default_rng(_seed(series_id))
+    idx = pd.bdate_range(HISTORY_START, date.today())
+    level = FRED_LEVELS.get(series_id, 2.0)
+    values = level + np.cumsum(rng.standard_normal(len(idx)) * 0.01)
+    values = values - values[-1] + level
+    obs = [{"date": d.strftime("%Y-%m-%d"), "value": f"{v:.2f}"} for d, v in zip(idx, values)]
+    if query.get("observation_start"):
+        obs = [o for o in obs if o["date"] >= query["observation_start"]]
+    if query.get("sort_order", "asc") == "desc":
+        obs = obs[::-1]
+    return obs[: int(query.get("limit", 100000))]
+
+
+def _sheet_urls():
+    """*_SHEET_URL constants from app.py (the sheets themselves aren't importable without Streamlit)."""
+    with open(APP_PATH, encoding="utf-8") as f:
+        return dict(re.findall(r'^\s*(\w+_SHEET_URL) = "([^"]+)"', f.read(), flags=re.M))
+
+
+def _sheet_csv(name):
+    if name == "LIQUIDITY_SHEET_URL":
+        months = pd.date_range(end=date.today() + timedelta(days=90), periods=24, freq="MS")
+        rng = np.random.default_rng(_seed(name))
+        return pd.DataFrame({"Date": months.strftime("%Y-%m-%d"), "Treasury_Tail": rng.gamma(1.5, 1.0, len(months)).round(2)})
+    if name == "PHYSICAL_SHEET_URL":
+        names = {"AMZN": "Amazon", "MSFT": "Microsoft", "GOOGL": "Alphabet", "META": "Meta", "NVDA": "NVIDIA"}
+        rng = np.random.default_rng(_seed(name))
+        return pd.DataFrame({
+            "銘柄 (Ticker)": [f"{n} ({t})" for t, n in names.items()],
+            "電力総使用量 (Annual TWh)": rng.uniform(5, 30, len(names)).round(1),
+            "電力上昇単価 (Δ$/MWh)": [f"+${v:.0f}" for v in rng.uniform(10, 60, len(names))],
+            "予約費用単価 (加重 $/MW-day)": [f"${v:.0f}" for v in rng.uniform(200, 400, len(names))],
+        })
+    return pd.DataFrame({"Key": ["Sample"], "Value": [1.0]})
+
+
+def synthetic_http_get(url, timeout=None):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    if parts.netloc == "api.stlouisfed.org":
+        body = json.dumps({"observations": _fred_observations(query)}).encode("utf-8")
+        return providers._response(url, 200, body, "application/json")
+    for name, sheet_url in _sheet_urls().items():
+        if url == sheet_url:
+            return providers._response(url, 200, _sheet_csv(name).to_csv(index=False).encode("utf-8"), "text/csv")
+    return providers._response(url, 404, b"unknown synthetic endpoint", "text/plain")
+
+
+# --- Recording ---
+
+def record(out, all_universes=False, timeout=600):
+    from streamlit.testing.v1 import AppTest
+
+    providers.configure(mode="record", fixtures=out)
+    providers.set_live_transport(yfinance=SyntheticYFinance, http_get=synthetic_http_get)
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        at.run()
+        if all_universes:
+            ms = at.multiselect(key="survivor_universe")
+            at = ms.set_value(list(ms.options)).run()
+        errors = [e.value for e in at.exception]
+    finally:
+        providers.set_live_transport()
+    return errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--all-universes", action="store_true", help="also record the full Survivor universe")
+    ap.add_argument("--clean", action="store_true", help="remove the output directory first")
+    args = ap.parse_args(argv)
+
+    if args.clean and os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+    started = datetime.now()
+    errors = record(args.out, args.all_universes)
+    n = sum(len(files) for _, _, files in os.walk(args.out))
+    print(f"recorded {n} files into {args.out} in {(datetime.now() - started).total_seconds():.1f}s")
+    for e in errors:
+        print(f"app exception: {e}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
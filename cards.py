@@ -0,0 +1,78 @@
+from html import escape
+
+# --- HTML Card Builders ---
+# カード行をまとめて 1 つの st.markdown 要素として描くための HTML 組み立て。
+# 見た目は app.py の <style> にある .card-grid / .metric-card 系のクラスで揃え、
+# カードごとに変わるのはアクセント色 (--accent) だけにする。Streamlit には依存しない。
+
+
+def _oneline(html):
+    # Markdown の HTML ブロックは空行で切れるので改行は空白に（HTML 上の見た目は同じ）
+    return " ".join(str(html).split("\n"))
+
+
+def card_grid(cards, columns=5):
+    """カード HTML のリストを 1 つのグリッド要素に。columns: 1 行あたりの列数"""
+    return f'<div class="card-grid" style="--cols:{columns};">' + "".join(cards) + "</div>"
+
+
+def status_card(title, value_str, msg, color, icon):
+    """ステータスカード（アイコン付き見出し・値・説明文、上辺にステータス色）"""
+    return (
+        f'<div class="metric-card accent-top" style="--accent:{color};">'
+        f'<div class="card-title">{icon} {title}</div>'
+        f'<div class="card-value-sm">{value_str}</div>'
+        f'<div class="card-desc">{_oneline(msg)}</div>'
+        "</div>"
+    )
+
+
+def aplc_card(ticker, price, psr_label, psr, level_title, color, fcf_label, fcf, burden_label, burden, breakdown):
+    """
+    APLC-5 の銘柄カード（PSR・水準・FCF / 物理負担と内訳）。
+    breakdown: [(ラベル, 金額), ...]（CapEx / 電気代 / 予約費用）
+    """
+    parts = "".join(f"<span>{label}: ${value/1e9:,.2f}B</span>" for label, value in breakdown)
+    return (
+        f'<div class="metric-card accent-top" style="--accent:{color};">'
+        f'<div class="card-head"><h3>{escape(ticker)}</h3><span class="card-muted">${price:,.0f}</span></div>'
+        f'<div class="card-label">{psr_label}</div>'
+        f'<div class="card-value accent-text">{psr:.2f}</div>'
+        f'<div class="card-level accent-text">{level_title}</div>'
+        '<div class="card-breakdown">'
+        f'<div class="card-kv"><span>{fcf_label}</span><span>${fcf/1e9:,.2f}B</span></div>'
+        f'<div class="card-kv card-kv-sep"><span>{burden_label}</span><span>${burden/1e9:,.2f}B</span></div>'
+        f'<div class="card-parts">{parts}</div>'
+        "</div>"
+        "</div>"
+    )
+
+
+def count_card(label, color):
+    """件数サマリー（中央寄せの 1 行）"""
+    return (
+        f'<div class="metric-card accent-top card-center" style="--accent:{color};">'
+        f'<div class="card-count accent-text">{label}</div>'
+        "</div>"
+    )
+
+
+def survivor_card(ticker, cls, psr, rel20, rel60, color):
+    """Survivor Map の銘柄詳細カード（左辺にクラス色）。rel20 / rel60 は %"""
+    return (
+        f'<div class="metric-card accent-left" style="--accent:{color};">'
+        f'<div class="card-ticker">{escape(ticker)}</div>'
+        f'<div class="card-class"><b>{cls}</b></div>'
+        f'<div class="card-stats">PSR: {psr:.2f}<br>20d Rel: {rel20:+.1f}%<br>60d Rel: {rel60:+.1f}%</div>'
+        "</div>"
+    )
+
+
+def legend_item(icon, label, desc, color):
+    """凡例 1 項目（色付きラベル + 説明文）"""
+    return (
+        f'<div class="legend-item" style="--accent:{color};">'
+        f'<div class="legend-label accent-text">{icon} {label}</div>'
+        f'<div class="legend-desc">{_oneline(desc)}</div>'
+        "</div>"
+    )
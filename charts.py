@@ -0,0 +1,261 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- Figure Builders ---
+# app.py のパネルで使う Plotly 図の組み立て。Streamlit には依存しない
+# （benchmarks/ から同じ図をそのまま計測できるように分離）。
+
+
+def _px():
+    # plotly.express は import だけで ~0.2 s かかるので、最初に図を組み立てるときまで遅らせる
+    import plotly.express as px
+    return px
+
+
+def _go():
+    # plotly.graph_objects も同じ理由で遅らせる（Streamlit 自身は st.plotly_chart まで plotly を読み込まない）
+    import plotly.graph_objects as go
+    return go
+
+
+class FigureCache:
+    """
+    組み立て済み Plotly 図の LRU（プロセス内、スレッドセーフ）。
+    キャッシュした図は複数セッションで共有されるので、取り出した側で変更しないこと。
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._figs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._figs)
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            fig = self._figs.get(key)
+            if fig is not None:
+                self._figs.move_to_end(key)
+                self.hits += 1
+                return fig
+        # 組み立てはロックの外で（同じキーを同時に組み立てても結果は同じ）
+        fig = build()
+        with self._lock:
+            self._figs[key] = fig
+            self._figs.move_to_end(key)
+            self.misses += 1
+            while len(self._figs) > self.maxsize:
+                self._figs.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._figs.clear()
+
+
+# --- Downsampling (LTTB) ---
+# 長い時系列を送る前に Largest-Triangle-Three-Buckets で間引く。各バケットから
+# 「前に残した点・次バケットの平均点」と作る三角形の面積が最大の点を残すので、
+# ピーク・谷など見た目の形が保たれる。
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    LTTB で残す点の位置（昇順、先頭と末尾を含む）。
+    x: 数値または datetime64、y: 数値（NaN を含まないこと）
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    x = x.astype("datetime64[ns]").astype(np.int64).astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    y = np.asarray(y, dtype=float)
+
+    # 先頭・末尾を除いた n-2 点を n_out-2 個のバケットへ
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    # 各バケットの平均点（ループ内では「次のバケット」の値として参照する）。最後は末尾の点
+    cxs = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1])
+    cys = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = cxs[i + 1], cys[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_lttb(df, x, ys, max_points):
+    """
+    df を LTTB で最大 max_points 行に間引く（x 昇順前提）。複数系列 ys はそれぞれ
+    max_points / len(ys) 点を選んで和集合を取るので、どの系列の形も残る。
+    max_points が None、または行数が収まる場合はそのまま返す。
+    """
+    if max_points is None or len(df) <= max_points:
+        return df
+    ys = [ys] if isinstance(ys, str) else list(ys)
+    per_trace = max(3, max_points // len(ys))
+    xs = df[x].to_numpy()
+    keep = []
+    for col in ys:
+        vals = df[col].to_numpy(dtype=float)
+        valid = np.flatnonzero(np.isfinite(vals))
+        keep.append(valid[lttb_indices(xs[valid], vals[valid], per_trace)])
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
+def sparkline_figure(df, x, y, layout, line_color, max_points=None):
+    """メトリクスカード内の小さな推移線 (SRVR/VNQ, HY OAS, SemiEq/SOXX)。"""
+    df = downsample_lttb(df, x, y, max_points)
+    fig = _px().line(df, x=x, y=y)
+    fig.update_layout(**layout, showlegend=False)
+    fig.update_traces(line_color=line_color)
+    return fig
+
+
+# C2E 履歴の各判定を 0-2 の共通スケールへ
+STATUS_LEVEL_CODE = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "HEALTHY": 0, "WARNING": 1, "CRITICAL": 2}
+
+def status_timeline_figure(hist, row_labels, status_colors, layout):
+    """
+    C2E ステータス推移ヒートマップ。行は row_labels のキーのまま（表示名は with_row_aliases で付ける）。
+    hist: compute_c2e_history の出力 (Credit / Equity / Status 列)
+    status_colors: {"HEALTHY": color, "WARNING": color, "CRITICAL": color}
+    """
+    z = [
+        hist["Credit"].map(STATUS_LEVEL_CODE).tolist(),
+        hist["Equity"].map(STATUS_LEVEL_CODE).tolist(),
+        hist["Status"].map(STATUS_LEVEL_CODE).tolist(),
+    ]
+    text = [hist["Credit"].tolist(), hist["Equity"].tolist(), hist["Status"].tolist()]
+
+    go = _go()
+    fig = go.Figure(go.Heatmap(
+        x=hist.index,
+        y=row_labels,
+        z=z,
+        text=text,
+        hovertemplate="%{x|%Y-%m-%d} %{y}: %{text}<extra></extra>",
+        zmin=0, zmax=2,
+        colorscale=[
+            [0.0, status_colors["HEALTHY"]], [0.33, status_colors["HEALTHY"]],
+            [0.33, status_colors["WARNING"]], [0.66, status_colors["WARNING"]],
+            [0.66, status_colors["CRITICAL"]], [1.0, status_colors["CRITICAL"]],
+        ],
+        showscale=False,
+    ))
+    fig.update_layout(**layout)
+    return fig
+
+
+def with_row_aliases(fig, row_aliases):
+    """
+    キャッシュ済みの図のコピーに y 軸の表示名（行キー -> 表示名の labelalias）を付ける。
+    図は言語に依存しないキーでキャッシュし、言語ごとの表示名は描画のたびにここで載せる。
+    """
+    return _go().Figure(fig).update_yaxes(labelalias=row_aliases)
+
+
+# --- Liquidity Friction (L2) cards ---
+
+def sofr_iorb_figure(df, layout, max_points=None):
+    """SOFR（実線）と IORB（破線）。df: date, SOFR, IORB"""
+    df = downsample_lttb(df, 'date', ['SOFR', 'IORB'], max_points)
+    fig = _px().line(df, x='date', y='SOFR')
+    fig.add_trace(_go().Scatter(x=df['date'], y=df['IORB'], name='IORB', line=dict(dash='dash', color='orange')))
+    fig.update_layout(**layout, showlegend=False)
+    return fig
+
+
+def divergence_bar_figure(df, layout, max_points=None):
+    """TNX 乖離の棒グラフ（乖離の大きさで色分け）。df: Date, Divergence"""
+    df = downsample_lttb(df, 'Date', 'Divergence', max_points)
+    fig = _px().bar(df, x='Date', y='Divergence', color='Divergence', color_continuous_scale='RdYlGn_r')
+    fig.update_layout(**layout)
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+def line_figure(df, x, y, layout, line_color, max_points=None):
+    df = downsample_lttb(df, x, y, max_points)
+    fig = _px().line(df, x=x, y=y)
+    fig.update_traces(line_color=line_color)
+    fig.update_layout(**layout)
+    return fig
+
+
+def monthly_bar_figure(df, x, y, layout, bar_color):
+    """月次（YYYY-MM のカテゴリ軸）の棒グラフ。"""
+    fig = _px().bar(df, x=x, y=y)
+    fig.update_traces(marker_color=bar_color)
+    fig.update_layout(
+        **layout,
+        xaxis=dict(type='category') # Ensure it treats YYYY-MM as categories
+    )
+    return fig
+
+
+def xcorr_figure(xcorr, layout):
+    """リード・ラグ相互相関（ペアごとの線 + ラグ 0 の縦線）。xcorr: index=Lag, 列=ペア"""
+    df_xc = xcorr.reset_index(names="Lag").melt(id_vars="Lag", var_name="Pair", value_name="Corr")
+    fig = _px().line(df_xc, x="Lag", y="Corr", color="Pair")
+    fig.add_vline(x=0, line_dash="dash", line_color="gray", opacity=0.5)
+    fig.update_layout(**layout, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
+
+
+SURVIVOR_CLASS_COLORS = {
+    "Survivor": "#007bff", # Blue
+    "Hazard": "#dc3545",   # Red
+    "Watch": "#ffc107",    # Yellow
+    "Unknown": "#6c757d"   # Gray
+}
+
+def survivor_scatter_figure(table):
+    """Survivor Map 散布図: 横軸 PSR (0-2.5 にクリップ)、縦軸 SOXX 対比 20 日相対 (%)。"""
+    df_plot = table.copy()
+    df_plot["PSR_clamped"] = df_plot["PSR"].clip(0, 2.5) # View range
+
+    go = _go()
+    fig = go.Figure()
+    # Ticker labels only while they stay readable; hover carries them beyond that
+    scatter_mode = "markers+text" if len(df_plot) <= 30 else "markers"
+
+    for cls in ["Survivor", "Hazard", "Watch", "Unknown"]:
+        sub = df_plot[df_plot["Class"] == cls]
+        if sub.empty: continue
+
+        fig.add_trace(go.Scattergl(
+            x=sub["PSR_clamped"],
+            y=sub["rel20"] * 100,
+            mode=scatter_mode,
+            text=sub["Ticker"],
+            textposition="top center",
+            hovertemplate="%{text}<br>PSR %{x:.2f}<br>20d Rel %{y:+.1f}%<extra></extra>",
+            marker=dict(size=14 if len(df_plot) <= 30 else 8, color=SURVIVOR_CLASS_COLORS[cls], line=dict(width=1, color="#333"), opacity=0.9),
+            name=cls
+        ))
+
+    fig.add_vline(x=1.0, line_dash="dash", line_color="red", opacity=0.5, annotation_text="PSR=1.0")
+    fig.add_vline(x=1.3, line_dash="dash", line_color="green", opacity=0.5, annotation_text="PSR=1.3")
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
+
+    fig.update_layout(
+        height=400,
+        margin=dict(l=40, r=40, t=30, b=40),
+        xaxis_title="Physical Durability (PSR)",
+        yaxis_title="20d Relative vs SOXX (%)",
+        plot_bgcolor="rgba(248,248,248,0.8)",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
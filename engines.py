@@ -0,0 +1,674 @@
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from rules import DEFAULT_RULES
+from schema import STATUS_DTYPE
+
+# --- Vectorized Compute Engines ---
+# app.py のスカラー判定ロジックを、全履歴・全銘柄に一括適用するための純粋な
+# numpy / pandas 実装。Streamlit には依存しない。
+
+
+# --- Credit → Equity Status History ---
+
+# credit_to_equity_panel の ratio.iloc[-1] / ratio.iloc[-22] と同じ 21 行差分
+C2E_LAG = 21
+
+def align_c2e_inputs(ratio_dc: pd.Series, ratio_semi: pd.Series, hy_oas: pd.DataFrame) -> pd.DataFrame:
+    """
+    SRVR/VNQ, SemiEq/SOXX の共通営業日に HY OAS (bps) を as-of で付与する。
+    Returns DataFrame[DC, Semi, HY] (DatetimeIndex, 昇順)。
+    """
+    df = pd.concat({"DC": ratio_dc, "Semi": ratio_semi}, axis=1, join="inner").dropna()
+    if df.empty:
+        return pd.DataFrame(columns=["DC", "Semi", "HY"])
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+    df = df.sort_index()
+
+    hy = pd.Series(np.nan, index=df.index)
+    if hy_oas is not None and not hy_oas.empty:
+        # FRED の値は % → bps
+        hy_src = hy_oas.set_index("date")["value"].sort_index() * 100
+        hy = hy_src.reindex(df.index, method="ffill")
+    df["HY"] = hy.to_numpy()
+    return df
+
+
+def classify_c2e_arrays(dc_chg, hy_oas_bps, semi_chg, rules=DEFAULT_RULES):
+    """
+    Credit→Equity 判定（ルール c2e_credit / c2e_equity と総合判定）。
+    NaN は比較が常に False となるため、欠損は dc=0, hy=300, semi=0 と同じ判定になる。
+    Returns (credit, equity, status)。入力がすべてスカラーなら str、それ以外は object 配列。
+    """
+    scalar = all(np.ndim(v) == 0 for v in (dc_chg, hy_oas_bps, semi_chg))
+    credit = np.asarray(rules.evaluate("c2e_credit", dc_chg, hy_oas_bps), dtype=object)
+    equity = np.asarray(rules.evaluate("c2e_equity", semi_chg), dtype=object)
+    credit, equity = np.broadcast_arrays(credit, equity)
+
+    status = np.select(
+        [
+            (credit == "HIGH") & (equity == "HIGH"),
+            credit == "HIGH",
+            (credit == "MEDIUM") & (equity != "LOW"),
+        ],
+        ["CRITICAL", "WARNING", "WARNING"],
+        default="HEALTHY",
+    ).astype(object)
+    if scalar:
+        return credit.item(), equity.item(), status.item()
+    return credit, equity, status
+
+
+def compute_c2e_history(aligned: pd.DataFrame, lag: int = C2E_LAG, rules=DEFAULT_RULES) -> pd.DataFrame:
+    """
+    整列済み入力 (align_c2e_inputs) から日次 C2E ステータス系列を作る。
+    先頭 lag 行は 30日変化率が定義できないため出力しない。
+    """
+    cols = ["DC_Chg30", "HY_OAS_bps", "Semi_Chg30", "Credit", "Equity", "Status"]
+    if aligned is None or len(aligned) <= lag:
+        return pd.DataFrame(columns=cols)
+
+    dc = aligned["DC"].to_numpy(dtype=float)
+    semi = aligned["Semi"].to_numpy(dtype=float)
+    hy = aligned["HY"].to_numpy(dtype=float)
+
+    dc_chg = (dc[lag:] / dc[:-lag] - 1) * 100
+    semi_chg = (semi[lag:] / semi[:-lag] - 1) * 100
+    hy_now = hy[lag:]
+
+    credit, equity, status = classify_c2e_arrays(dc_chg, hy_now, semi_chg, rules)
+    return pd.DataFrame(
+        {
+            "DC_Chg30": dc_chg,
+            "HY_OAS_bps": hy_now,
+            "Semi_Chg30": semi_chg,
+            "Credit": pd.Categorical(credit, dtype=STATUS_DTYPE),
+            "Equity": pd.Categorical(equity, dtype=STATUS_DTYPE),
+            "Status": pd.Categorical(status, dtype=STATUS_DTYPE),
+        },
+        index=aligned.index[lag:],
+    )
+
+
+class C2EHistoryCache:
+    """
+    C2E ステータス履歴のインクリメンタルキャッシュ。
+    既存の履歴と入力の重なり (直近 lag+1 行) が一致していれば、新しい日付の行だけを
+    計算して追記する。配当調整などで過去の価格が改訂された場合と、判定ルール
+    (RuleBook) の閾値が変わった場合は全再計算する。
+    st.cache_resource で全セッション共有される前提のためロックで保護する。
+    """
+
+    def __init__(self, lag: int = C2E_LAG):
+        self.lag = lag
+        self._inputs = pd.DataFrame(columns=["DC", "Semi", "HY"])
+        self._history = compute_c2e_history(None, lag)
+        self._rules_version = None
+        self._lock = threading.Lock()
+        self.rows_computed = 0  # 直近 update で計算した行数（診断用）
+
+    def _can_extend(self, aligned: pd.DataFrame) -> bool:
+        cached = self._inputs
+        if len(cached) <= self.lag:
+            return False
+        last_date = cached.index[-1]
+        if last_date not in aligned.index:
+            return False
+        pos = aligned.index.get_loc(last_date)
+        if pos < self.lag:
+            return False
+        window_new = aligned.iloc[pos - self.lag:pos + 1]
+        window_old = cached.iloc[-(self.lag + 1):]
+        if not window_new.index.equals(window_old.index):
+            return False
+        return np.allclose(
+            window_new.to_numpy(dtype=float), window_old.to_numpy(dtype=float),
+            rtol=1e-9, atol=0.0, equal_nan=True,
+        )
+
+    def update(self, aligned: pd.DataFrame, rules=DEFAULT_RULES) -> pd.DataFrame:
+        with self._lock:
+            if rules.version == self._rules_version and self._can_extend(aligned):
+                pos = aligned.index.get_loc(self._inputs.index[-1])
+                new_rows = len(aligned) - pos - 1
+                if new_rows > 0:
+                    tail = aligned.iloc[pos + 1 - self.lag:]
+                    self._history = pd.concat([self._history, compute_c2e_history(tail, self.lag, rules)])
+                # 入力の窓（直近 N 日）から外れた古い行を落とし、全再計算と同じ期間に揃える
+                self._history = self._history.loc[aligned.index[self.lag]:]
+                self.rows_computed = new_rows
+            else:
+                self._history = compute_c2e_history(aligned, self.lag, rules)
+                self.rows_computed = len(self._history)
+            self._inputs = aligned.copy()
+            self._rules_version = rules.version
+            return self._history
+
+
+# --- Multi-Horizon Returns ---
+
+RETURN_HORIZONS = (5, 10, 20, 60, 120, 250)
+
+
+def multi_horizon_returns(prices: pd.DataFrame, horizons=RETURN_HORIZONS) -> pd.DataFrame:
+    """
+    価格パネル (日付 × 銘柄) から銘柄 × ホライズンのリターン行列を一度の対数差分で求める。
+    ホライズン h は既存ロジックと同じく h 行の窓 (P[-1] / P[-h] - 1)。履歴不足は NaN。
+    """
+    horizons = list(horizons)
+    logp = np.log(prices.to_numpy(dtype=float))
+    T = logp.shape[0]
+    out = np.full((len(horizons), logp.shape[1]), np.nan)
+    if T:
+        h = np.asarray(horizons)
+        ok = (h >= 1) & (h <= T)
+        out[ok] = logp[-1][None, :] - logp[T - h[ok], :]
+    return pd.DataFrame(np.expm1(out).T, index=prices.columns, columns=horizons)
+
+
+def relative_return_matrix(prices: pd.DataFrame, benchmark: pd.Series, horizons=RETURN_HORIZONS):
+    """
+    ベンチマーク比の相対リターン (銘柄リターン − ベンチマークリターン)。
+    Returns (returns, relative): returns はベンチマーク行を含む絶対リターン。
+    """
+    bench_name = benchmark.name if benchmark.name is not None else "__BM__"
+    panel = prices.drop(columns=[bench_name], errors="ignore").join(benchmark.rename(bench_name), how="inner")
+    rets = multi_horizon_returns(panel, horizons)
+    relative = rets.drop(index=bench_name) - rets.loc[bench_name]
+    return rets, relative
+
+
+# --- Lead–Lag Estimation (DC credit → HY → Semi) ---
+
+LEAD_LAG_PAIRS = [("DC", "HY"), ("HY", "Semi"), ("DC", "Semi")]
+
+
+def c2e_change_signals(aligned: pd.DataFrame) -> pd.DataFrame:
+    """
+    伝播チェーンの日次変化系列。比率は対数差分、HY OAS は bps 差分。
+    """
+    out = pd.DataFrame(index=aligned.index)
+    out["DC"] = np.log(aligned["DC"].astype(float)).diff()
+    out["HY"] = aligned["HY"].astype(float).diff()
+    out["Semi"] = np.log(aligned["Semi"].astype(float)).diff()
+    return out.dropna()
+
+
+def _standardize(a: np.ndarray, axis: int) -> np.ndarray:
+    a = a - a.mean(axis=axis, keepdims=True)
+    sd = a.std(axis=axis, keepdims=True)
+    return np.divide(a, sd, out=np.zeros_like(a), where=sd > 0)
+
+
+def _xcorr_fft(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    標準化済み x, y (最終軸が時間) の相互相関を lag = -max_lag..max_lag で返す。
+    値 c[k] = mean_t x_t * y_{t+k}。k > 0 は x が y に先行することを意味する。
+    """
+    n = x.shape[-1]
+    n_fft = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    fx = np.fft.rfft(x, n_fft, axis=-1)
+    fy = np.fft.rfft(y, n_fft, axis=-1)
+    cc = np.fft.irfft(np.conj(fx) * fy, n_fft, axis=-1)
+    return np.concatenate([cc[..., n_fft - max_lag:], cc[..., :max_lag + 1]], axis=-1) / n
+
+
+def estimate_lead_lag(signals: pd.DataFrame, pairs=LEAD_LAG_PAIRS, max_lag: int = 60,
+                      window: int = 252, step: int = 21):
+    """
+    FFT 相互相関による先行・遅行推定。
+    Returns (summary, xcorr, rolling):
+      summary: ペアごとの Lead_Days (正 = 先行), Peak_Corr, 窓ごとの推定値の平均・標準偏差、
+               全期間推定と符号が一致した窓の割合 (Sign_Agreement)
+      xcorr:   lag × ペアの相互相関関数
+      rolling: 窓終端日 × ペアの推定先行日数
+    """
+    lags = np.arange(-max_lag, max_lag + 1)
+    labels = [f"{a}→{b}" for a, b in pairs]
+    empty = (
+        pd.DataFrame(columns=["Lead_Days", "Peak_Corr", "Rolling_Mean", "Rolling_Std", "Sign_Agreement"]),
+        pd.DataFrame(index=lags, columns=labels, dtype=float),
+        pd.DataFrame(columns=labels, dtype=float),
+    )
+    if signals is None or len(signals) <= 2 * max_lag:
+        return empty
+
+    cols = {c: i for i, c in enumerate(signals.columns)}
+    arr = signals.to_numpy(dtype=float).T  # (signal, time)
+    src = np.array([cols[a] for a, _ in pairs])
+    dst = np.array([cols[b] for _, b in pairs])
+
+    # Full sample: all pairs in one batched FFT
+    z = _standardize(arr, axis=-1)
+    cc_full = _xcorr_fft(z[src], z[dst], max_lag)  # (pair, lag)
+    peak_idx = np.abs(cc_full).argmax(axis=-1)
+    lead_full = lags[peak_idx]
+    peak_full = cc_full[np.arange(len(pairs)), peak_idx]
+
+    # Rolling windows: (window, signal, time) stacked for one FFT per pair
+    n = arr.shape[1]
+    if n >= window:
+        ends = np.arange(window, n + 1, step)
+        if ends[-1] != n:
+            ends = np.append(ends, n)
+        wins = np.stack([arr[:, e - window:e] for e in ends])
+        zw = _standardize(wins, axis=-1)
+        cc_roll = _xcorr_fft(zw[:, src], zw[:, dst], max_lag)  # (window, pair, lag)
+        lead_roll = lags[np.abs(cc_roll).argmax(axis=-1)]
+        rolling = pd.DataFrame(lead_roll, index=signals.index[ends - 1], columns=labels)
+    else:
+        rolling = pd.DataFrame(columns=labels, dtype=float)
+
+    if len(rolling):
+        roll_vals = rolling.to_numpy(dtype=float)
+        roll_mean = roll_vals.mean(axis=0)
+        roll_std = roll_vals.std(axis=0)
+        agree = (np.sign(roll_vals) == np.sign(lead_full)).mean(axis=0)
+    else:
+        roll_mean = roll_std = agree = np.full(len(pairs), np.nan)
+
+    summary = pd.DataFrame(
+        {
+            "Lead_Days": lead_full,
+            "Peak_Corr": peak_full,
+            "Rolling_Mean": roll_mean,
+            "Rolling_Std": roll_std,
+            "Sign_Agreement": agree,
+        },
+        index=labels,
+    )
+    xcorr = pd.DataFrame(cc_full.T, index=lags, columns=labels)
+    return summary, xcorr, rolling
+
+
+# --- Rolling Beta / Relative Drawdown Velocity (Danger Source Matrix) ---
+
+def rolling_beta(y: np.ndarray, x: np.ndarray, window: int) -> np.ndarray:
+    """
+    累積和による O(T) ローリング回帰 β。
+    y: (T, N) 銘柄リターン, x: (T, K) 説明変数リターン → (T, N, K)。先頭 window-1 行は NaN。
+    y の欠損は銘柄ごとに扱い、窓に NaN を含む銘柄のその行だけが NaN になる（x は欠損なしが前提）。
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if y.ndim == 1:
+        y = y[:, None]
+    if x.ndim == 1:
+        x = x[:, None]
+    T = y.shape[0]
+    out = np.full((T, y.shape[1], x.shape[1]), np.nan)
+    if T < window:
+        return out
+
+    # 全体平均で中心化してから累積和を取り、差分時の桁落ちを抑える
+    missing = np.isnan(y)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 全行 NaN の銘柄の nanmean
+        y = np.where(missing, 0.0, y - np.nanmean(y, axis=0))
+    x = x - x.mean(axis=0)
+
+    def wsum(a):
+        c = np.cumsum(a, axis=0)
+        c = np.concatenate([np.zeros((1,) + a.shape[1:]), c], axis=0)
+        return c[window:] - c[:-window]
+
+    sx = wsum(x)                                  # (T-w+1, K)
+    sy = wsum(y)                                  # (T-w+1, N)
+    sxx = wsum(x * x)                             # (T-w+1, K)
+    sxy = wsum(y[:, :, None] * x[:, None, :])     # (T-w+1, N, K)
+
+    var_x = sxx - sx * sx / window
+    cov = sxy - sy[:, :, None] * sx[:, None, :] / window
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov / var_x[:, None, :]
+    gaps = wsum(missing.astype(float)) > 0          # (T-w+1, N)
+    out[window - 1:] = np.where((var_x[:, None, :] > 0) & ~gaps[:, :, None], beta, np.nan)
+    return out
+
+
+def classify_sensitivity(pct):
+    """ローリング β の自己履歴パーセンタイル → HIGH / MEDIUM / LOW"""
+    pct = np.asarray(pct, dtype=float)
+    return np.select([pct >= 0.67, pct >= 0.33], ["HIGH", "MEDIUM"], default="LOW").astype(object)
+
+
+def classify_velocity(dd_speed, dd_accel, tol: float = 0.02):
+    """
+    相対ドローダウンの速度・加速度 → ACCEL / DISCONNECT / STABLE
+    ACCEL: ドローダウンが深まり、かつ深まる速度が増している
+    DISCONNECT: ドローダウンが縮小している（織り込みが剥落）
+    """
+    dd_speed = np.asarray(dd_speed, dtype=float)
+    dd_accel = np.asarray(dd_accel, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return np.select(
+            [(dd_speed < -tol) & (dd_accel < 0), dd_speed > tol],
+            ["ACCEL", "DISCONNECT"],
+            default="STABLE",
+        ).astype(object)
+
+
+def compute_sensitivity_velocity(prices: pd.DataFrame, benchmark: pd.Series, credit: pd.DataFrame,
+                                 beta_window: int = 60, dd_window: int = 60, horizon: int = 10,
+                                 pct_lookback: int = 250) -> pd.DataFrame:
+    """
+    ユニバース全銘柄の 感度 (クレジット proxy へのローリング β) と
+    速度 (ベンチマーク比ドローダウンの加速度) を一括計算する。
+    Returns 銘柄ごとの最新値 DataFrame (index = Ticker)。
+    """
+    cols = ["Sens_Pct", "Sens_Level", "DD", "DD_Speed", "DD_Accel", "Vel_Level"]
+    # 欠損で落とすのはベンチマークとクレジット proxy の行だけ。銘柄ごとの欠損（上場前・売買停止）は
+    # rolling_beta とドローダウン計算がその銘柄の中だけで扱う
+    df = prices.join(benchmark.rename("__BM__"), how="inner").join(credit, how="inner")
+    df = df.dropna(subset=["__BM__", *credit.columns])
+    tickers = list(prices.columns)
+    if len(df) <= max(beta_window, dd_window) + 2 * horizon:
+        return pd.DataFrame(columns=cols, index=pd.Index(tickers, name="Ticker"))
+
+    logp = np.log(df.to_numpy(dtype=float))
+    rets = np.diff(logp, axis=0)
+    n = len(tickers)
+    y = rets[:, :n]
+    x = rets[:, n + 1:]
+    proxies = list(credit.columns)
+
+    # 感度: 各 proxy への β を自己履歴 (直近 pct_lookback 日) 内の順位に変換し平均
+    beta = rolling_beta(y, x, beta_window)               # (T-1, N, K)
+    hist = beta[-pct_lookback:]
+    latest = beta[-1]
+    valid = ~np.isnan(hist)
+    with np.errstate(invalid="ignore"):
+        pct_by_proxy = (hist <= latest[None]).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    pct_by_proxy = np.where(np.isnan(latest), np.nan, pct_by_proxy)
+    sens_pct = np.nanmean(pct_by_proxy, axis=1) if len(proxies) else np.full(n, np.nan)
+
+    # 速度: 相対価格のローリング最高値からのドローダウンの 1 階・2 階差分
+    rel = pd.DataFrame(logp[:, :n] - logp[:, [n]], index=df.index, columns=tickers)
+    dd = np.exp(rel - rel.rolling(dd_window, min_periods=1).max()) - 1
+    speed = dd - dd.shift(horizon)
+    accel = speed - speed.shift(horizon)
+
+    out = pd.DataFrame(
+        {
+            "Sens_Pct": sens_pct,
+            "DD": dd.iloc[-1].to_numpy(),
+            "DD_Speed": speed.iloc[-1].to_numpy(),
+            "DD_Accel": accel.iloc[-1].to_numpy(),
+        },
+        index=pd.Index(tickers, name="Ticker"),
+    )
+    for k, proxy in enumerate(proxies):
+        out[f"Beta_{proxy}"] = latest[:, k]
+    out["Sens_Level"] = classify_sensitivity(out["Sens_Pct"])
+    out["Vel_Level"] = classify_velocity(out["DD_Speed"], out["DD_Accel"])
+    return out
+
+
+# --- PSR / Survivor Classification ---
+
+def compute_psr(fcf, capex, twh, price_delta, res_fee_unit):
+    """
+    calc_psr_row のベクトル版。
+    PSR = FCF / (|CapEx| + ΔElec + ResFee)
+      ΔElec  = TWh * 1e6 * Δ$/MWh
+      ResFee = (TWh * 1e6 / 8760) MW * $/MW-day * 365
+    Returns (psr, cost_elec, cost_res, burden)。burden <= 0 の PSR は 0。
+    """
+    fcf = np.asarray(fcf, dtype=float)
+    capex = np.abs(np.asarray(capex, dtype=float))
+    twh = np.asarray(twh, dtype=float)
+    cost_elec = twh * 1_000_000 * np.asarray(price_delta, dtype=float)
+    est_mw = (twh * 1_000_000) / 8760
+    cost_res = est_mw * np.asarray(res_fee_unit, dtype=float) * 365
+    burden = capex + cost_elec + cost_res
+    with np.errstate(invalid="ignore", divide="ignore"):
+        psr = np.where(burden > 0, fcf / np.where(burden > 0, burden, 1.0), 0.0)
+    return psr, cost_elec, cost_res, burden
+
+
+# pandas 3 は Copy-on-Write が常に有効。assign は元フレームの列データを共有し、増えるのは重ねた列だけ
+PANDAS_COW = int(pd.__version__.split(".")[0]) >= 3
+
+
+def overlay_psr(df: pd.DataFrame, res_fee_unit) -> pd.DataFrame:
+    """
+    料金依存の列（PSR・電気代・予約費用・総負担）を重ねた新しいフレーム（df は変更しない）。
+    セッション間で共有するベースフレームに使う。pandas 3 では df 側の列データを共有し、
+    それ以前は df をコピーしてから列を足す。
+    """
+    psr, cost_elec, cost_res, burden = compute_psr(df['FCF'], df['CapEx'], df['TWh'], df['Price_Delta'], res_fee_unit)
+    if PANDAS_COW:
+        return df.assign(PSR=psr, Cost_Elec=cost_elec, Cost_Res=cost_res, Total_Burden=burden)
+    out = df.copy()
+    out['PSR'], out['Cost_Elec'], out['Cost_Res'], out['Total_Burden'] = psr, cost_elec, cost_res, burden
+    return out
+
+
+def classify_survivor_arrays(psr, rel20, rel60, rules=DEFAULT_RULES):
+    """
+    Survivor Map の分類 (構造ランク・市場ランク・Anti-Reverse 最終クラス) を一括判定。
+    閾値はルール struct_rank / market_rank / survivor_promote（以下は既定値）。
+      StructRank: PSR >= 1.3 STRONG / >= 1.1 MID / >= 1.0 WEAK / それ以外 BROKEN
+      MarketRank: rel20 >= -2% & rel60 >= -5% FAVORED / rel20 >= -8% & rel60 >= -15% NEUTRAL / DUMPED
+      Class: STRONG/MID × FAVORED/NEUTRAL は PSR >= 1.35 & rel60 >= -2% & rel20 >= -1% の余裕が
+             ある場合のみ Survivor (それ以外 Watch)、WEAK/BROKEN × DUMPED は Hazard、他は Watch。
+    いずれかの入力が NaN の銘柄は Class = Unknown、ランクは None。
+    """
+    psr = np.asarray(psr, dtype=float)
+    rel20 = np.asarray(rel20, dtype=float)
+    rel60 = np.asarray(rel60, dtype=float)
+
+    struct = rules.evaluate("struct_rank", psr)
+    market = rules.evaluate("market_rank", rel20, rel60)
+    promote = rules.evaluate("survivor_promote", psr, rel20, rel60) == "PROMOTE"
+
+    base_survivor = np.isin(struct, ["STRONG", "MID"]) & np.isin(market, ["FAVORED", "NEUTRAL"])
+    base_hazard = np.isin(struct, ["WEAK", "BROKEN"]) & (market == "DUMPED")
+    final = np.select(
+        [base_survivor & promote, base_survivor, base_hazard],
+        ["Survivor", "Watch", "Hazard"],
+        default="Watch",
+    ).astype(object)
+
+    unknown = np.isnan(psr) | np.isnan(rel20) | np.isnan(rel60)
+    struct[unknown] = None
+    market[unknown] = None
+    final[unknown] = "Unknown"
+    return struct, market, final
+
+
+def survivor_relative_returns(prices: pd.DataFrame, universe, benchmark: str = "SOXX") -> pd.DataFrame:
+    """
+    Survivor ユニバースの 20 / 60 営業日リターンとベンチマーク (SOXX) 対比の相対リターン。
+    ベンチマークの営業日に揃え、銘柄ごとの短い欠損 (3 日まで) は前方補完。
+    履歴不足のホライズンは 0.0 扱い（従来の period_ret と同じ）。
+    Returns DataFrame[R20, R60, R20_SOXX, R60_SOXX, rel20, rel60] (index = Ticker)。
+    """
+    cols = ["R20", "R60", "R20_SOXX", "R60_SOXX", "rel20", "rel60"]
+    if prices.empty or benchmark not in prices.columns:
+        return pd.DataFrame(columns=cols)
+
+    px = prices[prices[benchmark].notna()].ffill(limit=3)
+    present = [t for t in universe if t in px.columns and t != benchmark]
+    rets, _ = relative_return_matrix(px[present], px[benchmark], (20, 60))
+    short = [h for h in (20, 60) if h > len(px)]
+    rets[short] = rets[short].fillna(0.0)
+
+    r20x = float(rets.at[benchmark, 20])
+    r60x = float(rets.at[benchmark, 60])
+    out = pd.DataFrame({
+        "R20": rets.loc[present, 20],
+        "R60": rets.loc[present, 60],
+        "R20_SOXX": r20x,
+        "R60_SOXX": r60x,
+    }, index=pd.Index(present, name="Ticker"))
+    out["rel20"] = out["R20"] - r20x
+    out["rel60"] = out["R60"] - r60x
+    return out[cols]
+
+
+def semi_class_table(tickers, psr, rel: pd.DataFrame, rules=DEFAULT_RULES) -> pd.DataFrame:
+    """
+    Survivor Map の表: PSR と rel20 / rel60 (survivor_relative_returns) から
+    StructRank / MarketRank / Class を付与する。rel に無い銘柄は Unknown。
+    """
+    tickers = list(tickers)
+    rel = rel.reindex(tickers)
+    psr = np.asarray(psr, dtype=float) if psr is not None else np.full(len(tickers), np.nan)
+    rel20 = rel["rel20"].to_numpy(dtype=float) if "rel20" in rel.columns else np.full(len(tickers), np.nan)
+    rel60 = rel["rel60"].to_numpy(dtype=float) if "rel60" in rel.columns else np.full(len(tickers), np.nan)
+
+    struct_rank, market_rank, final_class = classify_survivor_arrays(psr, rel20, rel60, rules)
+    return pd.DataFrame({
+        "Ticker": tickers,
+        "PSR": psr,
+        "rel20": rel20,
+        "rel60": rel60,
+        "StructRank": struct_rank,
+        "MarketRank": market_rank,
+        "Class": final_class
+    })
+
+
+# --- CapEx Health (APLC-5) ---
+
+def capex_audit_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """直近四半期の CapEx / NI, CapEx / OCF（分母 0 は NaN）を付与したコピーを返す。"""
+    out = df.copy()
+    out["CapEx_to_NI"] = np.where(out["NI_Q"].abs() > 0, out["CapEx_Q"].abs() / out["NI_Q"].abs(), np.nan)
+    out["CapEx_to_OCF"] = np.where(out["OCF_Q"].abs() > 0, out["CapEx_Q"].abs() / out["OCF_Q"].abs(), np.nan)
+    return out
+
+
+def classify_capex_health(row):
+    psr = row.get("PSR", np.nan)
+    c_ni = row.get("CapEx_to_NI", np.nan)
+    c_ocf = row.get("CapEx_to_OCF", np.nan)
+
+    # 物理的なブラックホール：
+    # PSR < 1.0 かつ CapEx が利益 or OCF を食い潰している
+    if (not np.isnan(psr) and psr < 1.0) and (
+        (not np.isnan(c_ni) and c_ni > 1.0) or
+        (not np.isnan(c_ocf) and c_ocf > 1.0)
+    ):
+        return "BLACK_HOLE"
+
+    # Dead Cross が出ているが PSR > 1.0 → 境界域
+    if ((not np.isnan(c_ni) and c_ni > 1.0) or
+        (not np.isnan(c_ocf) and c_ocf > 1.0)):
+        return "BOUNDARY"
+
+    # それ以外はとりあえず健全
+    return "HEALTHY"
+
+
+def classify_capex_health_arrays(psr, capex_to_ni, capex_to_ocf, rules=DEFAULT_RULES):
+    """classify_capex_health のベクトル版（ルール capex_health。NaN の比較は条件不成立として扱う）。"""
+    return rules.evaluate("capex_health", psr, capex_to_ni, capex_to_ocf)
+
+
+# --- Layer 2 Liquidity Status ---
+
+def evaluate_l2_status(sofr_spread, tnx_dev, real_yield, tail, rules=DEFAULT_RULES):
+    """
+    Layer 2 の 4 指標（ルール l2_sofr / l2_tnx / l2_real_yield / l2_tail）と総合判定。
+    総合: CRITICAL が l2.composite.critical_count 個以上で CRITICAL、
+          CRITICAL + WARNING が l2.composite.warning_count 個以上で WARNING、他は HEALTHY。
+    入力がすべてスカラーなら str、日次履歴などの配列なら object 配列で
+    (composite, sofr, tnx, real, tail) を返す。
+    """
+    scalar = all(np.ndim(v) == 0 for v in (sofr_spread, tnx_dev, real_yield, tail))
+    parts = np.broadcast_arrays(
+        np.asarray(rules.evaluate("l2_sofr", sofr_spread), dtype=object),
+        np.asarray(rules.evaluate("l2_tnx", tnx_dev), dtype=object),
+        np.asarray(rules.evaluate("l2_real_yield", real_yield), dtype=object),
+        np.asarray(rules.evaluate("l2_tail", tail), dtype=object),
+    )
+    red_count = sum((p == "CRITICAL").astype(int) for p in parts)
+    yellow_count = sum((p == "WARNING").astype(int) for p in parts)
+    comp_status = np.select(
+        [red_count >= rules.get("l2.composite.critical_count"),
+         red_count + yellow_count >= rules.get("l2.composite.warning_count")],
+        ["CRITICAL", "WARNING"],
+        default="HEALTHY",
+    ).astype(object)
+    if scalar:
+        return (comp_status.item(), *(p.item() for p in parts))
+    return (comp_status, *parts)
+
+
+# --- Danger Source: Relative Performance / DC Credit Divergence ---
+
+def relative_perf(data):
+    """
+    Semi 装置（AMAT/LRCX/KLAC/ASML 等ウェイト）と SOXX の
+    直近 N 日リターンを比較し、Relative Performance を返す
+    """
+    semi_df = data.get("semi_equip")
+    sector_df = data.get("sector")
+    if semi_df is None or sector_df is None:
+        return None
+    
+    # 等ウェイト合成
+    semi_prices = semi_df.dropna()
+    if semi_prices.empty:
+        return None
+    semi_prices['EQ'] = semi_prices.mean(axis=1)
+    
+    # セクター
+    soxx = sector_df[['SOXX']].dropna()
+    
+    # 共通日付
+    df = semi_prices[['EQ']].join(soxx, how='inner')
+    if df.empty:
+        return None
+    
+    # 直近 20 営業日リターン
+    window = min(20, len(df))
+    rets, rel_mat = relative_return_matrix(df[['EQ']], df['SOXX'], (window,))
+
+    semi_ret = rets.at['EQ', window]
+    soxx_ret = rets.at['SOXX', window]
+    
+    rel = rel_mat.at['EQ', window]  # 「装置だけ売られているか？」
+    return {
+        "semi_ret": semi_ret,
+        "soxx_ret": soxx_ret,
+        "relative": rel
+    }
+
+
+def dc_credit_divergence(data):
+    """
+    データセンター/インフラ REIT ETF (SRVR) と HY ETF (HYG)
+    のスプレッドを簡易的に測る。
+    実際の OAS ではなく「価格リターン差」をクレジット感応 proxy とする。
+    """
+    dc_df = data.get("dc_credit_proxy")
+    hy_df = data.get("hy_proxy")
+    if dc_df is None or hy_df is None:
+        return None
+    
+    dc = dc_df[['SRVR']].dropna()
+    hy = hy_df[['HYG']].dropna()
+    df = dc.join(hy, how='inner')
+    if df.empty:
+        return None
+    
+    window = min(60, len(df))  # クレジットとしては少し長め
+    rets, rel_mat = relative_return_matrix(df[['SRVR']], df['HYG'], (window,))
+
+    dc_ret = rets.at['SRVR', window]
+    hy_ret = rets.at['HYG', window]
+    
+    # HY は「リスク資産全体」、SRVR がそれより悪化していれば
+    # 「DC クレジットだけ先に裂けている」サイン
+    spread = rel_mat.at['SRVR', window]   # マイナス大きいほど危険
+    return {
+        "dc_ret": dc_ret,
+        "hy_ret": hy_ret,
+        "spread": spread
+    }
@@ -0,0 +1,86 @@
+import functools
+import hashlib
+import types
+
+import numpy as np
+import pandas as pd
+
+# --- Fingerprints ---
+# キャッシュキー用の指紋。cached_stage・価格/メトリクスのキャッシュ・MetricGraph・図のキャッシュが使う。
+# Plotly にも Streamlit にも依存しない（キーを作るだけのモジュールが図のモジュールを読み込まないように分離）。
+
+
+def _feed(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(type(obj).__name__.encode())
+        h.update(repr(obj.columns.tolist() if isinstance(obj, pd.DataFrame) else obj.name).encode())
+        h.update(repr([str(d) for d in np.atleast_1d(obj.dtypes)]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=repr):
+            _feed(h, k)
+            _feed(h, obj[k])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for v in obj:
+            _feed(h, v)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode())
+    h.update(b"|")
+
+
+def data_fingerprint(*parts):
+    """図の入力（系列・レイアウト・色など）のハッシュ。値が同じなら同じ指紋になる。"""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        _feed(h, p)
+    return h.hexdigest()
+
+
+# 関数が参照するモジュール定数のうち、指紋に含める値の型（DataFrame などの大きな状態は含めない）
+_CONST_TYPES = (str, bytes, int, float, bool, type(None), tuple, list, dict, set, frozenset)
+
+
+def _code_parts(code, names):
+    """コードだけで決まる部分（参照名は names に集める）。関数や globals は参照しない。"""
+    consts = []
+    for c in code.co_consts:
+        if isinstance(c, types.CodeType):
+            consts.append(_code_parts(c, names))  # 入れ子の関数・lambda・内包表記
+        elif isinstance(c, frozenset):
+            consts.append(sorted(map(repr, c)))  # repr の順序はハッシュシードで変わる
+        else:
+            consts.append(c)
+    names.update(code.co_names)
+    return [code.co_code, consts, list(code.co_names)]
+
+
+# キーはコードオブジェクト（値で比較される）なので、Streamlit の再実行で関数が作り直されても
+# 同じコードなら当たり、関数や実行ごとの __main__ の名前空間は保持しない。上限つき。
+@functools.lru_cache(maxsize=4096)
+def _code_digest(code):
+    names = set()
+    return data_fingerprint(_code_parts(code, names)), tuple(sorted(names))
+
+
+def code_fingerprint(func):
+    """
+    関数のコードの指紋（キャッシュキーに使う）。バイトコードに加えて定数・参照名・参照している
+    モジュール定数（閾値・列リスト・文字列など）の値を含めるので、それらだけを変えたデプロイでも変わる。
+    呼び出し先の関数の中身までは追わない。コードの部分だけをメモし、モジュール定数の値は
+    呼び出しごとに func.__globals__ から読み直す。
+    """
+    digest, names = _code_digest(func.__code__)
+    glb = func.__globals__
+    refs = {}
+    for name in names:
+        v = glb.get(name)
+        if isinstance(v, _CONST_TYPES):
+            refs[name] = sorted(map(repr, v)) if isinstance(v, (set, frozenset)) else v
+    return data_fingerprint(func.__qualname__, digest, refs)
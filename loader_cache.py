@@ -0,0 +1,198 @@
+"""
+In-process loader cache with a total memory budget (replaces st.cache_data for cached_stage).
+
+    LOADER_CACHE_MB=512 LOADER_CACHE_MAX_ENTRIES=32 streamlit run app.py
+
+Values are stored pickled, like st.cache_data: every hit returns a fresh copy, so a session
+can never mutate another session's data, and the pickle length is the exact number of
+bytes the entry holds. Three limits apply, checked after every store:
+
+    ttl          per stage; an expired entry is dropped on its next lookup
+    max_entries  per stage; the stage's least recently used entry goes first
+    max_bytes    whole process; least recently used entries of any stage go first
+
+A value larger than the whole budget is returned but not kept. Concurrent misses for the
+same key wait on a per-key lock, so one computes and the others read its result.
+get_many caches a request piecewise (one entry per key) and computes all missing keys
+in one call.
+No Streamlit dependency.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+STAT_FIELDS = ("hits", "misses", "expired", "evicted_cap", "evicted_budget", "oversize")
+
+
+@dataclass
+class _Entry:
+    blob: bytes
+    size: int
+    expires_at: float | None
+
+
+class LoaderCache:
+    def __init__(self, max_bytes, default_max_entries=None, on_evict=None):
+        self.max_bytes = max_bytes
+        self.default_max_entries = default_max_entries
+        self._on_evict = on_evict  # (stage, reason) -> None
+        self._entries = OrderedDict()  # (stage, key) -> _Entry, least recently used first
+        self._stages = {}  # stage -> {"ttl", "max_entries", "entries", "bytes", *STAT_FIELDS}
+        self._computing = {}  # (stage, key) -> Lock held while the value is computed
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def __contains__(self, stage):
+        return stage in self._stages
+
+    def register(self, stage, ttl=None, max_entries=None):
+        """Limits for a stage. Registering again keeps its entries and counters."""
+        with self._lock:
+            self._register(stage, ttl, max_entries)
+
+    def _register(self, stage, ttl=None, max_entries=None):
+        info = self._stages.setdefault(stage, {"entries": 0, "bytes": 0, **{f: 0 for f in STAT_FIELDS}})
+        info["ttl"] = ttl
+        info["max_entries"] = max_entries or self.default_max_entries
+
+    def _lookup(self, k):
+        # caller holds self._lock
+        entry = self._entries.get(k)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.time():
+            self._drop(k, "expired")
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(k)
+            self._stages[k[0]]["hits"] += 1
+        return entry
+
+    def _drop(self, k, reason=None):
+        entry = self._entries.pop(k)
+        info = self._stages[k[0]]
+        info["entries"] -= 1
+        info["bytes"] -= entry.size
+        self.total_bytes -= entry.size
+        if reason is not None:
+            info[reason] += 1
+            if self._on_evict is not None:
+                self._on_evict(k[0], reason)
+
+    def _store(self, k, blob):
+        info = self._stages[k[0]]
+        if len(blob) > self.max_bytes:
+            info["oversize"] += 1
+            return
+        if k in self._entries:
+            self._drop(k)
+        ttl = info["ttl"]
+        self._entries[k] = _Entry(blob, len(blob), time.time() + ttl if ttl else None)
+        info["entries"] += 1
+        info["bytes"] += len(blob)
+        self.total_bytes += len(blob)
+
+        cap = info["max_entries"]
+        if cap is not None and info["entries"] > cap:
+            for other in [o for o in self._entries if o[0] == k[0] and o != k][:info["entries"] - cap]:
+                self._drop(other, "evicted_cap")
+        if self.total_bytes > self.max_bytes:
+            for other in [o for o in self._entries if o != k]:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self._drop(other, "evicted_budget")
+
+    def get_or_compute(self, stage, key, compute):
+        """Cached value for (stage, key), or compute() stored under it. An unregistered stage gets the default limits."""
+        k = (stage, key)
+        with self._lock:
+            if stage not in self._stages:
+                self._register(stage)
+            entry = self._lookup(k)
+            lock = None if entry is not None else self._computing.setdefault(k, threading.Lock())
+        if entry is not None:
+            return pickle.loads(entry.blob)
+
+        with lock:
+            try:
+                with self._lock:
+                    # another thread may have stored it while we waited on the key lock
+                    entry = self._lookup(k)
+                if entry is not None:
+                    return pickle.loads(entry.blob)
+                value = compute()
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                with self._lock:
+                    self._stages[stage]["misses"] += 1
+                    self._store(k, blob)
+                return value
+            finally:
+                with self._lock:
+                    if self._computing.get(k) is lock:
+                        del self._computing[k]
+
+    def get_many(self, stage, keys, compute_missing, usable=None):
+        """
+        {key: value} for keys, where only the keys that are not cached (or whose cached value
+        fails usable(key, value)) go to a single compute_missing({key: cached value or None})
+        call returning {key: value}. Those keys stay locked while it runs, so an overlapping
+        request waits and then reads them instead of computing them again.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {k: v for k, v in self._cached(stage, keys).items() if usable is None or usable(k, v)}
+        todo = sorted((k for k in keys if k not in found), key=repr)
+        with self._lock:
+            if stage not in self._stages:
+                self._register(stage)
+            self._stages[stage]["hits"] += len(found)
+            locks = {k: self._computing.setdefault((stage, k), threading.Lock()) for k in todo}
+        if not todo:
+            return found
+
+        # per-key locks in a fixed order, so two overlapping requests cannot deadlock
+        for k in todo:
+            locks[k].acquire()
+        try:
+            # another request may have stored some of them while we waited
+            cached = self._cached(stage, todo)
+            ready = {k: v for k, v in cached.items() if usable is None or usable(k, v)}
+            found.update(ready)
+            todo = [k for k in todo if k not in ready]
+            if todo:
+                computed = compute_missing({k: cached.get(k) for k in todo})
+                blobs = {k: pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL) for k, v in computed.items()}
+                with self._lock:
+                    self._stages[stage]["misses"] += len(todo)
+                    for k, blob in blobs.items():
+                        self._store((stage, k), blob)
+                found.update(computed)
+        finally:
+            with self._lock:
+                for k, lock in locks.items():
+                    lock.release()
+                    if self._computing.get((stage, k)) is lock:
+                        del self._computing[(stage, k)]
+        return found
+
+    def _cached(self, stage, keys):
+        """Unexpired values among keys (no hit/miss counting)."""
+        blobs = {}
+        with self._lock:
+            for k in keys:
+                entry = self._entries.get((stage, k))
+                if entry is not None and entry.expires_at is not None and entry.expires_at <= time.time():
+                    self._drop((stage, k), "expired")
+                elif entry is not None:
+                    self._entries.move_to_end((stage, k))
+                    blobs[k] = entry.blob
+        return {k: pickle.loads(b) for k, b in blobs.items()}
+
+    def clear(self, stage=None):
+        with self._lock:
+            for k in [k for k in self._entries if stage is None or k[0] == stage]:
+                self._drop(k)
+
+    def stats(self):
+        """{stage: {"entries", "bytes", "max_entries", "ttl", "hits", "misses", "expired", "evicted_*", "oversize"}}"""
+        with self._lock:
+            return {stage: dict(info) for stage, info in self._stages.items()}
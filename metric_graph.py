@@ -0,0 +1,111 @@
+"""
+Declarative metric graph with memoized, incremental recomputation.
+
+    graph = MetricGraph()
+
+    @graph.node("live_metrics", "physical")
+    def base(live_metrics, physical): ...
+
+    @graph.node("base", "fee")
+    def aplc_metrics(base, fee): ...
+
+    run = graph.run(live_metrics=get_live_metrics_v2, physical=load_physical_metrics, fee=315.0)
+    run["aplc_metrics"]
+
+Each node names its inputs: other nodes, or sources supplied to run() as values or as
+zero-argument callables (called at most once per run, only if something needs them).
+A source's version is the fingerprint of its value; a node's version is the fingerprint
+of its own code (fingerprint.code_fingerprint: bytecode, constants and referenced module
+constants) and its inputs' versions. Results are memoized by version across runs
+and sessions, so when one input changes (the fee slider, a sheet update) only the
+nodes downstream of it are recomputed and everything else is a memo hit.
+
+Memoized results are shared between sessions: treat them as read-only and derive new
+frames with assign. Each node keeps its memo_size most recently used versions.
+No Streamlit dependency.
+"""
+import threading
+from collections import OrderedDict
+
+import perf
+from fingerprint import code_fingerprint, data_fingerprint
+
+
+class MetricGraph:
+    def __init__(self, memo_size=8):
+        self.memo_size = memo_size
+        self._nodes = {}  # name -> (func, inputs)
+        self._memo = {}  # name -> OrderedDict(version -> value), least recently used first
+        self._lock = threading.Lock()
+
+    def node(self, *inputs, name=None):
+        """Register func as a node named name (default: func.__name__). Registering again replaces it."""
+        def deco(func):
+            self._nodes[name or func.__name__] = (func, inputs)
+            return func
+        return deco
+
+    def downstream(self, name):
+        """Every node that (transitively) reads name."""
+        out, frontier = set(), {name}
+        while frontier:
+            frontier = {n for n, (_, inputs) in self._nodes.items() if frontier & set(inputs)} - out
+            out |= frontier
+        return out
+
+    def run(self, **sources):
+        return MetricRun(self, sources)
+
+    def _memoized(self, name, version, compute):
+        with perf.trace(f"metric:{name}", cached=True):
+            with self._lock:
+                memo = self._memo.setdefault(name, OrderedDict())
+                if version in memo:
+                    memo.move_to_end(version)
+                    return memo[version]
+            # Compute outside the lock (two sessions computing the same version get the same value)
+            perf.mark_miss()
+            value = compute()
+            with self._lock:
+                memo[version] = value
+                memo.move_to_end(version)
+                while len(memo) > self.memo_size:
+                    memo.popitem(last=False)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+
+class MetricRun:
+    """One evaluation (one script run): sources are resolved lazily, node values looked up by version."""
+
+    def __init__(self, graph, sources):
+        self._graph = graph
+        self._sources = sources
+        self._values = {}
+        self._versions = {}
+
+    def __getitem__(self, name):
+        self._resolve(name)
+        return self._values[name]
+
+    def _resolve(self, name):
+        if name in self._values:
+            return
+        if name in self._graph._nodes:
+            func, inputs = self._graph._nodes[name]
+            for i in inputs:
+                self._resolve(i)
+            args = [self._values[i] for i in inputs]
+            version = data_fingerprint(name, code_fingerprint(func), [self._versions[i] for i in inputs])
+            self._values[name] = self._graph._memoized(name, version, lambda: func(*args))
+        elif name in self._sources:
+            source = self._sources[name]
+            value = source() if callable(source) else source
+            self._values[name] = value
+            version = data_fingerprint(value)
+        else:
+            raise KeyError(f"metric graph: no node or source named {name!r}")
+        self._versions[name] = version
@@ -0,0 +1,227 @@
+"""
+On-disk, memory-mapped date × ticker price panel shared by every process on the host.
+
+    <root>/CURRENT               name of the live version directory (swapped atomically)
+    <root>/<version>/values.f32  float32, column-major: each ticker is one contiguous run
+    <root>/<version>/dates.npy   datetime64[D], ascending
+    <root>/<version>/meta.json   {"tickers": [...], "shape": [dates, tickers], "updated_at": epoch}
+
+Readers map values.f32 read-only (np.memmap mode "r"), so any number of processes share the
+same page-cache pages and nothing is copied until a slice is actually computed on. Writers
+build a complete new version next to the live one and then replace CURRENT; readers that
+still map an older version keep a valid mapping (old versions are unlinked, not truncated).
+
+Writers on the host are serialized by fcntl.flock on <root>/.writer.lock (writer()), so two
+processes refreshing at once cannot drop each other's tickers; without fcntl (Windows) the
+last writer wins. upsert(start=...) drops rows older than the history window, so the panel
+does not grow across refreshes. <root>/FAILED records when each ticker last failed to fetch
+(mark_failed / failed), so a caller can retry those on their own schedule instead of on
+every refresh.
+No Streamlit dependency.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from schema import PRICE_DTYPE, naive_dates
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_CURRENT = "CURRENT"
+_FAILED = "FAILED"
+_WRITER_LOCK = ".writer.lock"
+_KEEP_VERSIONS = 2  # live + the previous one (a reader may be between CURRENT and open)
+
+
+class PricePanel:
+    """1 つのバージョンの読み取り専用ビュー。frame / column はコピーせずに memmap を指す。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.tickers = list(meta["tickers"])
+        self.updated_at = float(meta["updated_at"])
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")).astype("datetime64[ns]"))
+        n_dates, n_tickers = meta["shape"]
+        if n_dates and n_tickers:
+            self.values = np.memmap(os.path.join(path, "values.f32"), dtype=PRICE_DTYPE, mode="r",
+                                    shape=(n_dates, n_tickers), order="F")
+        else:
+            self.values = np.empty((n_dates, n_tickers), dtype=PRICE_DTYPE)
+        self._col = {t: i for i, t in enumerate(self.tickers)}
+
+    def __contains__(self, ticker):
+        return ticker in self._col
+
+    def age(self):
+        return time.time() - self.updated_at
+
+    def _rows(self, start, end):
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start)))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side="right"))
+        return slice(lo, hi)
+
+    def column(self, ticker, start=None, end=None):
+        """1 銘柄の終値（連続領域のビュー）"""
+        return self.values[self._rows(start, end), self._col[ticker]]
+
+    def frame(self, tickers=None, start=None, end=None):
+        """
+        date × ticker の DataFrame。tickers が隣り合う列の並び（既定: 全列）ならコピーなしのビュー、
+        飛び飛びの列なら選んだ列だけを集める。ストアに無い銘柄は含めない。
+        """
+        rows = self._rows(start, end)
+        if tickers is None:
+            cols = slice(0, len(self.tickers))
+        else:
+            idx = [self._col[t] for t in tickers if t in self._col]
+            contiguous = idx and idx == list(range(idx[0], idx[0] + len(idx)))
+            cols = slice(idx[0], idx[0] + len(idx)) if contiguous else idx
+        names = self.tickers[cols] if isinstance(cols, slice) else [self.tickers[i] for i in cols]
+        return pd.DataFrame(self.values[rows, cols], index=self.dates[rows], columns=names, copy=False)
+
+
+class PricePanelStore:
+    """root ディレクトリ上の PricePanel のバージョン管理（書き込みと、最新版への付け替え）。"""
+
+    def __init__(self, root):
+        self.root = root
+        self._panel = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # writer() の入れ子の深さ（スレッドごと）
+        os.makedirs(root, exist_ok=True)
+
+    @contextmanager
+    def writer(self):
+        """
+        ホスト内の書き手を 1 つにする排他ロック（入れ子可）。判定 → 取得 → upsert をまとめて囲めば、
+        待っている間に別プロセスが書いた版を見てから判断できる。
+        """
+        depth = getattr(self._local, "depth", 0)
+        if fcntl is None or depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+        with open(os.path.join(self.root, _WRITER_LOCK), "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _current_version(self):
+        try:
+            with open(os.path.join(self.root, _CURRENT), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """最新バージョンのパネル（別プロセスが書き換えていれば開き直す）。未作成なら None。"""
+        version = self._current_version()
+        with self._lock:
+            if version is None:
+                return None
+            if self._panel is None or self._panel.version != version:
+                self._panel = PricePanel(os.path.join(self.root, version))
+            return self._panel
+
+    def write(self, prices):
+        """prices (DatetimeIndex × Ticker) を新しいバージョンとして書き、CURRENT を付け替える。"""
+        with self.writer():
+            return self._write(prices.sort_index())
+
+    def _write(self, prices):
+        version = f"v{time.time_ns()}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(self.root, version)
+        os.makedirs(path)
+        values = np.asfortranarray(prices.to_numpy(dtype=PRICE_DTYPE))
+        if values.size:
+            values.T.tofile(os.path.join(path, "values.f32"))  # F 順の 2 次元 = 転置の C 順
+        np.save(os.path.join(path, "dates.npy"), naive_dates(prices.index).to_numpy().astype("datetime64[D]"))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"tickers": [str(c) for c in prices.columns], "shape": list(values.shape),
+                       "updated_at": time.time()}, f)
+
+        tmp = os.path.join(self.root, f".{_CURRENT}.{version}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, _CURRENT))
+        self._prune(keep=version)
+        return self.current()
+
+    def upsert(self, prices, start=None):
+        """
+        現行パネルに prices を重ねて（日付・銘柄の和集合、重なりは新しい値）書き直す。列順は既存 → 追加分。
+        start を渡すとそれより前の行は落とす（保持期間の窓）。書いた銘柄は FAILED から外す。
+        """
+        with self.writer():
+            panel = self.current()
+            if panel is not None:
+                base = panel.frame()
+                merged = prices.combine_first(base) if not base.empty else prices
+                cols = list(base.columns) + [c for c in prices.columns if c not in panel]
+                prices = merged[cols]
+            if start is not None:
+                prices = prices[prices.index >= pd.Timestamp(start)]
+            panel = self._write(prices.sort_index())
+            failed = self._read_failed()
+            if any(t in failed for t in prices.columns):
+                self._write_failed({t: at for t, at in failed.items() if t not in prices.columns})
+            return panel
+
+    def failed(self, max_age=None):
+        """{銘柄: 最後に取得に失敗した時刻}。max_age 秒より前の失敗は含めない。"""
+        failed = self._read_failed()
+        if max_age is None:
+            return failed
+        now = time.time()
+        return {t: at for t, at in failed.items() if now - at < max_age}
+
+    def mark_failed(self, tickers):
+        """tickers を今の時刻で失敗として記録する（次に upsert で書かれるまで残る）。"""
+        if not tickers:
+            return
+        with self.writer():
+            failed = self._read_failed()
+            now = time.time()
+            failed.update({t: now for t in tickers})
+            self._write_failed(failed)
+
+    def _read_failed(self):
+        try:
+            with open(os.path.join(self.root, _FAILED), encoding="utf-8") as f:
+                return {str(t): float(at) for t, at in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_failed(self, failed):
+        # caller holds writer()
+        tmp = os.path.join(self.root, f".{_FAILED}.{uuid.uuid4().hex[:6]}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(failed, f)
+        os.replace(tmp, os.path.join(self.root, _FAILED))
+
+    def _prune(self, keep):
+        versions = sorted(d for d in os.listdir(self.root)
+                          if d.startswith("v") and os.path.isdir(os.path.join(self.root, d)))
+        stale = [v for v in versions if v != keep]
+        for v in stale[:max(0, len(stale) - (_KEEP_VERSIONS - 1))]:
+            shutil.rmtree(os.path.join(self.root, v), ignore_errors=True)
@@ -0,0 +1,360 @@
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# --- Hot-Path Instrumentation ---
+# Process-wide stage timings for loaders, compute stages and chart rendering.
+# Each record: wall time, cache hit/miss (cached loaders only), bytes and rows.
+# bytes = wire bytes when the stage reports them (add_bytes), otherwise the
+# in-memory size of the returned frames.
+
+MAX_SAMPLES_PER_STAGE = 2000
+
+_lock = threading.Lock()
+_records = defaultdict(lambda: deque(maxlen=MAX_SAMPLES_PER_STAGE))
+_current = ContextVar("perf_span", default=None)
+
+
+class Span:
+    __slots__ = ("stage", "start", "duration", "cache_hit", "bytes", "rows")
+
+    def __init__(self, stage, cached):
+        self.stage = stage
+        self.start = time.time()
+        self.duration = 0.0
+        # Cached loaders start as hits; the cache body flips it via mark_miss()
+        self.cache_hit = True if cached else None
+        self.bytes = None
+        self.rows = None
+
+
+def _rows_of(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, dict):
+        frames = [v for v in obj.values() if isinstance(v, (pd.DataFrame, pd.Series))]
+        return sum(len(v) for v in frames) if frames else len(obj)
+    if isinstance(obj, (list, tuple)):
+        frames = [v for v in obj if isinstance(v, (pd.DataFrame, pd.Series))]
+        return sum(len(v) for v in frames) if frames else len(obj)
+    return None
+
+
+def _nbytes_of(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(_nbytes_of(v) or 0 for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes_of(v) or 0 for v in obj)
+    return None
+
+
+def _record(span):
+    with _lock:
+        _records[span.stage].append(span)
+
+
+@contextmanager
+def trace(stage, cached=False):
+    """Time a block as `stage`. Nested stages are recorded independently."""
+    span = Span(stage, cached)
+    token = _current.set(span)
+    t0 = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration = time.perf_counter() - t0
+        _current.reset(token)
+        _record(span)
+        STAGE_SECONDS.observe(span.duration, stage=stage)
+        if span.cache_hit is not None:
+            CACHE_REQUESTS.inc(loader=stage, result="hit" if span.cache_hit else "miss")
+
+
+def traced(stage, cached=False):
+    """Decorator form of trace(); fills rows/bytes from the return value."""
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(stage, cached) as span:
+                result = func(*args, **kwargs)
+                span.rows = _rows_of(result)
+                if span.bytes is None:
+                    span.bytes = _nbytes_of(result)
+                return result
+        return wrapper
+    return deco
+
+
+def trace_duration(stage, seconds):
+    """Record an externally measured duration (e.g. a whole script run)."""
+    span = Span(stage, False)
+    span.duration = seconds
+    _record(span)
+
+
+def mark_miss():
+    span = _current.get()
+    if span is not None:
+        span.cache_hit = False
+
+
+def add_bytes(n):
+    span = _current.get()
+    if span is not None:
+        span.bytes = (span.bytes or 0) + int(n)
+
+
+def observe_snapshot(loader, created_at):
+    """Remember when the snapshot just served by `loader` was produced."""
+    with _lock:
+        _snapshot_created[loader] = created_at
+
+
+def records() -> pd.DataFrame:
+    with _lock:
+        rows = [
+            (s.stage, s.start, s.duration * 1000, s.cache_hit, s.bytes, s.rows)
+            for spans in _records.values() for s in spans
+        ]
+    return pd.DataFrame(rows, columns=["Stage", "Start", "Latency_ms", "Cache_Hit", "Bytes", "Rows"])
+
+
+def summary() -> pd.DataFrame:
+    df = records()
+    cols = ["Calls", "Hit_Rate", "p50_ms", "p95_ms", "Max_ms", "Total_ms", "Last_Bytes", "Last_Rows"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    g = df.groupby("Stage")
+    hits = df.dropna(subset=["Cache_Hit"]).astype({"Cache_Hit": float}).groupby("Stage")["Cache_Hit"].mean()
+    out = pd.DataFrame({
+        "Calls": g.size(),
+        "Hit_Rate": hits,
+        "p50_ms": g["Latency_ms"].median(),
+        "p95_ms": g["Latency_ms"].quantile(0.95),
+        "Max_ms": g["Latency_ms"].max(),
+        "Total_ms": g["Latency_ms"].sum(),
+        "Last_Bytes": g["Bytes"].last(),
+        "Last_Rows": g["Rows"].last(),
+    })
+    return out[cols].sort_values("Total_ms", ascending=False)
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+# --- Prometheus Metrics ---
+# Minimal text-format (0.0.4) exporter so a local scrape can read provider
+# latency, errors, retries, rate-limit waits, loader cache efficiency and
+# snapshot age without an external client library.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_label_str(k)} {v:g}" for k, v in sorted(items)]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, callback):
+        super().__init__(name, help_text)
+        self._callback = callback  # () -> {labels tuple: value}
+
+    def render(self):
+        items = self._callback()
+        return self._header() + [f"{self.name}{_label_str(k)} {v:g}" for k, v in sorted(items.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self._values.items()]
+        lines = self._header()
+        for key, (counts, total, n) in sorted(items):
+            for b, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', f'{b:g}'),))} {c}")
+            lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {n}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {total:g}")
+            lines.append(f"{self.name}_count{_label_str(key)} {n}")
+        return lines
+
+
+_REGISTRY = []
+_snapshot_created = {}
+
+PROVIDER_SECONDS = Histogram("audit_provider_request_seconds", "Upstream provider request latency.")
+PROVIDER_REQUESTS = Counter("audit_provider_requests_total", "Upstream provider requests by outcome.")
+PROVIDER_ERRORS = Counter("audit_provider_errors_total", "Upstream provider requests that raised or returned an error status.")
+PROVIDER_RETRIES = Counter("audit_provider_retries_total", "Upstream provider request retries.")
+RATE_LIMIT_WAIT = Counter("audit_provider_rate_limit_wait_seconds_total", "Seconds slept to stay under provider rate limits.")
+CACHE_REQUESTS = Counter("audit_cache_requests_total", "Cached loader calls by result (hit/miss).")
+SHARED_CACHE_REQUESTS = Counter("audit_shared_cache_requests_total", "In-process misses served by the host-wide cache, by result (hit/wait/miss).")
+LOADER_CACHE_EVICTIONS = Counter("audit_loader_cache_evictions_total", "Loader cache entries dropped, by reason (expired/evicted_cap/evicted_budget).")
+STAGE_SECONDS = Histogram("audit_stage_duration_seconds", "Wall time of traced loaders, compute stages and renders.")
+
+
+def _snapshot_ages():
+    now = time.time()
+    with _lock:
+        return {(("loader", k),): now - v for k, v in _snapshot_created.items()}
+
+
+SNAPSHOT_AGE = Gauge("audit_snapshot_age_seconds", "Age of the data snapshot most recently served by each loader.", _snapshot_ages)
+
+_loader_cache = None
+
+
+def watch_loader_cache(cache):
+    """Export entries / bytes of a loader_cache.LoaderCache (the one cached_stage uses)."""
+    global _loader_cache
+    _loader_cache = cache
+
+
+def _loader_cache_stat(field):
+    def collect():
+        stats = _loader_cache.stats() if _loader_cache is not None else {}
+        return {(("loader", stage),): info[field] for stage, info in stats.items()}
+    return collect
+
+
+LOADER_CACHE_BYTES = Gauge("audit_loader_cache_bytes", "Bytes held by the in-process loader cache.", _loader_cache_stat("bytes"))
+LOADER_CACHE_ENTRIES = Gauge("audit_loader_cache_entries", "Entries held by the in-process loader cache.", _loader_cache_stat("entries"))
+
+
+@contextmanager
+def provider_call(provider):
+    """Time one upstream request; exceptions count as errors and propagate."""
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        PROVIDER_ERRORS.inc(provider=provider)
+        raise
+    finally:
+        PROVIDER_SECONDS.observe(time.perf_counter() - t0, provider=provider)
+        PROVIDER_REQUESTS.inc(provider=provider, outcome=outcome)
+
+
+def count_error(provider):
+    """For providers that report failure by status instead of raising."""
+    PROVIDER_ERRORS.inc(provider=provider)
+
+
+def count_shared(loader, result):
+    """Host-wide cache outcome for an in-process miss: hit / wait (another process fetched) / miss."""
+    SHARED_CACHE_REQUESTS.inc(loader=loader, result=result)
+
+
+def count_eviction(loader, reason):
+    LOADER_CACHE_EVICTIONS.inc(loader=loader, reason=reason)
+
+
+def count_retry(provider):
+    PROVIDER_RETRIES.inc(provider=provider)
+
+
+def rate_limit_wait(provider, seconds):
+    time.sleep(seconds)
+    RATE_LIMIT_WAIT.inc(seconds, provider=provider)
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serve /metrics from a daemon thread. port=0 binds a free port
+    (read it back from server.server_address) for local scrape tests.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return server
@@ -0,0 +1,64 @@
+"""
+Per-ticker price pieces behind fetch_price_series (app.py).
+
+    panel, complete = price_panel(cache, "fetch_price_series", ["SRVR", "VNQ"], start, end, fetch)
+
+Each ticker is one loader-cache entry (created_at, lo, hi, series): the closes it holds and
+the date range [lo, hi] they were fetched for. A request is assembled per ticker, so the
+order or combination of tickers and the number of days never change the cache keys. Only
+tickers without a piece, or whose piece does not cover [start, end], go to one
+fetch(tickers, lo) call. lo is the earliest date any of them is missing. A piece that is
+only short at the recent end is fetched from its own hi, and its older rows are kept.
+Requests always end today, so the fetched range always overlaps what is held.
+No Streamlit dependency.
+"""
+import pandas as pd
+
+from schema import PRICE_DTYPE
+
+
+def missing_start(held, start):
+    """Earliest date the held pieces ({ticker: None or piece}) lack for a request from start."""
+    return min(start if h is None or start < h[1] else h[2] for h in held.values())
+
+
+def merge_pieces(held, fresh, created_at, lo, end):
+    """
+    New pieces from the fetched frame (closes from lo) and what was held. A ticker with no
+    piece and no fetched rows is left out, so the next request fetches it again.
+    """
+    pieces = {}
+    for t, h in held.items():
+        s = fresh[t].dropna() if t in fresh.columns else pd.Series(dtype=PRICE_DTYPE)
+        if s.empty and h is None:
+            continue
+        s.name = t
+        if h is not None and h[1] < lo:
+            # keep only the older rows the fetch did not cover
+            s = pd.concat([h[3][h[3].index < pd.Timestamp(lo)], s])
+            pieces[t] = (min(h[0], created_at), h[1], end, s)
+        else:
+            pieces[t] = (created_at, lo, end, s)
+    return pieces
+
+
+def price_panel(cache, stage, tickers, start, end, fetch):
+    """
+    Date x ticker closes after start (columns sorted), and whether every ticker was found.
+    fetch(tickers, lo) -> (created_at, frame of closes from lo through end).
+    Returns (panel, pieces, complete).
+    """
+    def compute(held):
+        lo = missing_start(held, start)
+        created_at, fresh = fetch(sorted(held), lo)
+        return merge_pieces(held, fresh, created_at, lo, end)
+
+    pieces = cache.get_many(stage, tickers, compute, usable=lambda t, p: p[1] <= start and p[2] >= end)
+    complete = len(pieces) == len(set(tickers))
+    if not pieces:
+        return pd.DataFrame(), pieces, complete
+    # the first day of the range is not included (same rows as a today - days start)
+    cols = {t: pieces[t][3][pieces[t][3].index > pd.Timestamp(start)] for t in sorted(pieces)}
+    panel = pd.concat(cols, axis=1).dropna(how="all")
+    panel.columns.name = "Ticker"
+    return panel, pieces, complete
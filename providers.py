@@ -0,0 +1,375 @@
+"""
+Data providers (yfinance / FRED / Google Sheets CSV) with record & replay.
+
+Every upstream call in app.py goes through this module.
+
+    PROVIDER_MODE=live    (default) call the real providers
+    PROVIDER_MODE=record  call the real providers and store each successful response
+                          under PROVIDER_FIXTURES (default: fixtures/)
+    PROVIDER_MODE=replay  serve recorded responses only; no network
+
+Recording:  PROVIDER_MODE=record streamlit run app.py   (open every tab once)
+Replaying:  PROVIDER_MODE=replay REPLAY_LATENCY_MS=150 REPLAY_FAILURE_RATE=0.05 streamlit run app.py
+
+Replay knobs (in-process fakes and the stub server alike):
+    REPLAY_LATENCY_MS / REPLAY_JITTER_MS   injected latency per call (uniform ± jitter)
+    REPLAY_FAILURE_RATE                    probability a call fails (HTTP 503 / ProviderUnavailable)
+    REPLAY_SEED                            RNG seed for jitter and failures
+    PROVIDER_STUB_URL                      send the HTTP providers (FRED, Sheets) to a local stub
+                                           server instead of in-process fakes, so sockets and
+                                           client timeouts are exercised too:
+                                               python providers.py serve --port 8765 --latency-ms 200
+                                               PROVIDER_MODE=replay PROVIDER_STUB_URL=http://127.0.0.1:8765 ...
+yfinance always replays in-process (it talks to Yahoo through its own session).
+
+Fixture keys ignore api_key and store dates relative to today, so a fixture recorded
+with observation_start=<today-3y> still matches when replayed on a later day.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+import pandas as pd
+
+import perf
+
+MODES = ("live", "record", "replay")
+DEFAULT_TIMEOUT = 30
+_SECRET_PARAMS = {"api_key"}
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class ProviderUnavailable(Exception):
+    """Replay-injected provider failure."""
+
+
+class FixtureMissing(ProviderUnavailable):
+    """Replay has no recorded response for this request."""
+
+
+# --- Configuration ---
+
+def _from_env():
+    return {
+        "mode": os.environ.get("PROVIDER_MODE", "live").lower(),
+        "fixtures": os.environ.get("PROVIDER_FIXTURES", "fixtures"),
+        "latency_ms": float(os.environ.get("REPLAY_LATENCY_MS", 0)),
+        "jitter_ms": float(os.environ.get("REPLAY_JITTER_MS", 0)),
+        "failure_rate": float(os.environ.get("REPLAY_FAILURE_RATE", 0)),
+        "seed": int(os.environ.get("REPLAY_SEED", 0)),
+        "stub_url": os.environ.get("PROVIDER_STUB_URL", ""),
+    }
+
+
+_config = _from_env()
+_rng_lock = threading.Lock()
+_rng = random.Random(_config["seed"])
+_write_lock = threading.Lock()
+
+
+def configure(**overrides):
+    """Override the env settings in-process (load harness, stub server). Re-seeds the RNG."""
+    global _rng
+    unknown = set(overrides) - set(_config)
+    if unknown:
+        raise TypeError(f"unknown provider settings: {sorted(unknown)}")
+    mode = overrides.get("mode", _config["mode"])
+    if mode not in MODES:
+        raise ValueError(f"PROVIDER_MODE must be one of {MODES}, got {mode!r}")
+    _config.update(overrides)
+    with _rng_lock:
+        _rng = random.Random(_config["seed"])
+
+
+def mode():
+    return _config["mode"]
+
+
+# Live transports. benchmarks/synthetic_fixtures.py swaps in synthetic ones to record
+# deterministic fixtures without network access.
+_transport = {"yfinance": None, "http_get": None}
+
+
+def set_live_transport(yfinance=None, http_get=None):
+    """yfinance: module-like object (Ticker, download); http_get: requests.get-like. None = real one."""
+    _transport["yfinance"] = yfinance
+    _transport["http_get"] = http_get
+
+
+def settings():
+    return dict(_config)
+
+
+# --- Fixture Keys & Storage ---
+
+def _rel_date(v):
+    if isinstance(v, datetime):
+        d = v.date()
+    elif isinstance(v, date):
+        d = v
+    elif isinstance(v, str) and _DATE_RE.match(v):
+        d = date.fromisoformat(v)
+    else:
+        return v
+    return f"{(d - date.today()).days:+d}d"
+
+
+def _digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:20]
+
+
+def redact_url(url):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _SECRET_PARAMS]
+    return parts._replace(query=urlencode(query)).geturl()
+
+
+def http_key(url):
+    parts = urlsplit(url)
+    query = sorted(
+        (k, _rel_date(v)) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in _SECRET_PARAMS
+    )
+    return _digest(["http", parts.netloc, parts.path, query])
+
+
+def yf_key(call, tickers, kwargs):
+    return _digest(["yfinance", call, tickers, sorted((k, _rel_date(v)) for k, v in kwargs.items())])
+
+
+def _fixture_path(kind, key, ext):
+    return os.path.join(_config["fixtures"], kind, f"{key}.{ext}")
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _index(kind, key, desc):
+    """fixtures/index.jsonl: human-readable map of fixture key -> request."""
+    line = json.dumps({"kind": kind, "key": key, "request": desc, "recorded_at": datetime.now().isoformat(timespec="seconds")})
+    with _write_lock:
+        os.makedirs(_config["fixtures"], exist_ok=True)
+        with open(os.path.join(_config["fixtures"], "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _inject(timeout=None):
+    """Sleep the injected replay latency; returns True when this call should fail."""
+    with _rng_lock:
+        delay = max(0.0, _config["latency_ms"] + _rng.uniform(-1, 1) * _config["jitter_ms"]) / 1000
+        fail = _rng.random() < _config["failure_rate"]
+    if timeout is not None and delay > timeout:
+        time.sleep(timeout)
+        raise _requests().Timeout(f"replay latency {delay:.2f}s exceeds timeout {timeout}s")
+    if delay:
+        time.sleep(delay)
+    return fail
+
+
+# --- HTTP Providers (FRED JSON, Google Sheets CSV) ---
+
+def _requests():
+    # requests (~0.1 s) and yfinance (~0.8 s) are imported on first use, not at app start
+    import requests
+    return requests
+
+
+def _response(url, status, body, content_type):
+    r = _requests().Response()
+    r.status_code = status
+    r._content = body
+    r.url = url
+    r.encoding = "utf-8"
+    r.headers["Content-Type"] = content_type
+    return r
+
+
+def load_http_fixture(url):
+    path = _fixture_path("http", http_key(url), "json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FixtureMissing(f"no fixture for {redact_url(url)} ({path})") from None
+
+
+def _record_http(url, r):
+    if not r.ok:
+        # failures are injected at replay time, not recorded
+        return
+    key = http_key(url)
+    rec = {
+        "url": redact_url(url),
+        "status": r.status_code,
+        "content_type": r.headers.get("Content-Type", ""),
+        "body": r.content.decode("utf-8", errors="replace"),
+    }
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rec, f)
+    _write_atomic(_fixture_path("http", key, "json"), write)
+    _index("http", key, rec["url"])
+
+
+def _stub_url(url):
+    return f"{_config['stub_url'].rstrip('/')}/http?url={quote(url, safe='')}"
+
+
+def http_get(url, provider, timeout=DEFAULT_TIMEOUT):
+    """GET through the active mode. Always returns a requests.Response (replay fakes included)."""
+    with perf.provider_call(provider):
+        if _config["mode"] == "replay":
+            if _config["stub_url"]:
+                return _requests().get(_stub_url(url), timeout=timeout)
+            rec = load_http_fixture(url)
+            if _inject(timeout):
+                return _response(url, 503, b"injected failure", "text/plain")
+            return _response(url, rec["status"], rec["body"].encode("utf-8"), rec["content_type"])
+
+        r = (_transport["http_get"] or _requests().get)(url, timeout=timeout)
+        if _config["mode"] == "record":
+            _record_http(url, r)
+        return r
+
+
+def read_csv(url, provider="gsheets", timeout=DEFAULT_TIMEOUT):
+    """pd.read_csv(url) for published sheets; record/replay go through http_get."""
+    if _config["mode"] == "live" and _transport["http_get"] is None:
+        with perf.provider_call(provider):
+            return pd.read_csv(url)
+    r = http_get(url, provider, timeout)
+    r.raise_for_status()
+    return pd.read_csv(io.BytesIO(r.content))
+
+
+# --- yfinance ---
+
+def _yf():
+    if _transport["yfinance"] is not None:
+        return _transport["yfinance"]
+    import yfinance as yf
+    return yf
+
+
+def _yf_call(call, tickers, kwargs, fetch):
+    with perf.provider_call("yfinance"):
+        if _config["mode"] == "live":
+            return fetch()
+
+        key = yf_key(call, tickers, kwargs)
+        path = _fixture_path("yfinance", key, "pkl")
+        if _config["mode"] == "replay":
+            if not os.path.exists(path):
+                raise FixtureMissing(f"no fixture for yfinance {call} {tickers} {kwargs} ({path})")
+            if _inject():
+                raise ProviderUnavailable(f"injected failure: yfinance {call} {tickers}")
+            return pd.read_pickle(path)
+
+        result = fetch()
+        if isinstance(result, pd.DataFrame) and not result.empty:
+            _write_atomic(path, result.to_pickle)
+            _index("yfinance", key, {"call": call, "tickers": tickers, "kwargs": {k: str(v) for k, v in kwargs.items()}})
+        return result
+
+
+def yf_history(ticker, **kwargs):
+    return _yf_call("history", ticker, kwargs, lambda: _yf().Ticker(ticker).history(**kwargs))
+
+
+def yf_statement(ticker, name):
+    """Ticker statement property: cashflow / quarterly_cashflow / quarterly_income_stmt ..."""
+    return _yf_call(name, ticker, {}, lambda: getattr(_yf().Ticker(ticker), name))
+
+
+def yf_download(tickers, **kwargs):
+    tickers = list(tickers)
+    return _yf_call("download", tickers, kwargs, lambda: _yf().download(tickers, **kwargs))
+
+
+def throttle(provider, seconds):
+    """Fixed pause between live calls (rate limits). Replay models provider timing with injected latency instead."""
+    if _config["mode"] != "replay":
+        perf.rate_limit_wait(provider, seconds)
+
+
+# --- Stub Server ---
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path != "/http":
+            self._send(404, b"not found", "text/plain")
+            return
+        url = dict(parse_qsl(parts.query)).get("url", "")
+        try:
+            rec = load_http_fixture(url)
+        except FixtureMissing as e:
+            self._send(404, str(e).encode("utf-8"), "text/plain")
+            return
+        if _inject():
+            self._send(503, b"injected failure", "text/plain")
+            return
+        self._send(rec["status"], rec["body"].encode("utf-8"), rec["content_type"])
+
+    def _send(self, status, body, content_type):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # client gave up (timeout) while we were sleeping the injected latency
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, host="127.0.0.1"):
+    """Serve HTTP fixtures from a daemon thread (port=0 binds a free port)."""
+    server = ThreadingHTTPServer((host, port), _StubHandler)
+    threading.Thread(target=server.serve_forever, name="provider-stub", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay stub server for recorded HTTP fixtures (FRED, Google Sheets).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--fixtures", default=_config["fixtures"])
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=_config["latency_ms"])
+    serve.add_argument("--jitter-ms", type=float, default=_config["jitter_ms"])
+    serve.add_argument("--failure-rate", type=float, default=_config["failure_rate"])
+    serve.add_argument("--seed", type=int, default=_config["seed"])
+    args = ap.parse_args(argv)
+
+    configure(mode="replay", fixtures=args.fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+              failure_rate=args.failure_rate, seed=args.seed, stub_url="")
+    server = ThreadingHTTPServer((args.host, args.port), _StubHandler)
+    print(f"serving {args.fixtures} on http://{args.host}:{server.server_address[1]} "
+          f"(latency {args.latency_ms:g}±{args.jitter_ms:g} ms, failure rate {args.failure_rate:g})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- Threshold Rules ---
+# ステータス判定の閾値と判定ルールの定義。閾値は THRESHOLDS が既定値で、Config シート
+# (Key / Value) の同名キーが上書きする。ルールは 1 回だけ np.select の評価関数に
+# コンパイルされ、最新値 1 つ・全履歴・全銘柄に同じ関数をそのまま適用できる。
+# Streamlit には依存しない。
+
+THRESHOLDS = {
+    # Layer 2 (SOFR-IORB %, TNX 乖離, 実質金利 %, 入札テール bp)
+    "l2.sofr_spread.critical": 0.05,
+    "l2.sofr_spread.warning": 0.00,
+    "l2.tnx_dev.critical": 0.15,
+    "l2.tnx_dev.warning": 0.05,
+    "l2.real_yield.critical": 2.50,
+    "l2.real_yield.warning": 2.00,
+    "l2.tail.critical": 3.0,
+    "l2.tail.warning": 1.0,
+    "l2.composite.critical_count": 2,  # CRITICAL がこの数以上で総合 CRITICAL
+    "l2.composite.warning_count": 2,  # CRITICAL + WARNING がこの数以上で総合 WARNING
+    # Credit → Equity（30日変化率 %, HY OAS bps）
+    "c2e.dc_chg.high": -15.0,
+    "c2e.dc_chg.medium": -5.0,
+    "c2e.hy_oas.high": 450.0,
+    "c2e.hy_oas.medium": 350.0,
+    "c2e.semi_chg.high": -15.0,
+    "c2e.semi_chg.medium": -5.0,
+    # APLC-5 PSR レベル
+    "psr.level_1": 1.4,
+    "psr.level_2": 1.1,
+    "psr.level_3": 1.0,
+    # Survivor Map
+    "survivor.struct.strong": 1.3,
+    "survivor.struct.mid": 1.1,
+    "survivor.struct.weak": 1.0,
+    "survivor.market.favored_rel20": -0.02,
+    "survivor.market.favored_rel60": -0.05,
+    "survivor.market.neutral_rel20": -0.08,
+    "survivor.market.neutral_rel60": -0.15,
+    "survivor.promote.psr": 1.35,
+    "survivor.promote.rel20": -0.01,
+    "survivor.promote.rel60": -0.02,
+    # CapEx Health
+    "capex.psr": 1.0,
+    "capex.dead_cross": 1.0,
+    # 危険源モニター
+    "danger.relative.danger": -0.10,
+    "danger.relative.watch": -0.05,
+    "danger.dc_credit.danger": -0.10,
+    "danger.dc_credit.watch": -0.05,
+    "danger.physical.normal_psr": 1.1,
+    "danger.physical.deficit_psr": 1.0,
+    "danger.physical.spx_ret": 0.05,
+}
+
+
+class Rule:
+    """
+    上から順に評価するバンドの並び。各バンドは (ラベル, 条件) で、条件は
+    "入力 演算子 閾値キー" を & でつないだ文字列。どのバンドにも当たらなければ default。
+    同じラベルを複数のバンドに書けば OR になる。
+    missing を指定すると、required（既定: 全入力）のどれかが欠損 (None / NaN) の行は missing。
+    missing が None なら欠損は比較が常に False として扱われる（従来のスカラー判定と同じ）。
+    """
+
+    def __init__(self, inputs, bands, default, missing=None, required=None):
+        self.inputs = tuple(inputs)
+        self.bands = [(label, _parse(cond, self.inputs)) for label, cond in bands]
+        self.default = default
+        self.missing = missing
+        self.required = [self.inputs.index(i) for i in (required or inputs)]
+
+
+_OPS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+
+
+def _parse(cond, inputs):
+    terms = []
+    for term in cond.split("&"):
+        name, op, key = term.split()
+        if name not in inputs:
+            raise ValueError(f"rule condition {cond!r}: unknown input {name!r}")
+        if key not in THRESHOLDS:
+            raise ValueError(f"rule condition {cond!r}: unknown threshold {key!r}")
+        terms.append((inputs.index(name), _OPS[op], key))
+    return terms
+
+
+RULES = {
+    "l2_sofr": Rule(["sofr_spread"], [
+        ("CRITICAL", "sofr_spread > l2.sofr_spread.critical"),
+        ("WARNING", "sofr_spread > l2.sofr_spread.warning"),
+    ], default="HEALTHY"),
+    "l2_tnx": Rule(["tnx_dev"], [
+        ("CRITICAL", "tnx_dev > l2.tnx_dev.critical"),
+        ("WARNING", "tnx_dev > l2.tnx_dev.warning"),
+    ], default="HEALTHY"),
+    "l2_real_yield": Rule(["real_yield"], [
+        ("CRITICAL", "real_yield > l2.real_yield.critical"),
+        ("WARNING", "real_yield > l2.real_yield.warning"),
+    ], default="HEALTHY"),
+    "l2_tail": Rule(["tail"], [
+        ("CRITICAL", "tail > l2.tail.critical"),
+        ("WARNING", "tail > l2.tail.warning"),
+    ], default="HEALTHY"),
+    "c2e_credit": Rule(["dc_chg", "hy_oas_bps"], [
+        ("HIGH", "hy_oas_bps > c2e.hy_oas.high"),
+        ("HIGH", "dc_chg < c2e.dc_chg.high"),
+        ("MEDIUM", "hy_oas_bps > c2e.hy_oas.medium"),
+        ("MEDIUM", "dc_chg < c2e.dc_chg.medium"),
+    ], default="LOW"),
+    "c2e_equity": Rule(["semi_chg"], [
+        ("HIGH", "semi_chg < c2e.semi_chg.high"),
+        ("MEDIUM", "semi_chg < c2e.semi_chg.medium"),
+    ], default="LOW"),
+    # 伝播モニターの個別指標（閾値は c2e_credit / c2e_equity と共通、境界値は CRITICAL / WARNING 側）。
+    # 欠損は None も NaN も HEALTHY（旧 classify_*_status は None だけ HEALTHY で、NaN は比較が
+    # 全部外れて CRITICAL になっていた）。危険源の 3 ルールも同様に NaN を UNKNOWN として扱う
+    # （旧 judge_* は NaN で NORMAL / WATCH）。
+    "dc_status": Rule(["dc_chg"], [
+        ("CRITICAL", "dc_chg <= c2e.dc_chg.high"),
+        ("WARNING", "dc_chg <= c2e.dc_chg.medium"),
+    ], default="HEALTHY", missing="HEALTHY"),
+    "hy_status": Rule(["hy_oas_bps"], [
+        ("CRITICAL", "hy_oas_bps >= c2e.hy_oas.high"),
+        ("WARNING", "hy_oas_bps >= c2e.hy_oas.medium"),
+    ], default="HEALTHY", missing="HEALTHY"),
+    "semi_status": Rule(["semi_chg"], [
+        ("CRITICAL", "semi_chg <= c2e.semi_chg.high"),
+        ("WARNING", "semi_chg <= c2e.semi_chg.medium"),
+    ], default="HEALTHY", missing="HEALTHY"),
+    "psr_level": Rule(["psr"], [
+        ("LEVEL_1", "psr > psr.level_1"),
+        ("LEVEL_2", "psr >= psr.level_2"),
+        ("LEVEL_3", "psr >= psr.level_3"),
+    ], default="LEVEL_4"),
+    "struct_rank": Rule(["psr"], [
+        ("STRONG", "psr >= survivor.struct.strong"),
+        ("MID", "psr >= survivor.struct.mid"),
+        ("WEAK", "psr >= survivor.struct.weak"),
+    ], default="BROKEN"),
+    "market_rank": Rule(["rel20", "rel60"], [
+        ("FAVORED", "rel20 >= survivor.market.favored_rel20 & rel60 >= survivor.market.favored_rel60"),
+        ("NEUTRAL", "rel20 >= survivor.market.neutral_rel20 & rel60 >= survivor.market.neutral_rel60"),
+    ], default="DUMPED"),
+    "survivor_promote": Rule(["psr", "rel20", "rel60"], [
+        ("PROMOTE", "psr >= survivor.promote.psr & rel60 >= survivor.promote.rel60 & rel20 >= survivor.promote.rel20"),
+    ], default="HOLD"),
+    "capex_health": Rule(["psr", "capex_to_ni", "capex_to_ocf"], [
+        ("BLACK_HOLE", "psr < capex.psr & capex_to_ni > capex.dead_cross"),
+        ("BLACK_HOLE", "psr < capex.psr & capex_to_ocf > capex.dead_cross"),
+        ("BOUNDARY", "capex_to_ni > capex.dead_cross"),
+        ("BOUNDARY", "capex_to_ocf > capex.dead_cross"),
+    ], default="HEALTHY"),
+    "relative_perf": Rule(["rel"], [
+        ("DANGER", "rel < danger.relative.danger"),
+        ("WATCH", "rel < danger.relative.watch"),
+    ], default="NORMAL", missing="UNKNOWN"),
+    "dc_credit": Rule(["spread"], [
+        ("DANGER", "spread < danger.dc_credit.danger"),
+        ("WATCH", "spread < danger.dc_credit.watch"),
+    ], default="NORMAL", missing="UNKNOWN"),
+    "physical_vs_market": Rule(["min_psr", "spx_ret"], [
+        ("NORMAL", "min_psr >= danger.physical.normal_psr"),
+        ("DANGER", "min_psr < danger.physical.deficit_psr & spx_ret > danger.physical.spx_ret"),
+    ], default="WATCH", missing="UNKNOWN", required=["min_psr"]),
+}
+
+
+class RuleBook:
+    """
+    閾値テーブル（キーで引ける pd.Series）とコンパイル済みの評価関数。
+    evaluate(name, *values) は入力がすべてスカラーなら str、配列 / Series なら object 配列を返す。
+    st.cache_resource で全セッション共有される前提（コンパイル結果の登録だけロックする）。
+    """
+
+    def __init__(self, overrides=None):
+        values = dict(THRESHOLDS)
+        values.update(overrides or {})
+        self.thresholds = pd.Series(values, dtype=float).sort_index()
+        digest = hashlib.blake2b(repr(sorted(self.thresholds.items())).encode(), digest_size=8)
+        self.version = digest.hexdigest()
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: pd.DataFrame):
+        """Config シートの Key / Value 行から作る。数値にならない値と Key 列が無いシートは無視する。"""
+        if config is None or config.empty or not {"Key", "Value"} <= set(config.columns):
+            return cls()
+        values = pd.to_numeric(config["Value"], errors="coerce")
+        keys = config["Key"].astype(str).str.strip()
+        ok = values.notna().to_numpy()
+        return cls(dict(zip(keys[ok], values[ok])))
+
+    def __repr__(self):
+        # data_fingerprint (cached_stage のキー) は repr を使うので、閾値が同じなら同じ文字列にする
+        return f"RuleBook({self.version})"
+
+    def get(self, key, default=0.0):
+        return float(self.thresholds.get(key, default))
+
+    def evaluator(self, name):
+        fn = self._compiled.get(name)
+        if fn is None:
+            fn = self._compile(RULES[name])
+            with self._lock:
+                self._compiled[name] = fn
+        return fn
+
+    def evaluate(self, name, *values):
+        return self.evaluator(name)(*values)
+
+    def _compile(self, rule):
+        bands = [(label, [(i, op, self.get(key)) for i, op, key in terms]) for label, terms in rule.bands]
+        labels = [label for label, _ in bands]
+
+        def evaluate(*values):
+            if len(values) != len(rule.inputs):
+                raise TypeError(f"rule expects {rule.inputs}, got {len(values)} values")
+            scalar = all(np.ndim(v) == 0 for v in values)
+            arrays = np.broadcast_arrays(*[np.asarray(
+                np.nan if v is None else v, dtype=float) for v in values])
+            with np.errstate(invalid="ignore"):
+                conds = [np.logical_and.reduce([op(arrays[i], t) for i, op, t in terms]) for _, terms in bands]
+            out = np.select(conds, labels, default=rule.default).astype(object)
+            if rule.missing is not None:
+                out[np.logical_or.reduce([np.isnan(arrays[i]) for i in rule.required])] = rule.missing
+            return out.item() if scalar else out
+
+        return evaluate
+
+
+DEFAULT_RULES = RuleBook()
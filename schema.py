@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# --- Cached Frame Schema ---
+# ローダーの戻り値をキャッシュへ載せる前に 1 回だけ正規化する。以降のパネル・エンジンは
+# 正規化済みの型を前提にしてよい（再実行ごとの tz 変換や型変換をしない）。
+#   価格パネル (日付 × 銘柄): float32（有効 ~7 桁。リターン・比率の判定には十分）
+#   日付: タイムゾーンなしの datetime64（yfinance の tz 付きは現地時刻のまま tz を外す）
+#   銘柄・期間・ステータスのラベル列: category
+#   金額 (FCF / CapEx / NI …) と金利: float64 のまま（PSR などの閾値判定に直接使う）。Streamlit には依存しない。
+
+PRICE_DTYPE = np.float32
+# C2E 履歴の Credit / Equity / Status（engines.classify_c2e_arrays の値）。
+# 固定のカテゴリにしておくと、追記 (pd.concat) しても category のまま残る
+STATUS_DTYPE = pd.CategoricalDtype(["LOW", "MEDIUM", "HIGH", "HEALTHY", "WARNING", "CRITICAL"])
+
+
+def naive_dates(values):
+    """日付インデックス / 日付列をタイムゾーンなしの datetime64 に（入力と同じ Index / Series で返す）。"""
+    if isinstance(values, pd.Index):
+        idx = pd.DatetimeIndex(values)
+        return idx.tz_localize(None) if idx.tz is not None else idx
+    s = pd.to_datetime(values)
+    return s.dt.tz_localize(None) if s.dt.tz is not None else s
+
+
+def compact_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """終値パネル: 値は float32、インデックスは tz なしの日付。"""
+    if df.empty:
+        return df
+    out = df.astype(PRICE_DTYPE)
+    out.index = naive_dates(out.index)
+    return out
+
+
+def compact_frame(df: pd.DataFrame, labels=(), dates=(), floats32=()) -> pd.DataFrame:
+    """
+    列単位の正規化。labels -> category, dates -> tz なし datetime64, floats32 -> float32。
+    df に無い列は無視する（フォールバック経路の空フレームなど）。
+    """
+    if df.empty:
+        return df
+    dtypes = {c: "category" for c in labels if c in df.columns}
+    dtypes.update({c: PRICE_DTYPE for c in floats32 if c in df.columns})
+    out = df.astype(dtypes) if dtypes else df.copy()
+    for c in dates:
+        if c in out.columns:
+            out[c] = naive_dates(out[c])
+    return out
+
+
+def compact_statuses(df: pd.DataFrame, cols=("Credit", "Equity", "Status")) -> pd.DataFrame:
+    """ステータス列を STATUS_DTYPE に（値の集合が固定なので category の辞書は共通）。"""
+    return df.astype({c: STATUS_DTYPE for c in cols if c in df.columns})
@@ -0,0 +1,169 @@
+"""
+Host-wide loader cache shared by every Streamlit process (SQLite, WAL mode).
+
+    SHARED_CACHE_PATH=/var/tmp/audit-cache.sqlite streamlit run app.py --server.port 8501
+    SHARED_CACHE_PATH=/var/tmp/audit-cache.sqlite streamlit run app.py --server.port 8502
+
+Each replica keeps its own in-process LoaderCache (loader_cache.py) in front. On an
+in-process miss, cached_stage (app.py) asks this cache before calling upstream. A miss takes a cross-process lock for the
+key, so when several replicas miss together only the first one fetches. The others wait
+on the lock and then read that replica's entry. Upstream traffic therefore follows the
+number of distinct keys per TTL, not the number of replicas.
+
+Entries are pickled values with provenance: the stage name, when the upstream data was
+fetched (created_at), when it expires, and which host:pid produced it. The lock is
+fcntl.flock on a per-key file next to the database. It is released if the holder dies;
+without fcntl (Windows) replicas may fetch the same key concurrently, which is still
+correct. purge_expired (on startup, then after a miss at most every PURGE_INTERVAL_S)
+deletes expired entries and the lock files of keys that no longer have an entry, skipping
+lock files that are held.
+"""
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BUSY_TIMEOUT_MS = 30_000
+PURGE_INTERVAL_S = 600  # a process also purges after a miss at most this often
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key        TEXT PRIMARY KEY,
+    stage      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    producer   TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    value      BLOB NOT NULL
+)
+"""
+
+
+def _same_file(f, path):
+    """f is still the file at path (not unlinked or replaced by _prune_locks)."""
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class SharedCache:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.lock_dir = self.path + ".locks"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self.producer = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._last_purge = time.time()
+        with self._conn() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections are per thread (loaders also run on prefetch threads)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _key_lock(self, key):
+        if fcntl is None:
+            yield
+            return
+        # One lock file per key (keys are hex digests): a slow fetch never blocks other loaders
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        while True:
+            with open(path, "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    if _same_file(f, path):
+                        yield
+                        return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            # purge_expired unlinked the file while we waited on it: lock the new one
+
+    def get(self, key):
+        """Fresh entry for key as (created_at, value), or None."""
+        row = self._conn().execute(
+            "SELECT created_at, value FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], pickle.loads(row[1])
+
+    def put(self, key, stage, created_at, value, ttl=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, stage, created_at, expires_at, producer, size, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, stage, created_at, created_at + ttl if ttl else None, self.producer, len(blob), blob),
+        )
+
+    def get_or_compute(self, key, stage, ttl, compute):
+        """
+        Returns (created_at, value, source). source is "hit" (already shared), "wait" (another
+        process fetched it while we held off on the lock) or "miss" (computed here and stored).
+        """
+        hit = self.get(key)
+        if hit is not None:
+            return hit + ("hit",)
+        with self._key_lock(key):
+            hit = self.get(key)
+            if hit is not None:
+                return hit + ("wait",)
+            created_at = time.time()
+            value = compute()
+            self.put(key, stage, created_at, value, ttl)
+        if time.time() - self._last_purge > PURGE_INTERVAL_S:
+            self._last_purge = time.time()
+            self.purge_expired()
+        return created_at, value, "miss"
+
+    def purge_expired(self):
+        """Delete expired entries and the lock files of keys without an entry. Returns the entries deleted."""
+        deleted = self._conn().execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+        self._prune_locks()
+        return deleted
+
+    def _prune_locks(self):
+        if fcntl is None:
+            return
+        live = {row[0] for row in self._conn().execute("SELECT key FROM entries")}
+        for name in os.listdir(self.lock_dir):
+            key, ext = os.path.splitext(name)
+            if ext != ".lock" or key in live:
+                continue
+            path = os.path.join(self.lock_dir, name)
+            try:
+                with open(path, "a+b") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)  # held: a fetch is running, keep it
+                    try:
+                        if _same_file(f, path):
+                            os.unlink(path)
+                    finally:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+            except OSError:
+                pass
+
+    def entries(self):
+        """Provenance of every stored entry (no values): [(stage, created_at, expires_at, producer, size)]."""
+        return self._conn().execute(
+            "SELECT stage, created_at, expires_at, producer, size FROM entries ORDER BY stage, created_at"
+        ).fetchall()
@@ -0,0 +1,183 @@
+"""
+Expanding and rolling percentile / z-score of each signal against its own history.
+
+    stats = SignalStatsCache(window=252, min_periods=20)
+    table = stats.update("hy_oas_bps", series)   # float Series on a DatetimeIndex, ascending
+    table.iloc[-1]                               # Value, Pct, Z, Pct_Roll, Z_Roll of the latest day
+
+RunningStats keeps its window as a sorted list (sortedcontainers.SortedList) plus running
+sums. Pushing one observation is therefore O(log n): a bisect for the rank, one insert, and
+for a rolling window one removal of the value that drops out. Nothing is re-sorted.
+Percentiles match pandas rank(pct=True) with ties averaged. Z-scores use the sample std
+(ddof=1). A rolling window counts rows like pandas rolling(window): NaN rows take a slot but
+are not ranked.
+
+SignalStatsCache keeps one expanding and one rolling RunningStats per signal. Inputs are
+fixed-start histories, so a rerun brings the same rows plus new days. When the new series has
+the same first date, at least as many rows, and the same (date, value) in the last row already
+pushed, only the new days are pushed; anything else (a different start, a revised last row,
+fewer rows) starts that signal over. The check is O(1) and the table grows in preallocated
+buffers, so a rerun costs O(log n) per new row. The expanding window is always exactly the
+input series. The cache is shared across sessions (st.cache_resource), so a lock guards it.
+No Streamlit dependency.
+"""
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from sortedcontainers import SortedList
+
+STAT_COLUMNS = ["Value", "Pct", "Z", "Pct_Roll", "Z_Roll"]
+
+
+class RunningStats:
+    def __init__(self, window=None, min_periods=1):
+        self.window = window
+        self.min_periods = max(1, min_periods)
+        self._sorted = SortedList()
+        self._rows = deque()  # rolling only: the last `window` rows, NaN included
+        self._shift = None  # sums are taken around the first value (less cancellation)
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def push(self, x):
+        """Add x. Returns (percentile, z-score) of x within the window that now includes it."""
+        x = float(x)
+        if self.window is not None:
+            self._rows.append(x)
+            if len(self._rows) > self.window:
+                old = self._rows.popleft()
+                if not math.isnan(old):
+                    self._sorted.remove(old)
+                    self._sum -= old - self._shift
+                    self._sumsq -= (old - self._shift) ** 2
+        if math.isnan(x):
+            return math.nan, math.nan
+        if self._shift is None:
+            self._shift = x
+        self._sorted.add(x)
+        self._sum += x - self._shift
+        self._sumsq += (x - self._shift) ** 2
+
+        n = len(self._sorted)
+        if n < self.min_periods:
+            return math.nan, math.nan
+        lo, hi = self._sorted.bisect_left(x), self._sorted.bisect_right(x)
+        pct = (lo + hi + 1) / (2 * n)  # average 1-based rank of the ties, over n
+        if n < 2:
+            return pct, math.nan
+        var = max(self._sumsq - self._sum * self._sum / n, 0.0) / (n - 1)
+        std = math.sqrt(var)
+        # a flat window has no scale (pandas gives inf / nan there too)
+        z = (x - self._shift - self._sum / n) / std if std > 1e-12 * max(1.0, abs(x)) else math.nan
+        return pct, z
+
+    def extend(self, values):
+        """push() for each value. Returns an (n, 2) array of (percentile, z-score)."""
+        out = np.empty((len(values), 2))
+        for i, x in enumerate(values):
+            out[i] = self.push(x)
+        return out
+
+
+def signal_stats(series: pd.Series, window: int = 252, min_periods: int = 20) -> pd.DataFrame:
+    """Expanding and rolling (window rows) percentile / z-score of every observation in series."""
+    return _Tracker(window, min_periods).extend(series)
+
+
+class _Tracker:
+    """One signal: the two running windows and the table of rows pushed so far."""
+
+    def __init__(self, window, min_periods):
+        self.expanding = RunningStats(None, min_periods)
+        self.rolling = RunningStats(window, min_periods)
+        self.n = 0
+        self._dates = np.empty(0, dtype="datetime64[ns]")
+        self._rows = np.empty((0, len(STAT_COLUMNS)))
+        self.table = pd.DataFrame(columns=STAT_COLUMNS, dtype=float)
+
+    def overlap(self, series):
+        """
+        Rows of series already pushed: series starts on the same date, is at least as long, and
+        its row n-1 is the last (date, value) pushed. None when it isn't (new start, revised or
+        shorter).
+        """
+        n = self.n
+        if n == 0 or len(series) < n or series.index[0] != self._dates[0]:
+            return None
+        if series.index[n - 1] != self._dates[n - 1]:
+            return None
+        old, new = self._rows[n - 1, 0], float(series.iat[n - 1])
+        if not (old == new or (math.isnan(old) and math.isnan(new))):
+            return None
+        return n
+
+    def _reserve(self, m):
+        """Room for m more rows; capacity doubles, so appending is amortized O(1) per row."""
+        need = self.n + m
+        if need <= len(self._dates):
+            return
+        cap = max(need, 2 * len(self._dates), 64)
+        dates = np.empty(cap, dtype=self._dates.dtype)
+        rows = np.empty((cap, len(STAT_COLUMNS)))
+        dates[:self.n] = self._dates[:self.n]
+        rows[:self.n] = self._rows[:self.n]
+        self._dates, self._rows = dates, rows
+
+    def extend(self, series, done=0):
+        """Push series.iloc[done:] (the rows after the overlap) and return the whole table."""
+        new = series.iloc[done:]
+        if new.empty:
+            return self.table
+        x = new.to_numpy(dtype=float)
+        dates = new.index.to_numpy()
+        m, lo = len(x), self.n
+        if lo == 0:
+            self._dates = self._dates.astype(dates.dtype)  # keep the input's datetime unit
+        self._reserve(m)
+        self._dates[lo:lo + m] = dates
+        self._rows[lo:lo + m, 0] = x
+        self._rows[lo:lo + m, 1:3] = self.expanding.extend(x)
+        self._rows[lo:lo + m, 3:5] = self.rolling.extend(x)
+        self.n = lo + m
+        # views of the buffers: later pushes only write past row n, so earlier tables stay valid
+        self.table = pd.DataFrame(
+            self._rows[:self.n], index=pd.DatetimeIndex(self._dates[:self.n], copy=False),
+            columns=STAT_COLUMNS, copy=False,
+        )
+        return self.table
+
+
+class SignalStatsCache:
+    def __init__(self, window: int = 252, min_periods: int = 20):
+        self.window = window
+        self.min_periods = min_periods
+        self._trackers = {}
+        self._lock = threading.Lock()
+        self.rows_computed = {}  # signal -> rows pushed by its last update (diagnostics)
+
+    def update(self, name, series: pd.Series) -> pd.DataFrame:
+        """
+        Stats table with one row per observation in series. Do not modify the returned frame.
+        """
+        if not series.index.is_monotonic_increasing:
+            series = series.sort_index()
+        with self._lock:
+            tracker = self._trackers.get(name)
+            done = tracker.overlap(series) if tracker is not None else None
+            if done is None:
+                tracker = self._trackers[name] = _Tracker(self.window, self.min_periods)
+                done = 0
+            table = tracker.extend(series, done)
+            self.rows_computed[name] = len(series) - done
+            return table
+
+    def latest(self, signals) -> pd.DataFrame:
+        """{name: series} -> the last row of each signal's table (index = name). Empty series are skipped."""
+        rows = {name: self.update(name, s).iloc[-1] for name, s in signals.items() if len(s)}
+        return pd.DataFrame.from_dict(rows, orient="index", columns=STAT_COLUMNS)
@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines import (
+    C2E_LAG, PANDAS_COW, C2EHistoryCache, _standardize, _xcorr_fft, compute_c2e_history, compute_psr,
+    compute_sensitivity_velocity, estimate_lead_lag, multi_horizon_returns, overlay_psr, relative_return_matrix,
+    rolling_beta,
+)
+from metric_graph import MetricGraph
+from rules import RuleBook
+
+
+# --- Shared base frame + per-session PSR overlay ---
+
+def base_frame():
+    return pd.DataFrame({
+        "Ticker": ["MSFT", "META", "AMZN"],
+        "FCF": [70e9, 50e9, 30e9],
+        "CapEx": [-50e9, -40e9, -80e9],
+        "TWh": [25.0, 15.0, 30.0],
+        "Price_Delta": [20.0, 20.0, 25.0],
+    })
+
+
+def test_overlay_psr_leaves_base_untouched():
+    base = base_frame()
+    before = base.copy(deep=True)
+    out = overlay_psr(base, 500.0)
+    pd.testing.assert_frame_equal(base, before)
+    assert list(out.columns) == list(base.columns) + ["PSR", "Cost_Elec", "Cost_Res", "Total_Burden"]
+    psr, *_ = compute_psr(base["FCF"], base["CapEx"], base["TWh"], base["Price_Delta"], 500.0)
+    np.testing.assert_allclose(out["PSR"], psr)
+    # writing to the overlay never reaches the shared base
+    out.loc[0, "FCF"] = -1.0
+    pd.testing.assert_frame_equal(base, before)
+
+
+def test_sessions_share_one_base_frame():
+    graph = MetricGraph()
+    builds = []
+
+    @graph.node("physical")
+    def base(physical):
+        builds.append(1)
+        return physical
+
+    @graph.node("base", "fee")
+    def metrics(base, fee):
+        return overlay_psr(base, fee)
+
+    physical = base_frame()
+    sessions = [graph.run(physical=physical, fee=fee) for fee in (315.0, 500.0, 315.0)]
+    results = [run["metrics"] for run in sessions]
+    shared = [run["base"] for run in sessions]
+
+    assert len(builds) == 1
+    assert shared[0] is shared[1] is shared[2]  # one object for every session, never copied
+    assert results[0] is results[2]  # same fee: the memoized overlay
+    pd.testing.assert_frame_equal(shared[0], base_frame())
+    assert "PSR" not in shared[0].columns
+    if PANDAS_COW:
+        # the overlay only adds columns; the base columns are the shared arrays
+        for col in ("FCF", "CapEx", "TWh"):
+            assert np.shares_memory(results[1][col].to_numpy(), shared[0][col].to_numpy())
+
+
+# --- Credit -> Equity status history ---
+
+def c2e_inputs(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2022-01-03", periods=n)
+    return pd.DataFrame({
+        "DC": np.exp(rng.normal(0, 0.02, n).cumsum()),
+        "Semi": np.exp(rng.normal(0, 0.02, n).cumsum()),
+        "HY": 380 + rng.normal(0, 40, n).cumsum() / 5,
+    }, index=idx)
+
+
+def test_c2e_history_growing_input_matches_full_recompute():
+    aligned = c2e_inputs()
+    cache = C2EHistoryCache()
+    for end in (100, 100, 101, 250, 400):
+        hist = cache.update(aligned.iloc[:end])
+    assert cache.rows_computed == 150
+    pd.testing.assert_frame_equal(hist, compute_c2e_history(aligned), check_freq=False)
+
+
+def test_c2e_history_sliding_window_matches_full_recompute():
+    aligned = c2e_inputs()
+    cache = C2EHistoryCache()
+    cache.update(aligned.iloc[0:250])
+    for start, end in ((5, 255), (5, 255), (40, 300), (150, 400)):
+        window = aligned.iloc[start:end]
+        hist = cache.update(window)
+        pd.testing.assert_frame_equal(hist, compute_c2e_history(window), check_freq=False)
+    assert cache.rows_computed == 100  # the last step only appended its new days
+
+
+def test_c2e_history_recomputes_on_revision_or_new_rules():
+    aligned = c2e_inputs()
+    cache = C2EHistoryCache()
+    cache.update(aligned.iloc[:300])
+    revised = aligned.copy()
+    revised.iloc[299, 0] *= 1.01  # the last cached row changed
+    hist = cache.update(revised)
+    assert cache.rows_computed == len(revised) - C2E_LAG
+    pd.testing.assert_frame_equal(hist, compute_c2e_history(revised), check_freq=False)
+
+    strict = RuleBook({"c2e.hy_oas.medium": 300.0})
+    hist = cache.update(revised, strict)
+    assert cache.rows_computed == len(revised) - C2E_LAG
+    pd.testing.assert_frame_equal(hist, compute_c2e_history(revised, rules=strict), check_freq=False)
+
+
+# --- FFT lead-lag ---
+
+def test_xcorr_fft_matches_direct_sum_at_every_lag():
+    rng = np.random.default_rng(1)
+    x, y = _standardize(rng.normal(size=(2, 300)), axis=-1)
+    max_lag = 20
+    cc = _xcorr_fft(x, y, max_lag)
+    n = len(x)
+    for i, k in enumerate(range(-max_lag, max_lag + 1)):
+        direct = np.sum(x[:n - k] * y[k:]) / n if k >= 0 else np.sum(x[-k:] * y[:n + k]) / n
+        assert cc[i] == pytest.approx(direct, abs=1e-12)
+
+
+@pytest.mark.parametrize("shift", [7, -4])
+def test_lead_lag_sign_and_corrcoef(shift):
+    """HY is DC moved shift days later (shift > 0: DC leads), plus noise; Semi is unrelated."""
+    rng = np.random.default_rng(2)
+    n, max_lag = 600, 30
+    base = rng.normal(size=n + 2 * max_lag)
+    dc = base[max_lag:max_lag + n]
+    hy = base[max_lag - shift:max_lag - shift + n] + 0.3 * rng.normal(size=n)
+    signals = pd.DataFrame({"DC": dc, "HY": hy, "Semi": rng.normal(size=n)},
+                           index=pd.bdate_range("2020-01-01", periods=n))
+    summary, xcorr, rolling = estimate_lead_lag(signals, max_lag=max_lag)
+
+    assert summary.loc["DC→HY", "Lead_Days"] == shift
+    assert summary.loc["DC→HY", "Sign_Agreement"] == 1.0
+    assert (rolling["DC→HY"] == shift).all()
+
+    # the curve is the Pearson correlation of DC_t and HY_{t+k}, up to the overlap weighting
+    lags = xcorr.index.to_numpy()
+    direct = np.array([
+        np.corrcoef(dc[:n - k], hy[k:])[0, 1] if k >= 0 else np.corrcoef(dc[-k:], hy[:n + k])[0, 1]
+        for k in lags
+    ])
+    assert lags[np.abs(direct).argmax()] == shift
+    np.testing.assert_allclose(xcorr["DC→HY"], direct * (n - np.abs(lags)) / n, atol=0.02)
+
+
+# --- Rolling beta / sensitivity x velocity ---
+
+def test_rolling_beta_matches_windowed_polyfit():
+    rng = np.random.default_rng(3)
+    T, window = 200, 40
+    x = rng.normal(0, 0.01, (T, 2))
+    y = x @ np.array([[1.5, -0.5, 0.2], [0.3, 0.8, 0.0]]) + rng.normal(0, 0.005, (T, 3))
+    y[[50, 120], 1] = np.nan  # gaps in one ticker only
+    beta = rolling_beta(y, x, window)
+    assert beta.shape == (T, 3, 2)
+    assert np.isnan(beta[:window - 1]).all()
+    for t in range(window - 1, T):
+        rows = slice(t - window + 1, t + 1)
+        for i in range(3):
+            yw = y[rows, i]
+            for k in range(2):
+                if np.isnan(yw).any():
+                    assert np.isnan(beta[t, i, k])
+                    continue
+                slope = np.polyfit(x[rows, k], yw, 1)[0]
+                assert beta[t, i, k] == pytest.approx(slope, rel=1e-7, abs=1e-10)
+    # a gap only blanks the windows that contain it, and only for that ticker
+    assert not np.isnan(beta[50 + window, 1]).any()
+    assert not np.isnan(beta[window - 1:, [0, 2]]).any()
+
+
+def sensitivity_inputs(T=400, seed=4):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2022-01-03", periods=T)
+    walk = lambda *shape: np.exp(rng.normal(0, 0.01, shape).cumsum(axis=0))
+    prices = pd.DataFrame(walk(T, 3), index=idx, columns=["A", "B", "C"])
+    benchmark = pd.Series(walk(T), index=idx)
+    credit = pd.DataFrame(walk(T, 2), index=idx, columns=["SRVR", "HYG"])
+    return prices, benchmark, credit
+
+
+def test_sensitivity_velocity_ticker_gaps_stay_in_their_ticker():
+    prices, benchmark, credit = sensitivity_inputs()
+    full = compute_sensitivity_velocity(prices, benchmark, credit)
+
+    gappy = prices.copy()
+    gappy.iloc[:300, 2] = np.nan  # C listed late: 100 days of history
+    gappy.iloc[150, 1] = np.nan  # B missed one print
+    out = compute_sensitivity_velocity(gappy, benchmark, credit)
+
+    # other names are unaffected, and C still gets values from its own short history
+    pd.testing.assert_series_equal(out.loc["A"], full.loc["A"])
+    # B's gap only removes the beta windows that contain it from B's percentile history
+    cols = ["DD", "DD_Speed", "DD_Accel", "Beta_SRVR", "Beta_HYG"]
+    pd.testing.assert_series_equal(out.loc["B", cols], full.loc["B", cols], rtol=1e-9)
+    assert out.loc["C", ["Sens_Pct", "DD", "DD_Speed", "DD_Accel"]].notna().all()
+
+
+def test_sensitivity_velocity_drops_rows_missing_benchmark_or_credit():
+    prices, benchmark, credit = sensitivity_inputs()
+    holes = benchmark.index[[100, 200]]
+    bm, cr = benchmark.copy(), credit.copy()
+    bm[holes[0]] = np.nan
+    cr.loc[holes[1], "HYG"] = np.nan
+    out = compute_sensitivity_velocity(prices, bm, cr)
+    keep = ~benchmark.index.isin(holes)
+    expected = compute_sensitivity_velocity(prices[keep], benchmark[keep], credit[keep])
+    pd.testing.assert_frame_equal(out, expected)
+    assert out[["Sens_Pct", "DD"]].notna().all().all()
+
+
+# --- Multi-horizon returns ---
+
+def test_multi_horizon_returns_match_pct_change():
+    rng = np.random.default_rng(5)
+    T = 300
+    prices = pd.DataFrame(np.exp(rng.normal(0, 0.01, (T, 4)).cumsum(axis=0)),
+                          index=pd.bdate_range("2022-01-03", periods=T), columns=list("ABCD"))
+    prices.iloc[:200, 1] = np.nan  # listed late: 100 rows
+    prices.iloc[:299, 2] = np.nan  # one row only
+    prices.iloc[-1, 3] = np.nan  # no latest print
+    horizons = (1, 5, 20, 60, 100, 101, 250, 300, 301)
+    got = multi_horizon_returns(prices, horizons)
+    # horizon h is an h-row window, P[-1] / P[-h] - 1 (the old period_ret), i.e. pct_change(h - 1)
+    for h in horizons:
+        expected = prices.pct_change(h - 1, fill_method=None).iloc[-1] if h <= T else pd.Series(np.nan, index=prices.columns)
+        np.testing.assert_allclose(got[h].to_numpy(), expected.to_numpy(), rtol=1e-12, equal_nan=True)
+    assert got.loc["B", 100] == pytest.approx(prices["B"].iloc[-1] / prices["B"].iloc[200] - 1)
+    assert np.isnan(got.loc["B", 101])
+
+
+def test_relative_return_matrix_subtracts_the_benchmark():
+    rng = np.random.default_rng(6)
+    T = 120
+    idx = pd.bdate_range("2022-01-03", periods=T)
+    prices = pd.DataFrame(np.exp(rng.normal(0, 0.01, (T, 3)).cumsum(axis=0)), index=idx, columns=list("ABC"))
+    prices.iloc[:50, 0] = np.nan
+    bench = pd.Series(np.exp(rng.normal(0, 0.01, T).cumsum()), index=idx, name="SOXX")
+    rets, rel = relative_return_matrix(prices, bench, (20, 60, 100))
+    for h in (20, 60, 100):
+        r = prices.pct_change(h - 1, fill_method=None).iloc[-1]
+        rb = bench.pct_change(h - 1).iloc[-1]
+        np.testing.assert_allclose(rel[h].to_numpy(), (r - rb).to_numpy(), rtol=1e-12, equal_nan=True)
+        assert rets.loc["SOXX", h] == pytest.approx(rb)
+    assert np.isnan(rel.loc["A", 100]) and not np.isnan(rel.loc["A", 60])
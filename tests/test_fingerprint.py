@@ -0,0 +1,59 @@
+"""code_fingerprint across Streamlit-style reruns (fresh functions and globals each time)."""
+import gc
+import weakref
+
+import numpy as np
+
+from fingerprint import _code_digest, code_fingerprint, data_fingerprint
+
+SOURCE = '''
+THRESHOLD = {threshold}
+COLUMNS = ["a", "b"]
+
+def loader(x):
+    return [x * THRESHOLD for _ in COLUMNS]
+'''
+
+
+class Namespace(dict):
+    """A rerun's __main__ globals (a dict subclass so a weakref can watch it)."""
+
+
+def rerun(threshold=1.5):
+    """exec the module source the way Streamlit re-executes app.py: new globals, new functions."""
+    glb = Namespace(big=np.ones(1_000_000))  # a frame / figure held by the run
+    exec(compile(SOURCE.format(threshold=threshold), "app.py", "exec"), glb)
+    return glb
+
+
+def test_same_code_same_fingerprint_across_reruns():
+    assert code_fingerprint(rerun()["loader"]) == code_fingerprint(rerun()["loader"])
+
+
+def test_module_constant_change_changes_fingerprint():
+    assert code_fingerprint(rerun(1.5)["loader"]) != code_fingerprint(rerun(2.5)["loader"])
+
+
+def test_constant_read_per_call_not_memoized():
+    glb = rerun()
+    before = code_fingerprint(glb["loader"])
+    glb["THRESHOLD"] = 9.0  # same code object, new value
+    assert code_fingerprint(glb["loader"]) != before
+
+
+def test_reruns_are_not_retained():
+    _code_digest.cache_clear()
+    refs = []
+    for _ in range(50):
+        glb = rerun()
+        code_fingerprint(glb["loader"])
+        refs.append(weakref.ref(glb))
+        del glb
+    gc.collect()
+    assert [r for r in refs if r() is not None] == []
+    assert _code_digest.cache_info().currsize <= 2  # loader and its comprehension share one entry
+
+
+def test_data_fingerprint_values():
+    assert data_fingerprint({"b": 1, "a": [1, 2]}) == data_fingerprint({"a": [1, 2], "b": 1})
+    assert data_fingerprint(np.arange(3)) != data_fingerprint(np.arange(3.0))
@@ -0,0 +1,175 @@
+import gc
+import pickle
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import loader_cache
+from fingerprint import code_fingerprint, data_fingerprint
+from loader_cache import LoaderCache
+
+
+def size(value):
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def keys(cache, stage):
+    return [k for s, k in cache._entries if s == stage]
+
+
+def test_hit_returns_a_copy():
+    cache = LoaderCache(10_000)
+    first = cache.get_or_compute("s", "k", lambda: [1, 2])
+    first.append(3)
+    assert cache.get_or_compute("s", "k", lambda: pytest.fail("recomputed")) == [1, 2]
+    assert cache.stats()["s"]["hits"] == 1 and cache.stats()["s"]["misses"] == 1
+
+
+def test_max_entries_evicts_least_recently_used_of_the_stage():
+    cache = LoaderCache(10_000)
+    cache.register("s", max_entries=2)
+    cache.get_or_compute("other", "x", lambda: 0)
+    for k in ("a", "b"):
+        cache.get_or_compute("s", k, lambda: k)
+    cache.get_or_compute("s", "a", lambda: None)  # a is now more recent than b
+    cache.get_or_compute("s", "c", lambda: "c")
+    assert keys(cache, "s") == ["a", "c"]
+    assert keys(cache, "other") == ["x"]  # the cap is per stage
+    assert cache.stats()["s"]["evicted_cap"] == 1
+
+
+def test_max_bytes_evicts_least_recently_used_across_stages():
+    value = b"x" * 1000
+    cache = LoaderCache(3 * size(value) + 10)
+    cache.get_or_compute("s1", "a", lambda: value)
+    cache.get_or_compute("s2", "b", lambda: value)
+    cache.get_or_compute("s1", "c", lambda: value)
+    cache.get_or_compute("s1", "a", lambda: None)  # touch a: b is the oldest
+    cache.get_or_compute("s2", "d", lambda: value)
+    assert list(cache._entries) == [("s1", "c"), ("s1", "a"), ("s2", "d")]
+    assert cache.total_bytes <= cache.max_bytes
+    assert cache.stats()["s2"]["evicted_budget"] == 1
+
+
+def test_oversize_value_is_returned_not_kept():
+    cache = LoaderCache(100)
+    assert cache.get_or_compute("s", "k", lambda: b"x" * 1000) == b"x" * 1000
+    assert cache.total_bytes == 0 and cache.stats()["s"]["oversize"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(loader_cache.time, "time", lambda: now[0])
+    cache = LoaderCache(10_000)
+    cache.register("s", ttl=60)
+    cache.get_or_compute("s", "k", lambda: "v1")
+    now[0] += 59
+    assert cache.get_or_compute("s", "k", lambda: "v2") == "v1"
+    now[0] += 2
+    assert cache.get_or_compute("s", "k", lambda: "v2") == "v2"
+    assert cache.stats()["s"]["expired"] == 1
+
+
+def test_concurrent_misses_compute_once_per_key():
+    cache = LoaderCache(10_000)
+    calls = []
+    started = threading.Event()
+
+    def slow(k):
+        def compute():
+            calls.append(k)
+            started.set()
+            time.sleep(0.1)
+            return k
+        return compute
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("s", "k", slow("k"))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.wait()
+    # another key is not blocked by the one being computed
+    t0 = time.perf_counter()
+    assert cache.get_or_compute("s", "other", lambda: "o") == "o"
+    assert time.perf_counter() - t0 < 0.05
+    for t in threads:
+        t.join()
+    assert calls == ["k"] and results == ["k"] * 8
+    assert cache._computing == {}
+
+
+def test_get_many_computes_only_missing_or_unusable():
+    cache = LoaderCache(10_000)
+    batches = []
+
+    def compute(held):
+        batches.append(dict(held))
+        return {k: (k, 2) for k in held}
+
+    assert cache.get_many("s", ["a", "b"], compute) == {"a": ("a", 2), "b": ("b", 2)}
+    cache.get_or_compute("s", "c", lambda: ("c", 1))
+    got = cache.get_many("s", ["c", "a", "d", "a"], compute, usable=lambda k, v: v[1] >= 2)
+    assert got == {"a": ("a", 2), "c": ("c", 2), "d": ("d", 2)}
+    # one call per request; c was cached but unusable, so compute_missing got its held value
+    assert batches == [{"a": None, "b": None}, {"c": ("c", 1), "d": None}]
+    assert sorted(keys(cache, "s")) == ["a", "b", "c", "d"]
+
+
+def test_get_many_overlapping_requests_wait_instead_of_recomputing():
+    cache = LoaderCache(10_000)
+    calls = []
+
+    def compute(held):
+        calls.append(sorted(held))
+        time.sleep(0.1)
+        return {k: k for k in held}
+
+    threads = [threading.Thread(target=cache.get_many, args=("s", ["a", "b"], compute)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [["a", "b"]]
+
+
+# --- Fresh functions per rerun (how app.cached_stage builds its keys) ---
+
+SOURCE = '''
+LIMIT = 3
+
+def loader(n):
+    return list(range(min(n, LIMIT)))
+'''
+
+
+def cached_stage_call(cache, glb, stage="load"):
+    func = glb["loader"]
+    key = data_fingerprint(stage, None, code_fingerprint(func), (5,), {})
+    return cache.get_or_compute(stage, key, lambda: func(5))
+
+
+def test_reruns_with_fresh_functions_do_not_grow_memory():
+    cache = LoaderCache(10_000_000)
+
+    def rerun():
+        glb = {"frame": np.ones(200_000)}  # 1.6 MB held by the run
+        exec(SOURCE, glb)
+        return cached_stage_call(cache, glb)
+
+    rerun()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        for _ in range(50):
+            assert rerun() == [0, 1, 2]
+        gc.collect()
+        grown = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    assert grown < 1_000_000  # 50 retained runs would be ~80 MB
+    assert cache.stats()["load"]["entries"] == 1
@@ -0,0 +1,122 @@
+from collections import Counter
+
+import pytest
+
+from metric_graph import MetricGraph
+
+
+def build(memo_size=8):
+    """
+    a -> base -> (scaled, total); b -> side.  scaled also reads fee.
+    calls is a closure variable: a module-level dict would be fingerprinted as a constant.
+    """
+    graph = MetricGraph(memo_size=memo_size)
+    calls = Counter()
+
+    @graph.node("a")
+    def base(a):
+        calls["base"] += 1
+        return [x * 2 for x in a]
+
+    @graph.node("base", "fee")
+    def scaled(base, fee):
+        calls["scaled"] += 1
+        return [x * fee for x in base]
+
+    @graph.node("base")
+    def total(base):
+        calls["total"] += 1
+        return sum(base)
+
+    @graph.node("b")
+    def side(b):
+        calls["side"] += 1
+        return b + 1
+
+    return graph, calls
+
+
+NODES = ("base", "scaled", "total", "side")
+
+
+def evaluate(graph, **sources):
+    run = graph.run(**sources)
+    return {name: run[name] for name in NODES}
+
+
+def test_downstream():
+    graph, _ = build()
+    assert graph.downstream("a") == {"base", "scaled", "total"}
+    assert graph.downstream("fee") == {"scaled"}
+    assert graph.downstream("b") == {"side"}
+    assert graph.downstream("scaled") == set()
+
+
+@pytest.mark.parametrize("changed, value", [("a", [5, 6]), ("fee", 3.0), ("b", 10)])
+def test_changing_one_source_recomputes_only_its_downstream(changed, value):
+    graph, calls = build()
+    sources = {"a": [1, 2], "fee": 2.0, "b": 0}
+    evaluate(graph, **sources)
+    assert calls == Counter({n: 1 for n in NODES})
+
+    calls.clear()
+    evaluate(graph, **sources)
+    assert calls == Counter()  # same sources: every node is a memo hit
+
+    calls.clear()
+    out = evaluate(graph, **{**sources, changed: value})
+    assert calls == Counter({n: 1 for n in graph.downstream(changed)})
+    assert out == evaluate(build()[0], **{**sources, changed: value})
+
+
+def test_sources_are_resolved_lazily_and_once():
+    graph, _ = build()
+    loads = Counter()
+
+    def load_a():
+        loads["a"] += 1
+        return [1, 2]
+
+    def load_b():
+        loads["b"] += 1
+        return 0
+
+    run = graph.run(a=load_a, fee=2.0, b=load_b)
+    assert run["scaled"] == [4.0, 8.0]
+    assert run["total"] == 6
+    assert loads == Counter({"a": 1})
+
+
+def test_memo_size_evicts_least_recently_used():
+    graph, calls = build(memo_size=2)
+    for fee in (1.0, 2.0):
+        evaluate(graph, a=[1], fee=fee, b=0)
+    evaluate(graph, a=[1], fee=1.0, b=0)  # touch fee=1.0 so fee=2.0 is the oldest
+    evaluate(graph, a=[1], fee=3.0, b=0)  # evicts fee=2.0
+    assert len(graph._memo["scaled"]) == 2
+
+    calls.clear()
+    evaluate(graph, a=[1], fee=1.0, b=0)
+    assert calls["scaled"] == 0
+    evaluate(graph, a=[1], fee=2.0, b=0)
+    assert calls["scaled"] == 1
+    assert calls["base"] == calls["total"] == calls["side"] == 0
+
+
+def test_replacing_a_node_changes_its_version():
+    graph, calls = build()
+    evaluate(graph, a=[1], fee=1.0, b=0)
+
+    @graph.node("base")
+    def total(base):
+        calls["total2"] += 1
+        return max(base)
+
+    calls.clear()
+    assert graph.run(a=[1], fee=1.0, b=0)["total"] == 2
+    assert calls == Counter({"total2": 1})
+
+
+def test_unknown_name_raises():
+    with pytest.raises(KeyError):
+        build()[0].run(a=[1])["missing"]
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import panel_store
+from panel_store import PricePanelStore
+from schema import PRICE_DTYPE
+
+
+def prices(tickers, start="2024-01-01", periods=5, base=0.0):
+    idx = pd.date_range(start, periods=periods, freq="D")
+    data = {t: np.arange(periods, dtype=PRICE_DTYPE) + base + 100 * i for i, t in enumerate(tickers)}
+    return pd.DataFrame(data, index=idx)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PricePanelStore(str(tmp_path / "panel"))
+
+
+def versions(root):
+    return sorted(d for d in os.listdir(root) if d.startswith("v"))
+
+
+def test_write_swaps_current_and_keeps_old_mapping_valid(store):
+    assert store.current() is None
+    first = store.write(prices(["A", "B"]))
+    with open(os.path.join(store.root, "CURRENT"), encoding="utf-8") as f:
+        assert f.read() == first.version
+    old_values = first.frame()
+
+    second = store.write(prices(["A", "B"], base=1000.0))
+    assert second.version != first.version
+    assert store.current() is second
+    # the reader that mapped the previous version still sees its own data
+    pd.testing.assert_frame_equal(first.frame(), old_values)
+    # no half-written CURRENT temp files are left behind
+    assert not [n for n in os.listdir(store.root) if n.startswith(".CURRENT")]
+
+    store.write(prices(["A"]))
+    assert len(versions(store.root)) == panel_store._KEEP_VERSIONS
+
+
+def test_current_reopens_after_another_process_writes(store, tmp_path):
+    store.write(prices(["A"]))
+    other = PricePanelStore(store.root)
+    panel = other.write(prices(["A", "B"]))
+    assert store.current().version == panel.version
+    assert store.current().tickers == ["A", "B"]
+
+
+def test_round_trip_dates_and_float32(store):
+    frame = prices(["A", "B", "C"])
+    panel = store.write(frame)
+    out = panel.frame()
+    assert out.dtypes.eq(PRICE_DTYPE).all()
+    pd.testing.assert_frame_equal(out, frame, check_freq=False, check_index_type=False)
+    np.testing.assert_array_equal(panel.column("B", start="2024-01-02", end="2024-01-03"), [101.0, 102.0])
+
+
+def test_upsert_merges_prefers_new_values_and_appends_columns(store):
+    store.write(prices(["A", "B"]))
+    fresh = prices(["B", "C"], start="2024-01-04", periods=3, base=50.0)
+    panel = store.upsert(fresh)
+    assert panel.tickers == ["A", "B", "C"]
+    out = panel.frame()
+    assert len(out) == 6
+    assert out.loc["2024-01-04", "B"] == fresh.loc["2024-01-04", "B"]
+    assert out.loc["2024-01-01", "B"] == 100.0
+    assert np.isnan(out.loc["2024-01-01", "C"])
+    assert np.isnan(out.loc["2024-01-06", "A"])
+
+
+def test_upsert_trims_rows_before_the_history_window(store):
+    store.write(prices(["A"], periods=10))
+    panel = store.upsert(prices(["B"], start="2024-01-09", periods=4), start="2024-01-05")
+    assert panel.dates[0] == pd.Timestamp("2024-01-05")
+    assert panel.dates[-1] == pd.Timestamp("2024-01-12")
+    # the next refresh with a later window keeps shrinking instead of growing
+    panel = store.upsert(prices(["B"], start="2024-01-13", periods=1), start="2024-01-10")
+    assert len(panel.dates) == 4
+
+
+def test_failed_bookkeeping(store, monkeypatch):
+    store.write(prices(["A"]))
+    store.mark_failed([])
+    assert store.failed() == {}
+
+    monkeypatch.setattr(panel_store.time, "time", lambda: 1000.0)
+    store.mark_failed(["B", "C"])
+    monkeypatch.setattr(panel_store.time, "time", lambda: 1100.0)
+    store.mark_failed(["D"])
+    assert store.failed() == {"B": 1000.0, "C": 1000.0, "D": 1100.0}
+    assert store.failed(max_age=50) == {"D": 1100.0}
+    assert PricePanelStore(store.root).failed() == store.failed()
+
+    store.upsert(prices(["B"]))
+    assert set(store.failed()) == {"C", "D"}
+
+
+def test_failed_survives_a_corrupt_file(store):
+    with open(os.path.join(store.root, "FAILED"), "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert store.failed() == {}
+    store.mark_failed(["A"])
+    assert set(store.failed()) == {"A"}
+
+
+def test_frame_views_and_non_contiguous_selection(store):
+    panel = store.write(prices(["A", "B", "C", "D"]))
+    view = panel.frame(["B", "C"])
+    assert list(view.columns) == ["B", "C"]
+    assert np.shares_memory(view.to_numpy(), panel.values)
+
+    picked = panel.frame(["D", "A", "X"])  # out of order, gap, unknown ticker dropped
+    assert list(picked.columns) == ["D", "A"]
+    np.testing.assert_array_equal(picked["D"].to_numpy(), panel.column("D"))
+    np.testing.assert_array_equal(picked["A"].to_numpy(), panel.column("A"))
+
+    gap = panel.frame(["A", "C"], start="2024-01-02", end="2024-01-03")
+    assert list(gap.index) == list(pd.to_datetime(["2024-01-02", "2024-01-03"]))
+    np.testing.assert_array_equal(gap.to_numpy(), [[1.0, 201.0], [2.0, 202.0]])
+
+    assert panel.frame(["X"]).shape == (5, 0)
+
+
+def test_writer_serializes_writers_and_is_reentrant(store):
+    if panel_store.fcntl is None:
+        pytest.skip("flock is not available")
+    entered, order = threading.Event(), []
+
+    def hold():
+        with store.writer():
+            with store.writer():  # nested on the same thread does not deadlock
+                entered.set()
+                time.sleep(0.2)
+                order.append("first")
+
+    t = threading.Thread(target=hold)
+    t.start()
+    entered.wait()
+    with PricePanelStore(store.root).writer():
+        order.append("second")
+    t.join()
+    assert order == ["first", "second"]
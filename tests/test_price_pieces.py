@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from loader_cache import LoaderCache
+from price_pieces import missing_start, price_panel
+from schema import PRICE_DTYPE
+
+STAGE = "fetch_price_series"
+DAYS = pd.bdate_range("2023-01-02", "2024-12-31")
+RNG = np.random.default_rng(7)
+UPSTREAM = pd.DataFrame(
+    np.exp(RNG.normal(0, 0.01, (len(DAYS), 4)).cumsum(axis=0)).astype(PRICE_DTYPE),
+    index=DAYS, columns=["A", "B", "C", "D"],
+)
+UPSTREAM.loc[:"2024-03-31", "D"] = np.nan  # listed late
+
+
+class StubDownload:
+    """download_closes stand-in: records (tickers, lo) and serves closes from lo through end."""
+
+    def __init__(self, end):
+        self.end = end
+        self.calls = []
+
+    def __call__(self, tickers, lo):
+        self.calls.append((list(tickers), lo))
+        rows = (UPSTREAM.index >= pd.Timestamp(lo)) & (UPSTREAM.index <= pd.Timestamp(self.end))
+        cols = [t for t in tickers if t in UPSTREAM.columns]
+        return 1000.0 + len(self.calls), UPSTREAM.loc[rows, cols].dropna(how="all")
+
+
+def full_fetch(tickers, start, end):
+    """What one uncached download of the whole request would give."""
+    rows = (UPSTREAM.index > pd.Timestamp(start)) & (UPSTREAM.index <= pd.Timestamp(end))
+    out = UPSTREAM.loc[rows, sorted(tickers)].dropna(how="all")
+    out.columns.name = "Ticker"
+    return out
+
+
+def request(cache, fetch, tickers, days):
+    start = fetch.end - timedelta(days=days)
+    panel, _, complete = price_panel(cache, STAGE, tickers, start, fetch.end, fetch)
+    pd.testing.assert_frame_equal(panel, full_fetch([t for t in tickers if t in UPSTREAM], start, fetch.end),
+                                  check_freq=False)
+    return start, complete
+
+
+def test_only_missing_tickers_and_ranges_are_fetched():
+    cache = LoaderCache(50_000_000)
+    end = date(2024, 6, 28)
+    fetch = StubDownload(end)
+
+    s120, _ = request(cache, fetch, ["B", "A"], 120)
+    assert fetch.calls == [(["A", "B"], s120)]
+
+    request(cache, fetch, ["C", "B"], 120)  # other order and combination: only C is new
+    assert fetch.calls[-1] == (["C"], s120)
+
+    request(cache, fetch, ["A", "B", "C"], 60)  # shorter: everything is cut from what is held
+    assert len(fetch.calls) == 2
+
+    s400, _ = request(cache, fetch, ["C", "A"], 400)  # longer: both need older rows, B is not touched
+    assert fetch.calls[-1] == (["A", "C"], s400)
+
+    # a week later: held pieces are only short at the recent end, fetched from their own end
+    fetch.end = end + timedelta(days=7)
+    request(cache, fetch, ["A", "B"], 120)
+    assert fetch.calls[-1] == (["A", "B"], end)
+    request(cache, fetch, ["A", "C"], 400)  # A kept its older rows when it was extended
+    assert fetch.calls[-1] == (["C"], end)
+    assert len(fetch.calls) == 5
+
+
+def test_missing_ticker_is_not_cached():
+    cache = LoaderCache(50_000_000)
+    fetch = StubDownload(date(2024, 6, 28))
+    _, complete = request(cache, fetch, ["A", "ZZZ"], 30)
+    assert not complete
+    _, complete = request(cache, fetch, ["A", "ZZZ"], 30)
+    assert not complete
+    assert fetch.calls[-1] == (["ZZZ"], fetch.end - timedelta(days=30))
+
+
+def test_late_listing_panel_matches_full_fetch():
+    cache = LoaderCache(50_000_000)
+    fetch = StubDownload(date(2024, 12, 31))
+    request(cache, fetch, ["D"], 400)
+    request(cache, fetch, ["A", "D"], 400)
+    assert fetch.calls[-1][0] == ["A"]
+
+
+@pytest.mark.parametrize("held, expected", [
+    ({"A": None}, date(2024, 1, 1)),
+    ({"A": (0, date(2023, 12, 1), date(2024, 5, 1), None)}, date(2024, 5, 1)),  # short at the recent end
+    ({"A": (0, date(2024, 2, 1), date(2024, 6, 1), None)}, date(2024, 1, 1)),  # short at the old end
+    ({"A": (0, date(2023, 12, 1), date(2024, 5, 1), None), "B": (0, date(2023, 6, 1), date(2024, 3, 1), None)},
+     date(2024, 3, 1)),
+])
+def test_missing_start(held, expected):
+    assert missing_start(held, date(2024, 1, 1)) == expected
@@ -0,0 +1,256 @@
+"""RuleBook with the default thresholds against the scalar classifiers it replaced."""
+import numpy as np
+import pytest
+
+from engines import classify_c2e_arrays, classify_capex_health_arrays, classify_survivor_arrays, evaluate_l2_status
+from rules import RuleBook
+
+NAN = float("nan")
+RULES = RuleBook()
+
+
+# --- The classifiers as they were in app.py before rules.py ---
+
+def classify_dc_status(dc_chg_30d):
+    if dc_chg_30d is None:
+        return "HEALTHY"
+    if dc_chg_30d > -5.0:
+        return "HEALTHY"
+    elif dc_chg_30d > -15.0:
+        return "WARNING"
+    else:
+        return "CRITICAL"
+
+
+def classify_hy_status(hy_oas_bps):
+    if hy_oas_bps is None:
+        return "HEALTHY"
+    if hy_oas_bps < 350:
+        return "HEALTHY"
+    elif hy_oas_bps < 450:
+        return "WARNING"
+    else:
+        return "CRITICAL"
+
+
+def classify_semi_status(semi_chg_30d):
+    if semi_chg_30d is None:
+        return "HEALTHY"
+    if semi_chg_30d > -5.0:
+        return "HEALTHY"
+    elif semi_chg_30d > -15.0:
+        return "WARNING"
+    else:
+        return "CRITICAL"
+
+
+def evaluate_credit_equity_status(dc_chg_30d, hy_oas_bps, semi_chg_30d):
+    c_stress = "LOW"
+    if hy_oas_bps > 450 or dc_chg_30d < -15.0:
+        c_stress = "HIGH"
+    elif hy_oas_bps > 350 or dc_chg_30d < -5.0:
+        c_stress = "MEDIUM"
+    e_react = "LOW"
+    if semi_chg_30d < -15.0:
+        e_react = "HIGH"
+    elif semi_chg_30d < -5.0:
+        e_react = "MEDIUM"
+    if c_stress == "HIGH" and e_react == "HIGH":
+        return "CRITICAL"
+    if c_stress == "HIGH" and e_react in ("LOW", "MEDIUM"):
+        return "WARNING"
+    if c_stress == "MEDIUM" and e_react in ("MEDIUM", "HIGH"):
+        return "WARNING"
+    return "HEALTHY"
+
+
+def get_psr_level(psr):
+    if psr > 1.4: return "LEVEL_1"
+    elif psr >= 1.1: return "LEVEL_2"
+    elif psr >= 1.0: return "LEVEL_3"
+    else: return "LEVEL_4"
+
+
+def evaluate_l2_status_baseline(sofr_spread, tnx_dev, real_yield, tail):
+    if sofr_spread > 0.05: s_sofr = "CRITICAL"
+    elif sofr_spread > 0.00: s_sofr = "WARNING"
+    else: s_sofr = "HEALTHY"
+    if tnx_dev > 0.15: s_tnx = "CRITICAL"
+    elif tnx_dev > 0.05: s_tnx = "WARNING"
+    else: s_tnx = "HEALTHY"
+    if real_yield > 2.50: s_real = "CRITICAL"
+    elif real_yield > 2.00: s_real = "WARNING"
+    else: s_real = "HEALTHY"
+    if tail > 3.0: s_tail = "CRITICAL"
+    elif tail > 1.0: s_tail = "WARNING"
+    else: s_tail = "HEALTHY"
+    results = [s_sofr, s_tnx, s_real, s_tail]
+    red_count = results.count("CRITICAL")
+    yellow_count = results.count("WARNING")
+    if red_count >= 2:
+        comp_status = "CRITICAL"
+    elif (red_count + yellow_count) >= 2:
+        comp_status = "WARNING"
+    else:
+        comp_status = "HEALTHY"
+    return comp_status, s_sofr, s_tnx, s_real, s_tail
+
+
+def classify_capex_health(psr, c_ni, c_ocf):
+    if (not np.isnan(psr) and psr < 1.0) and (
+        (not np.isnan(c_ni) and c_ni > 1.0) or
+        (not np.isnan(c_ocf) and c_ocf > 1.0)
+    ):
+        return "BLACK_HOLE"
+    if ((not np.isnan(c_ni) and c_ni > 1.0) or
+        (not np.isnan(c_ocf) and c_ocf > 1.0)):
+        return "BOUNDARY"
+    return "HEALTHY"
+
+
+def classify_survivor(psr, rel20, rel60):
+    if np.isnan(psr) or np.isnan(rel20) or np.isnan(rel60):
+        return None, None, "Unknown"
+    if psr >= 1.3: struct = "STRONG"
+    elif psr >= 1.1: struct = "MID"
+    elif psr >= 1.0: struct = "WEAK"
+    else: struct = "BROKEN"
+    if rel20 >= -0.02 and rel60 >= -0.05: market = "FAVORED"
+    elif rel20 >= -0.08 and rel60 >= -0.15: market = "NEUTRAL"
+    else: market = "DUMPED"
+    if struct in ["STRONG", "MID"] and market in ["FAVORED", "NEUTRAL"]:
+        final = "Survivor" if (psr >= 1.35) and (rel60 >= -0.02) and (rel20 >= -0.01) else "Watch"
+    elif struct in ["WEAK", "BROKEN"] and market == "DUMPED":
+        final = "Hazard"
+    else:
+        final = "Watch"
+    return struct, market, final
+
+
+def judge_relative_perf(rel):
+    if rel is None:
+        return "UNKNOWN"
+    if rel < -0.10:
+        return "DANGER"
+    elif rel < -0.05:
+        return "WATCH"
+    else:
+        return "NORMAL"
+
+
+def judge_dc_credit(spread):
+    if spread is None:
+        return "UNKNOWN"
+    if spread < -0.10:
+        return "DANGER"
+    elif spread < -0.05:
+        return "WATCH"
+    else:
+        return "NORMAL"
+
+
+def judge_physical_vs_market(min_psr, spx_ret):
+    if min_psr is None:
+        return "UNKNOWN"
+    if min_psr >= 1.1:
+        return "NORMAL"
+    if min_psr < 1.0 and spx_ret > 0.05:
+        return "DANGER"
+    elif min_psr < 1.0:
+        return "WATCH"
+    return "WATCH"
+
+
+# --- Boundary values: each threshold, just either side of it, NaN and None ---
+
+def around(*edges, eps=1e-9):
+    return sorted({v for e in edges for v in (e - eps, e, e + eps)})
+
+
+CHG = around(-15.0, -5.0) + [0.0, -30.0]
+HY = around(350.0, 450.0) + [0.0, 900.0]
+PSR = around(1.0, 1.1, 1.3, 1.35, 1.4) + [0.5, 2.0]
+REL20 = around(-0.08, -0.02, -0.01) + [0.0]
+REL60 = around(-0.15, -0.05, -0.02) + [0.0]
+DANGER = around(-0.10, -0.05) + [0.0]
+
+# Documented change (rules.py): NaN is "missing" for these rules, like None.
+# The old functions let NaN fall through every comparison.
+NAN_CHANGED = {
+    "dc_status": ("HEALTHY", "CRITICAL"),
+    "hy_status": ("HEALTHY", "CRITICAL"),
+    "semi_status": ("HEALTHY", "CRITICAL"),
+    "relative_perf": ("UNKNOWN", "NORMAL"),
+    "dc_credit": ("UNKNOWN", "NORMAL"),
+}
+
+
+@pytest.mark.parametrize("rule, baseline, values", [
+    ("dc_status", classify_dc_status, CHG),
+    ("hy_status", classify_hy_status, HY),
+    ("semi_status", classify_semi_status, CHG),
+    ("relative_perf", judge_relative_perf, DANGER),
+    ("dc_credit", judge_dc_credit, DANGER),
+])
+def test_single_input_rules(rule, baseline, values):
+    for v in values + [None]:
+        assert RULES.evaluate(rule, v) == baseline(v), (rule, v)
+    got = RULES.evaluate(rule, np.array(values))
+    assert list(got) == [baseline(v) for v in values]
+
+
+@pytest.mark.parametrize("rule, baseline", [
+    ("dc_status", classify_dc_status),
+    ("hy_status", classify_hy_status),
+    ("semi_status", classify_semi_status),
+    ("relative_perf", judge_relative_perf),
+    ("dc_credit", judge_dc_credit),
+])
+def test_nan_is_missing(rule, baseline):
+    now, before = NAN_CHANGED[rule]
+    assert baseline(NAN) == before
+    assert RULES.evaluate(rule, NAN) == now == baseline(None)
+
+
+def test_psr_level():
+    for v in PSR + [NAN]:
+        assert RULES.evaluate("psr_level", v) == get_psr_level(v), v
+
+
+def test_credit_to_equity():
+    for dc in CHG + [NAN]:
+        for hy in HY + [NAN]:
+            for semi in CHG + [NAN]:
+                assert classify_c2e_arrays(dc, hy, semi)[2] == evaluate_credit_equity_status(dc, hy, semi), (dc, hy, semi)
+
+
+def test_l2_status():
+    for sofr in around(0.0, 0.05) + [NAN]:
+        for tnx in around(0.05, 0.15) + [NAN]:
+            for real in around(2.0, 2.5) + [NAN]:
+                for tail in around(1.0, 3.0) + [NAN]:
+                    args = (sofr, tnx, real, tail)
+                    assert evaluate_l2_status(*args) == evaluate_l2_status_baseline(*args), args
+
+
+def test_capex_health():
+    for psr in around(1.0) + [NAN]:
+        for c_ni in around(1.0) + [NAN]:
+            for c_ocf in around(1.0) + [NAN]:
+                assert classify_capex_health_arrays(psr, c_ni, c_ocf) == classify_capex_health(psr, c_ni, c_ocf)
+
+
+def test_survivor_classes():
+    grid = np.array([(p, r20, r60) for p in PSR + [NAN] for r20 in REL20 + [NAN] for r60 in REL60 + [NAN]])
+    struct, market, final = classify_survivor_arrays(grid[:, 0], grid[:, 1], grid[:, 2])
+    for i, (p, r20, r60) in enumerate(grid):
+        assert (struct[i], market[i], final[i]) == classify_survivor(p, r20, r60), (p, r20, r60)
+
+
+def test_physical_vs_market():
+    for min_psr in around(1.0, 1.1) + [None]:
+        for spx in around(0.05):
+            assert RULES.evaluate("physical_vs_market", min_psr, spx) == judge_physical_vs_market(min_psr, spx)
+    # NaN min_psr is missing too (the old function fell through to WATCH)
+    assert judge_physical_vs_market(NAN, 0.0) == "WATCH"
+    assert RULES.evaluate("physical_vs_market", NAN, 0.0) == "UNKNOWN"
@@ -0,0 +1,62 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import shared_cache
+from shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / "cache.sqlite"))
+
+
+def test_round_trip(cache, tmp_path):
+    frame = pd.DataFrame({"a": [1.0, 2.0]}, index=pd.to_datetime(["2024-01-01", "2024-01-02"]))
+    cache.put("k1", "stage", 100.0, frame, ttl=None)
+    created_at, value = cache.get("k1")
+    assert created_at == 100.0
+    pd.testing.assert_frame_equal(value, frame)
+    # another process / connection sees the same entry
+    created_at, value = SharedCache(str(tmp_path / "cache.sqlite")).get("k1")
+    pd.testing.assert_frame_equal(value, frame)
+    assert cache.entries()[0][0] == "stage"
+
+
+def test_get_or_compute_sources(cache):
+    calls = []
+    compute = lambda: calls.append(1) or "v"
+    _, value, source = cache.get_or_compute("k", "stage", 60, compute)
+    assert (value, source) == ("v", "miss")
+    _, value, source = cache.get_or_compute("k", "stage", 60, compute)
+    assert (value, source) == ("v", "hit")
+    assert len(calls) == 1
+
+
+def test_expired_entry_is_a_miss_and_purged(cache):
+    cache.put("old", "stage", time.time() - 120, "stale", ttl=60)
+    cache.put("new", "stage", time.time(), "fresh", ttl=60)
+    cache.put("forever", "stage", 0.0, "kept", ttl=None)
+    assert cache.get("old") is None
+    assert cache.purge_expired() == 1
+    assert sorted(k for k, in cache._conn().execute("SELECT key FROM entries")) == ["forever", "new"]
+
+
+@pytest.mark.skipif(shared_cache.fcntl is None, reason="lock files need fcntl")
+def test_prune_locks(cache):
+    cache.get_or_compute("live", "stage", 60, lambda: 1)
+    for key in ("gone", "busy"):
+        open(os.path.join(cache.lock_dir, f"{key}.lock"), "a").close()
+    open(os.path.join(cache.lock_dir, "notes.txt"), "a").close()
+
+    held = open(os.path.join(cache.lock_dir, "busy.lock"), "a+b")
+    shared_cache.fcntl.flock(held, shared_cache.fcntl.LOCK_EX)  # a fetch in progress
+    try:
+        cache._prune_locks()
+    finally:
+        shared_cache.fcntl.flock(held, shared_cache.fcntl.LOCK_UN)
+        held.close()
+    # live key keeps its lock file, the held one is skipped, other files are left alone
+    assert sorted(os.listdir(cache.lock_dir)) == ["busy.lock", "live.lock", "notes.txt"]
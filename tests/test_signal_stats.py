@@ -0,0 +1,76 @@
+"""signal_stats against pandas rank(pct=True) and expanding / rolling z-scores."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from signal_stats import STAT_COLUMNS, SignalStatsCache, signal_stats
+
+WINDOW, MIN_PERIODS = 30, 5
+
+
+def reference(series, window=WINDOW, min_periods=MIN_PERIODS):
+    """The same table the slow way: pandas on every prefix / trailing window."""
+    def pct_of_last(w):
+        w = w[~np.isnan(w)]
+        return pd.Series(w).rank(pct=True).iloc[-1] if len(w) >= min_periods else np.nan
+
+    exp, roll = series.expanding(min_periods=min_periods), series.rolling(window, min_periods=min_periods)
+    z = (series - exp.mean()) / exp.std()
+    z_roll = (series - roll.mean()) / roll.std()
+    out = pd.DataFrame({
+        "Value": series,
+        "Pct": exp.apply(pct_of_last, raw=True),
+        "Z": z,
+        "Pct_Roll": roll.apply(pct_of_last, raw=True),
+        "Z_Roll": z_roll,
+    })
+    # a NaN observation has no position of its own
+    out.loc[series.isna(), ["Pct", "Z", "Pct_Roll", "Z_Roll"]] = np.nan
+    return out[STAT_COLUMNS]
+
+
+def make_series(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.normal(size=n).cumsum(), 1)  # rounded: plenty of ties
+    values[[3, 40, 41, 42, 120]] = np.nan  # gaps, one of them inside the first window
+    return pd.Series(values, index=pd.bdate_range("2020-01-01", periods=n))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_pandas(seed):
+    s = make_series(seed=seed)
+    got = signal_stats(s, window=WINDOW, min_periods=MIN_PERIODS)
+    pd.testing.assert_frame_equal(got, reference(s), check_freq=False, rtol=1e-9, atol=1e-9)
+
+
+def test_incremental_update_matches_full_recompute():
+    s = make_series()
+    cache = SignalStatsCache(window=WINDOW, min_periods=MIN_PERIODS)
+    for end in (50, 50, 51, 120, 200):
+        table = cache.update("x", s.iloc[:end])
+    assert cache.rows_computed["x"] == 80
+    pd.testing.assert_frame_equal(table, reference(s), check_freq=False, rtol=1e-9, atol=1e-9)
+
+
+def test_moved_start_or_revised_tail_starts_over():
+    s = make_series()
+    cache = SignalStatsCache(window=WINDOW, min_periods=MIN_PERIODS)
+    cache.update("x", s.iloc[:100])
+
+    table = cache.update("x", s.iloc[10:110])
+    assert cache.rows_computed["x"] == 100
+    pd.testing.assert_frame_equal(table, reference(s.iloc[10:110]), check_freq=False, rtol=1e-9, atol=1e-9)
+
+    revised = s.iloc[10:120].copy()
+    revised.iloc[99] += 1.0  # the last row the cache pushed
+    table = cache.update("x", revised)
+    assert cache.rows_computed["x"] == 110
+    pd.testing.assert_frame_equal(table, reference(revised), check_freq=False, rtol=1e-9, atol=1e-9)
+
+
+def test_earlier_tables_survive_buffer_growth():
+    s = make_series(n=300)
+    cache = SignalStatsCache(window=WINDOW, min_periods=MIN_PERIODS)
+    first = cache.update("x", s.iloc[:70]).copy(deep=False)
+    cache.update("x", s)
+    pd.testing.assert_frame_equal(first, reference(s.iloc[:70]), check_freq=False, rtol=1e-9, atol=1e-9)